@@ -1,9 +1,13 @@
 import time
 import uuid
+from contextlib import asynccontextmanager
+import anyio
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from api.routes import data, health, stats, admin
 from prometheus_fastapi_instrumentator import Instrumentator
+from core.config import API_THREADPOOL_SIZE
+from core.database import async_engine
 from core.logging_config import configure_logging
 import logging
 
@@ -11,7 +15,14 @@ import logging
 configure_logging()
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Kasparro Backend Assignment", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Read routes are async; the threadpool only serves the sync admin handlers
+    anyio.to_thread.current_default_thread_limiter().total_tokens = API_THREADPOOL_SIZE
+    yield
+    await async_engine.dispose()
+
+app = FastAPI(title="Kasparro Backend Assignment", version="1.0.0", lifespan=lifespan)
 
 # Instrument Prometheus Metrics
 Instrumentator().instrument(app).expose(app)
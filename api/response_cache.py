@@ -0,0 +1,170 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from prometheus_client import Counter
+from core.config import API_CACHE_MAX_BYTES, API_CACHE_TTL
+from core.data_version import current_version, on_change
+
+
+READ_REQUESTS = Counter(
+    "api_read_cache_requests_total",
+    "Cached read requests by outcome: hit (cache), miss (queried the DB) or coalesced (shared another request's query)",
+    ["path", "outcome"]
+)
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one: the first caller
+    runs the coroutine function, the others await and share its result (or
+    error). If the running caller is cancelled (e.g. its client disconnected),
+    the first waiter takes over and runs its own function, so callers that
+    are still connected are not cancelled with it. Runs on the event loop, so
+    no locking is needed.
+    """
+    def __init__(self):
+        self._flights = {}
+
+    async def do(self, key: str, fn: Callable) -> tuple:
+        """Returns (result, shared), shared being True for callers that only waited."""
+        flight = self._flights.get(key)
+        while flight is not None:
+            try:
+                return await asyncio.shield(flight), True
+            except asyncio.CancelledError:
+                if not flight.cancelled():
+                    raise  # this caller was cancelled itself
+            # The running caller was cancelled: join a waiter that took over, or take over
+            flight = self._flights.get(key)
+
+        flight = self._flights[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except Exception as e:
+            flight.set_exception(e)
+            flight.exception()  # retrieved: no "never retrieved" warning without waiters
+            raise
+        else:
+            flight.set_result(result)
+        finally:
+            del self._flights[key]
+        return result, False
+
+
+class ReadCache:
+    """
+    LRU cache of serialized read responses, bounded by the total size of the
+    cached bodies and by a TTL. Every entry records the data version it was
+    computed at and is only served while that version is current.
+    """
+    def __init__(self, max_bytes: int = None, ttl: float = None):
+        self.max_bytes = API_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.ttl = API_CACHE_TTL if ttl is None else ttl
+        self.size = 0
+        self._entries = OrderedDict()  # key -> (version, body, etag, expires_at)
+        self._lock = threading.Lock()
+
+    def get(self, key: str, version: int) -> Optional[tuple]:
+        """Returns (body, etag) if cached for `version` and not expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] != version or entry[3] < time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1], entry[2]
+
+    def put(self, key: str, version: int, body: bytes, etag: str):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (version, body, etag, time.monotonic() + self.ttl)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def clear(self, prefix: str = None):
+        """Drops every entry, or those whose key starts with `prefix`."""
+        with self._lock:
+            if prefix is None:
+                self._entries.clear()
+                self.size = 0
+                return
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                self._drop(key)
+
+    def _drop(self, key: str):
+        self.size -= len(self._entries.pop(key)[1])
+
+
+read_cache = ReadCache()
+single_flight = SingleFlight()
+
+
+@on_change
+def _invalidate(scopes: set):
+    # A commit from this process (e.g. an in-process ETL) invalidates its scopes at once
+    for scope in scopes:
+        read_cache.clear(prefix=scope + ":")
+
+
+def cache_key(request: Request, scope: str = "market_data") -> str:
+    """Scope, path and the query parameters in a canonical order."""
+    params = sorted((name, value) for name, value in request.query_params.multi_items() if value != "")
+    return scope + ":" + request.url.path + "?" + "&".join(f"{name}={value}" for name, value in params)
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    return header.strip() == "*" or etag in (tag.strip() for tag in header.split(","))
+
+
+async def cached_json(request: Request, db, compute: Callable, envelope: Callable = None,
+                      scope: str = "market_data") -> Response:
+    """
+    Serves the JSON body produced by `await compute()` from the read cache while
+    the version of `scope` (the data the endpoint reads, see
+    core.data_version.SCOPES) is unchanged, with a strong ETag over the cached body;
+    a matching If-None-Match gets 304 Not Modified without touching the
+    database. Concurrent misses for the same key share one query
+    (single-flight). `envelope()` may add per-request fields (request id,
+    latency) that are merged in after caching and are not covered by the ETag.
+    """
+    version = await current_version(db, scope)
+    key = cache_key(request, scope)
+    cached = read_cache.get(key, version)
+    if cached is None:
+        async def load():
+            body = json.dumps(jsonable_encoder(await compute()), separators=(",", ":"), sort_keys=True).encode()
+            etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+            read_cache.put(key, version, body, etag)
+            return body, etag
+
+        (body, etag), shared = await single_flight.do(f"{version}:{key}", load)
+        READ_REQUESTS.labels(request.url.path, "coalesced" if shared else "miss").inc()
+    else:
+        body, etag = cached
+        READ_REQUESTS.labels(request.url.path, "hit").inc()
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "X-Data-Version": str(version)}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if envelope is not None:
+        # Splice the per-request fields into the cached object without re-parsing it
+        extra = json.dumps(jsonable_encoder(envelope()), separators=(",", ":")).encode()
+        body = extra[:-1] + (b"," + body[1:] if body != b"{}" else b"}")
+    return Response(content=body, media_type="application/json", headers=headers)
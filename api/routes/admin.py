@@ -1,9 +1,9 @@
-from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Header
-from core.database import SessionLocal
-from ingestion.ingest_api import ingest_coingecko_data
-from ingestion.ingest_coinpaprika import ingest_coinpaprika_data
-from ingestion.ingest_csv import ingest_csv_data
-from ingestion.ingest_legacy import ingest_legacy_data
+from fastapi import APIRouter, HTTPException, Depends, Header
+from sqlalchemy.orm import Session
+from api.dependencies import get_db
+from core.models import ETLJob
+from schemas.api import BackfillRequest, ETLJobResponse
+from services.job_queue import enqueue
 import logging
 import os
 
@@ -15,36 +15,48 @@ async def verify_admin_secret(x_admin_secret: str = Header(...)):
     if x_admin_secret != expected_secret:
         raise HTTPException(status_code=403, detail="Invalid Admin Secret")
 
-def run_etl_pipeline():
+def _queued(job: ETLJob, coalesced: bool, what: str) -> dict:
+    if coalesced:
+        logger.info(f"{what} already pending as job {job.id}")
+    return {
+        "message": f"{what} {'already queued' if coalesced else 'queued'}",
+        "job_id": job.id,
+        "status": job.status,
+        "coalesced": coalesced,
+    }
+
+@router.post("/trigger-etl", dependencies=[Depends(verify_admin_secret)])
+def trigger_etl(db: Session = Depends(get_db)):
     """
-    Executes the full ETL pipeline.
-    This function is designed to run in the background.
+    Queues a full ETL run for the worker process (worker.py) and returns its
+    job ID; poll GET /admin/jobs/{job_id} for progress. Triggers arriving
+    while a run is still pending share that job.
+    Protected by X-Admin-Secret header.
     """
-    logger.info("Starting Manual ETL Trigger...")
-    db = SessionLocal()
-    try:
-        # API Ingestion
-        ingest_coingecko_data(db=db)
-        ingest_coinpaprika_data(db=db)
-    except Exception as e:
-        logger.error(f"Error in API Ingestion: {e}")
-    finally:
-        db.close()
-    
-    # CSV Ingestion
-    try:
-        ingest_csv_data("crypto_data.csv")
-        ingest_legacy_data("legacy_crypto_data.csv")
-    except Exception as e:
-        logger.error(f"Error in CSV Ingestion: {e}")
-        
-    logger.info("Manual ETL Trigger Completed.")
+    job, coalesced = enqueue(db, "etl")
+    return _queued(job, coalesced, "ETL pipeline")
 
-@router.post("/trigger-etl", dependencies=[Depends(verify_admin_secret)])
-async def trigger_etl(background_tasks: BackgroundTasks):
+@router.post("/backfill", dependencies=[Depends(verify_admin_secret)])
+def trigger_backfill(request: BackfillRequest, db: Session = Depends(get_db)):
+    """
+    Queues a CoinGecko history backfill for a date range.
+    Finished chunks are checkpointed, so re-posting the same request resumes it.
+    Protected by X-Admin-Secret header.
+    """
+    if request.end <= request.start:
+        raise HTTPException(status_code=422, detail="end must be after start")
+    if not request.coin_ids and not request.top:
+        raise HTTPException(status_code=422, detail="coin_ids or top is required")
+    job, coalesced = enqueue(db, "backfill", request.model_dump(mode="json"))
+    return _queued(job, coalesced, "Backfill")
+
+@router.get("/jobs/{job_id}", response_model=ETLJobResponse, dependencies=[Depends(verify_admin_secret)])
+def get_job(job_id: int, db: Session = Depends(get_db)):
     """
-    Manually triggers the ETL pipeline.
+    Status and result of a queued job.
     Protected by X-Admin-Secret header.
     """
-    background_tasks.add_task(run_etl_pipeline)
-    return {"message": "ETL pipeline triggered in background"}
+    job = db.query(ETLJob).filter(ETLJob.id == job_id).first()
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
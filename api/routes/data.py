@@ -1,49 +1,93 @@
-from fastapi import APIRouter, Depends, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 import time
-from sqlalchemy.orm import Session
-from typing import Optional
-from api.dependencies import get_db
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Literal, Optional
+from api.dependencies import get_async_db
+from api.pagination import encode_cursor, decode_cursor
+from api.response_cache import cached_json
 from schemas.api import CryptoDataResponse, CryptoData, PaginationResponse
 from core.models import CryptoMarketData
+from services.row_counts import total_statement
 
 router = APIRouter()
 
 @router.get("/data", response_model=CryptoDataResponse)
-def get_crypto_data(
+async def get_crypto_data(
     request: Request,
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
     symbol: Optional[str] = None,
     source: Optional[str] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page; replaces `page`"),
+    total: Literal["exact", "approx", "none"] = Query(
+        "approx", description="exact: COUNT(*) of the filtered rows; approx: ETL-maintained counters; none: omit"
+    ),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(CryptoMarketData)
+    """
+    Rows newest first, ordered by (recorded_at, id). With `cursor` the page
+    starts right after the previous page's last row (keyset pagination), so
+    it costs the same at any depth and concurrent inserts never shift it;
+    `page` (OFFSET) is kept for existing clients.
+    The total comes from per-(symbol, source) counters updated with every
+    ETL write; a full COUNT(*) only runs for total=exact.
+    Pages are served from the read cache until the next ETL commit.
+    """
+    async def compute():
+        return await _query_page(db, page, limit, symbol, source, cursor, total)
+
+    def envelope():
+        # Retrieve middleware data
+        start_time = getattr(request.state, "start_time", time.time())
+        return {
+            "request_id": getattr(request.state, "request_id", "unknown"),
+            "api_latency_ms": (time.time() - start_time) * 1000,
+        }
+
+    return await cached_json(request, db, compute, envelope)
+
+async def _query_page(db: AsyncSession, page: int, limit: int, symbol: Optional[str], source: Optional[str],
+                cursor: Optional[str], total: str) -> dict:
+    query = select(CryptoMarketData)
 
     if symbol:
-        query = query.filter(CryptoMarketData.symbol == symbol.upper())
+        query = query.where(CryptoMarketData.symbol == symbol.upper())
     
     if source:
-        query = query.filter(CryptoMarketData.source == source)
+        query = query.where(CryptoMarketData.source == source)
 
-    total = query.count()
-    
-    data = query.order_by(CryptoMarketData.recorded_at.desc()) \
-                .offset((page - 1) * limit) \
-                .limit(limit) \
-                .all()
-
-    # Retrieve middleware data
-    request_id = getattr(request.state, "request_id", "unknown")
-    start_time = getattr(request.state, "start_time", time.time())
-    latency = (time.time() - start_time) * 1000
-
-    return CryptoDataResponse(
-        request_id=request_id,
-        api_latency_ms=latency,
-        data=data,
-        pagination=PaginationResponse(
+    if total == "exact":
+        row_total = (await db.execute(select(func.count()).select_from(query.subquery()))).scalar()
+    elif total == "approx":
+        row_total = int((await db.execute(total_statement(symbol.upper() if symbol else None, source))).scalar())
+    else:
+        row_total = None
+
+    ordered = query.order_by(CryptoMarketData.recorded_at.desc(), CryptoMarketData.id.desc())
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        ordered = ordered.where(tuple_(CryptoMarketData.recorded_at, CryptoMarketData.id) < after)
+    else:
+        ordered = ordered.offset((page - 1) * limit)
+
+    # One extra row tells whether another page follows
+    data = (await db.execute(ordered.limit(limit + 1))).scalars().all()
+    next_cursor = None
+    if len(data) > limit:
+        data = data[:limit]
+        next_cursor = encode_cursor(data[-1].recorded_at, data[-1].id)
+
+    return {
+        "data": [CryptoData.model_validate(row) for row in data],
+        "pagination": PaginationResponse(
             page=page,
             limit=limit,
-            total=total
-        )
-    )
+            total=row_total,
+            total_mode=total,
+            next_cursor=next_cursor
+        ),
+    }
@@ -1,22 +1,24 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import text, func
-from api.dependencies import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text, func, select
+from api.dependencies import get_async_db
 from schemas.api import HealthCheck
 from core.models import CryptoMarketData
 
 router = APIRouter()
 
 @router.get("/health", response_model=HealthCheck)
-def health_check(db: Session = Depends(get_db)):
+async def health_check(db: AsyncSession = Depends(get_async_db)):
     db_status = False
     try:
-        db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 1"))
         db_status = True
     except Exception:
         db_status = False
 
-    last_run = db.query(func.max(CryptoMarketData.created_at)).scalar()
+    last_run = None
+    if db_status:
+        last_run = (await db.execute(select(func.max(CryptoMarketData.created_at)))).scalar()
 
     return HealthCheck(
         status="healthy" if db_status else "unhealthy",
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from api.dependencies import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
+from api.dependencies import get_async_db
+from api.response_cache import cached_json
 from core.models import ETLRun
 from schemas.api import ETLRunResponse, ComparisonResponse, ComparisonReport
 from typing import List, Optional
@@ -9,26 +10,31 @@ from typing import List, Optional
 router = APIRouter()
 
 @router.get("/stats")
-def get_etl_stats(db: Session = Depends(get_db)):
+async def get_etl_stats(request: Request, db: AsyncSession = Depends(get_async_db)):
     """
     Returns aggregated stats about ETL execution.
     """
-    
+    return await cached_json(request, db, lambda: _etl_stats(db), scope="runs")
+
+async def _etl_stats(db: AsyncSession) -> dict:
     # Global Stats
-    total_runs = db.query(ETLRun).count()
-    total_records = db.query(func.sum(ETLRun.records_processed)).scalar() or 0
-    failed_runs = db.query(ETLRun).filter(ETLRun.status == "failed").count()
+    total_runs = (await db.execute(select(func.count()).select_from(ETLRun))).scalar()
+    total_records = (await db.execute(select(func.sum(ETLRun.records_processed)))).scalar() or 0
+    failed_runs = (await db.execute(
+        select(func.count()).select_from(ETLRun).where(ETLRun.status == "failed")
+    )).scalar()
     success_rate = 0
     if total_runs > 0:
         success_rate = ((total_runs - failed_runs) / total_runs) * 100
 
     # Per Source Stats
     stats_by_source = {}
-    sources = db.query(ETLRun.source).distinct().all()
-    source_names = [s[0] for s in sources]
+    source_names = (await db.execute(select(ETLRun.source).distinct())).scalars().all()
 
     for source in source_names:
-        last_run = db.query(ETLRun).filter(ETLRun.source == source).order_by(ETLRun.start_time.desc()).first()
+        last_run = (await db.execute(
+            select(ETLRun).where(ETLRun.source == source).order_by(ETLRun.start_time.desc()).limit(1)
+        )).scalars().first()
         
         if last_run:
             duration_ms = None
@@ -53,39 +59,45 @@ def get_etl_stats(db: Session = Depends(get_db)):
     }
 
 @router.get("/runs", response_model=List[ETLRunResponse])
-def list_runs(
+async def list_runs(
+    request: Request,
     limit: int = 10, 
     source: Optional[str] = None, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     List recent ETL runs.
     """
-    query = db.query(ETLRun)
-    if source:
-        query = query.filter(ETLRun.source == source)
-    
-    return query.order_by(ETLRun.start_time.desc()).limit(limit).all()
+    async def compute():
+        query = select(ETLRun)
+        if source:
+            query = query.where(ETLRun.source == source)
+        runs = (await db.execute(query.order_by(ETLRun.start_time.desc()).limit(limit))).scalars().all()
+        return [ETLRunResponse.model_validate(run) for run in runs]
+
+    return await cached_json(request, db, compute, scope="runs")
 
 @router.get("/compare-runs", response_model=ComparisonResponse)
-def compare_runs(threshold_percent: float = 20.0, db: Session = Depends(get_db)):
+async def compare_runs(request: Request, threshold_percent: float = 20.0, db: AsyncSession = Depends(get_async_db)):
     """
     Detect anomalies by comparing the last 2 runs for each source.
     Flag if records_processed drops by more than `threshold_percent`.
     """
+    return await cached_json(request, db, lambda: _compare_runs(db, threshold_percent), scope="runs")
+
+async def _compare_runs(db: AsyncSession, threshold_percent: float) -> ComparisonResponse:
     reports = []
     anomalies = 0
     
     # Get all sources
-    sources = db.query(ETLRun.source).distinct().all()
-    source_names = [s[0] for s in sources]
+    source_names = (await db.execute(select(ETLRun.source).distinct())).scalars().all()
     
     for source in source_names:
         # Get last 2 successful runs
-        runs = db.query(ETLRun).filter(
+        runs = (await db.execute(select(ETLRun).where(
             ETLRun.source == source, 
             ETLRun.status == "success"
-        ).order_by(ETLRun.start_time.desc()).limit(2).all()
+        ).order_by(ETLRun.start_time.desc()).limit(2))).scalars().all()
         
         if len(runs) < 2:
             continue
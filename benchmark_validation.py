@@ -0,0 +1,132 @@
+"""
+Micro-benchmark: per-entry Pydantic models vs. one batch TypeAdapter call
+for API payloads.
+
+    python benchmark_validation.py [entries] [repeats]
+"""
+import sys
+import time
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel, validator
+from services.batch_validation import COINGECKO_BATCH, COINPAPRIKA_BATCH, validate_batch
+
+
+# The per-entry models as they were before batch validation: a Python
+# validator for `symbol` and derived fields recomputed on every access
+class PerEntryCoinGecko(BaseModel):
+    id: str
+    symbol: str
+    name: str
+    current_price: float
+    market_cap: Optional[float]
+    total_volume: Optional[float]
+    last_updated: Optional[datetime]
+
+    @validator('symbol')
+    def uppercase_symbol(cls, v):
+        return v.upper()
+
+
+class PerEntryCoinPaprika(BaseModel):
+    id: str
+    symbol: str
+    name: str
+    quotes: dict
+    last_updated: Optional[str]
+
+    @validator('symbol')
+    def uppercase_symbol(cls, v):
+        return v.upper()
+
+    @property
+    def price_usd(self) -> float:
+        return self.quotes.get("USD", {}).get("price", 0.0)
+
+    @property
+    def volume_24h(self) -> float:
+        return self.quotes.get("USD", {}).get("volume_24h", 0.0)
+
+    @property
+    def market_cap(self) -> float:
+        return self.quotes.get("USD", {}).get("market_cap", 0.0)
+
+    @property
+    def timestamp(self) -> datetime:
+        if self.last_updated:
+            try:
+                return datetime.strptime(self.last_updated, "%Y-%m-%dT%H:%M:%SZ")
+            except ValueError:
+                return datetime.now()
+        return datetime.now()
+
+
+def coingecko_payload(n: int, invalid_every: int = 100) -> list:
+    return [
+        {"id": f"coin-{i}", "symbol": f"c{i}", "name": f"Coin {i}",
+         "current_price": "oops" if i % invalid_every == 0 else 1.0 + i,
+         "market_cap": 1e9, "total_volume": 1e6, "last_updated": "2024-01-01T00:00:00.000Z"}
+        for i in range(n)
+    ]
+
+
+def coinpaprika_payload(n: int, invalid_every: int = 100) -> list:
+    return [
+        {"id": f"coin-{i}", "symbol": f"c{i}", "name": f"Coin {i}",
+         "quotes": "oops" if i % invalid_every == 0 else {"USD": {"price": 1.0 + i, "volume_24h": 1e6, "market_cap": 1e9}},
+         "last_updated": "2024-01-01T00:00:00Z"}
+        for i in range(n)
+    ]
+
+
+def per_entry(model, items: list, derived=()):
+    valid = []
+    for entry in items:
+        try:
+            validated = model(**entry)
+        except Exception:
+            continue
+        # Read derived fields twice, like the ingestor and its logging do
+        for _ in range(2):
+            for name in derived:
+                getattr(validated, name)
+        valid.append(validated)
+    return valid
+
+
+def batch(adapter, items: list, derived=()):
+    valid, _ = validate_batch(adapter, items)
+    for _ in range(2):
+        for _, validated in valid:
+            for name in derived:
+                getattr(validated, name)
+    return valid
+
+
+def best_of(repeats: int, fn, *args) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    paprika_derived = ("price_usd", "volume_24h", "market_cap", "timestamp")
+
+    cases = [
+        ("coingecko", PerEntryCoinGecko, COINGECKO_BATCH, coingecko_payload(n), ()),
+        ("coinpaprika", PerEntryCoinPaprika, COINPAPRIKA_BATCH, coinpaprika_payload(n), paprika_derived),
+    ]
+    print(f"{n} entries, 1% invalid, best of {repeats}")
+    for name, model, adapter, items, derived in cases:
+        old = best_of(repeats, per_entry, model, items, derived)
+        new = best_of(repeats, batch, adapter, items, derived)
+        print(f"{name:12s} per-entry {old * 1000:8.1f} ms   batch {new * 1000:8.1f} ms   x{old / new:.2f}")
+
+
+if __name__ == "__main__":
+    main()
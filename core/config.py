@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -12,3 +13,98 @@ DB_NAME = os.getenv("POSTGRES_DB", "kasparro_etl")
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+def _async_url(url: str) -> str:
+    """Same database through an asyncio driver: asyncpg for Postgres, aiosqlite for SQLite."""
+    scheme, rest = url.split(":", 1)
+    if scheme.startswith("sqlite"):
+        return "sqlite+aiosqlite:" + rest
+    if scheme.startswith("postgres"):
+        # asyncpg takes `ssl`, not libpq's `sslmode`
+        return "postgresql+asyncpg:" + rest.replace("sslmode=", "ssl=")
+    return url
+
+# Used by the API read routes
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_url(DATABASE_URL)
+
+# Connection pools (per process, for each of the sync and async engines; ignored for SQLite)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# Worker threads for the API's remaining sync handlers (admin) and blocking calls
+API_THREADPOOL_SIZE = int(os.getenv("API_THREADPOOL_SIZE", "40"))
+
+# ETL write batching: rows buffered per table before a multi-row INSERT is flushed
+ETL_BATCH_SIZE = int(os.getenv("ETL_BATCH_SIZE", "500"))
+
+# CSV load path: "auto"/"copy" stream files through COPY into a staging table on
+# Postgres, "orm" always uses the DataFrame + BulkWriter path (used on SQLite anyway)
+CSV_LOAD_MODE = os.getenv("CSV_LOAD_MODE", "auto")
+
+# Rows per DataFrame chunk when streaming CSV files (bounds ETL memory use)
+ETL_CSV_CHUNK_SIZE = int(os.getenv("ETL_CSV_CHUNK_SIZE", "50000"))
+
+# Records per COPY batch; each batch commits with the file's progress marker,
+# so an interrupted COPY load resumes after the last committed batch
+ETL_COPY_BATCH_ROWS = int(os.getenv("ETL_COPY_BATCH_ROWS", "200000"))
+
+# CSV drop folders: comma separated directories (every *.csv in them) or glob
+# patterns, loaded on top of the default files; new files are fanned out over
+# up to ETL_FILE_PROCESSES processes (each holds at most one DB connection)
+CSV_DROP_PATHS = [path.strip() for path in os.getenv("CSV_DROP_PATHS", "").split(",") if path.strip()]
+ETL_FILE_PROCESSES = int(os.getenv("ETL_FILE_PROCESSES", str(os.cpu_count() or 1)))
+
+# CoinGecko markets universe: top-N coins by market cap, fetched in pages of up to 250
+COINGECKO_UNIVERSE_SIZE = int(os.getenv("COINGECKO_UNIVERSE_SIZE", "10"))
+COINGECKO_MAX_CONCURRENCY = int(os.getenv("COINGECKO_MAX_CONCURRENCY", "4"))
+
+# Per-source token buckets: sustained calls/sec and burst capacity
+COINGECKO_CALLS_PER_SECOND = float(os.getenv("COINGECKO_CALLS_PER_SECOND", "0.5"))
+COINGECKO_BURST = int(os.getenv("COINGECKO_BURST", "1"))
+COINPAPRIKA_CALLS_PER_SECOND = float(os.getenv("COINPAPRIKA_CALLS_PER_SECOND", "1.0"))
+COINPAPRIKA_BURST = int(os.getenv("COINPAPRIKA_BURST", "1"))
+
+# Directory holding the shared (cross-process) rate limit buckets. Set to an
+# empty string to keep every process on its own budget.
+RATE_LIMIT_STATE_DIR = os.getenv(
+    "RATE_LIMIT_STATE_DIR", os.path.join(tempfile.gettempdir(), "kasparro_rate_limits")
+)
+
+# Pooled HTTP clients for the upstream APIs (seconds / connections per source)
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "120"))
+
+# Conditional requests (ETag / Last-Modified / body hash) and per-entry
+# `last_updated` tracking, so unchanged upstream data is not re-ingested
+HTTP_CACHE_ENABLED = os.getenv("HTTP_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Historical backfill: days of history per CoinGecko market_chart/range request
+# (ranges up to 90 days come back at hourly granularity)
+BACKFILL_CHUNK_DAYS = int(os.getenv("BACKFILL_CHUNK_DAYS", "90"))
+
+# ETL job queue (etl_jobs table) serviced by worker.py
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "5"))
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "1"))
+# Workers refresh a running job's heartbeat every JOB_HEARTBEAT_INTERVAL seconds; a job
+# without one for JOB_TIMEOUT seconds is assumed lost (worker died) and requeued
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "15"))
+JOB_TIMEOUT = int(os.getenv("JOB_TIMEOUT", "120"))
+# Port of the worker's Prometheus /metrics endpoint (ETL, HTTP and scheduler metrics); 0 disables it
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "9100"))
+
+# Built-in scheduler (worker.py --schedule): seconds between runs per source,
+# randomized by +/- SCHEDULE_JITTER (fraction of the interval)
+SCHEDULE_COINGECKO_SECONDS = float(os.getenv("SCHEDULE_COINGECKO_SECONDS", "60"))
+SCHEDULE_COINPAPRIKA_SECONDS = float(os.getenv("SCHEDULE_COINPAPRIKA_SECONDS", "60"))
+SCHEDULE_FILES_SECONDS = float(os.getenv("SCHEDULE_FILES_SECONDS", "21600"))
+SCHEDULE_JITTER = float(os.getenv("SCHEDULE_JITTER", "0.1"))
+
+# API read cache: responses of /data, /stats, /runs and /compare-runs are kept
+# until the data version changes (or the TTL expires), within a memory bound
+API_CACHE_MAX_BYTES = int(os.getenv("API_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+API_CACHE_TTL = float(os.getenv("API_CACHE_TTL", "3600"))
+# How long an API process trusts the data version it last read before re-reading it
+DATA_VERSION_POLL_SECONDS = float(os.getenv("DATA_VERSION_POLL_SECONDS", "1"))
@@ -0,0 +1,108 @@
+import threading
+import time
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import TextClause
+from core.config import DATA_VERSION_POLL_SECONDS
+from core.models import DataVersion
+
+# Read scope -> (DataVersion row id, tables behind the endpoints cached on it).
+# Market data and the run log are versioned apart, so run bookkeeping (every
+# ETLRun start / progress / end commit) never invalidates cached /data pages.
+SCOPES = {
+    "market_data": (1, {"crypto_market_data", "market_data_counts"}),
+    "runs": (2, {"etl_runs"}),
+}
+
+_CHANGED = "data_changed"
+_BUMPED = "data_version_bumped"
+_lock = threading.Lock()
+_cached = {}  # scope -> (version, read_at)
+_listeners = []
+
+
+def on_change(callback):
+    """Registers callback(scopes), run after this process commits a data change."""
+    _listeners.append(callback)
+    return callback
+
+
+def _scopes_of(tables) -> set:
+    return {scope for scope, (_, watched) in SCOPES.items() if watched & tables}
+
+
+def _touched_tables(statement) -> set:
+    if isinstance(statement, TextClause):
+        sql = statement.text.lower()
+        return {
+            table for _, watched in SCOPES.values() for table in watched
+            if f"into {table}" in sql or f"update {table}" in sql
+        }
+    table = getattr(statement, "table", None)
+    return {table.name} if getattr(table, "name", None) else set()
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_statement(state):
+    if state.is_insert or state.is_update or state.is_delete or isinstance(state.statement, TextClause):
+        scopes = _scopes_of(_touched_tables(state.statement))
+        if scopes:
+            state.session.info.setdefault(_CHANGED, set()).update(scopes)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session, flush_context):
+    tables = {getattr(obj, "__tablename__", None) for obj in (*session.new, *session.dirty, *session.deleted)}
+    scopes = _scopes_of(tables)
+    if scopes:
+        session.info.setdefault(_CHANGED, set()).update(scopes)
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_on_commit(session):
+    # Flush first so ORM changes pending at commit time are seen
+    session.flush()
+    scopes = session.info.pop(_CHANGED, None)
+    if not scopes:
+        return
+    for scope in sorted(scopes):
+        row_id = SCOPES[scope][0]
+        result = session.execute(update(DataVersion).where(DataVersion.id == row_id).values(version=DataVersion.version + 1))
+        if result.rowcount == 0:
+            session.execute(insert(DataVersion).values(id=row_id, version=1))
+    session.info[_BUMPED] = scopes
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    scopes = session.info.pop(_BUMPED, None)
+    if scopes:
+        with _lock:
+            for scope in scopes:
+                _cached.pop(scope, None)
+        for callback in _listeners:
+            callback(scopes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop(_CHANGED, None)
+    session.info.pop(_BUMPED, None)
+
+
+async def current_version(db, scope: str = "market_data") -> int:
+    """
+    The version of `scope`, re-read through the async session `db` at most
+    every DATA_VERSION_POLL_SECONDS; commits made by this process are seen at
+    once.
+    """
+    now = time.monotonic()
+    with _lock:
+        cached = _cached.get(scope)
+        if cached is not None and now - cached[1] < DATA_VERSION_POLL_SECONDS:
+            return cached[0]
+    row_id = SCOPES[scope][0]
+    version = (await db.execute(select(DataVersion.version).where(DataVersion.id == row_id))).scalar() or 0
+    with _lock:
+        _cached[scope] = (version, now)
+    return version
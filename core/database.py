@@ -1,11 +1,21 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from core.config import DATABASE_URL
+from core.config import DATABASE_URL, ASYNC_DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT
 
-engine = create_engine(DATABASE_URL)
+def _pool_args(url: str) -> dict:
+    if url.startswith("sqlite"):
+        return {}
+    return {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW, "pool_timeout": DB_POOL_TIMEOUT, "pool_pre_ping": True}
+
+engine = create_engine(DATABASE_URL, **_pool_args(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for the API read path
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_pool_args(ASYNC_DATABASE_URL))
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -18,6 +28,32 @@ def get_db():
 def init_db():
     try:
         Base.metadata.create_all(bind=engine)
+        # create_all skips tables that already exist; add nullable columns and
+        # indexes introduced since
+        inspector = inspect(engine)
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    with engine.begin() as conn:
+                        conn.execute(text(
+                            f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=engine.dialect)}'
+                        ))
+            for index in table.indexes:
+                index.create(bind=engine, checkfirst=True)
+        # Row counters start from the data loaded before they existed
+        from services.row_counts import ensure_counts
+        from core.models import DataVersion
+        from core.data_version import SCOPES
+        db = SessionLocal()
+        try:
+            ensure_counts(db)
+            for row_id, _ in SCOPES.values():
+                if db.get(DataVersion, row_id) is None:
+                    db.add(DataVersion(id=row_id, version=0))
+            db.commit()
+        finally:
+            db.close()
         print("Database tables created successfully.")
     except Exception as e:
         print(f"Error creating tables: {e}")
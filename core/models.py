@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, UniqueConstraint
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, JSON, UniqueConstraint, Index, text
 from sqlalchemy.sql import func
 from core.database import Base
 
@@ -75,7 +75,79 @@ class CryptoMarketData(Base):
     source = Column(String)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
-    # Composite unique constraint for idempotency
+    # Composite unique constraint for idempotency; the (recorded_at, id)
+    # indexes serve keyset pagination of /data, unfiltered and per filter
     __table_args__ = (
         UniqueConstraint('symbol', 'recorded_at', 'source', name='uq_crypto_market_data_entry'),
+        Index('ix_crypto_market_data_recorded_at_id', 'recorded_at', 'id'),
+        Index('ix_crypto_market_data_symbol_recorded_at_id', 'symbol', 'recorded_at', 'id'),
+        Index('ix_crypto_market_data_source_recorded_at_id', 'source', 'recorded_at', 'id'),
     )
+
+class MarketDataCount(Base):
+    """
+    Rows in `crypto_market_data` per (symbol, source), kept up to date in the
+    same transaction as the ingestion writes. Serves cheap /data totals.
+    """
+    __tablename__ = "market_data_counts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    symbol = Column(String)
+    source = Column(String)
+    row_count = Column(BigInteger, default=0)
+
+    __table_args__ = (
+        UniqueConstraint('symbol', 'source', name='uq_market_data_counts_key'),
+    )
+
+class DataVersion(Base):
+    """
+    One counter row per read scope (market data, run log), bumped by every
+    commit that changes the tables behind that scope's endpoints (see
+    core.data_version); the API response cache is keyed on them.
+    """
+    __tablename__ = "data_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class HTTPCacheEntry(Base):
+    __tablename__ = "http_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    source = Column(String, index=True)
+    cache_key = Column(String, unique=True, index=True) # request URL + params, or "<source>:entries"
+    etag = Column(String, nullable=True)
+    last_modified = Column(String, nullable=True)
+    content_hash = Column(String, nullable=True)
+    entry_versions = Column(JSON, nullable=True) # entry id -> last_updated
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class ETLJob(Base):
+    __tablename__ = "etl_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, index=True) # etl, backfill
+    params = Column(JSON, nullable=True)
+    dedup_key = Column(String, index=True) # kind + params; identical pending jobs are coalesced
+    status = Column(String, index=True, default="pending") # pending, running, succeeded, failed
+    result = Column(JSON, nullable=True)
+    error_message = Column(String, nullable=True)
+    attempts = Column(Integer, default=0)
+    worker_id = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True) # refreshed by the worker while running
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    # At most one pending job per dedup key, even with concurrent triggers
+    __table_args__ = (
+        Index(
+            "uq_etl_jobs_pending_dedup", "dedup_key", unique=True,
+            postgresql_where=text("status = 'pending'"), sqlite_where=text("status = 'pending'")
+        ),
+    )
+
+# Registers the commit hooks that bump the data versions
+from core import data_version  # noqa: E402,F401
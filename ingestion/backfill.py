@@ -0,0 +1,289 @@
+import argparse
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from core.config import BACKFILL_CHUNK_DAYS
+from core.database import SessionLocal
+from core.models import RawCoinGecko, CryptoMarketData, ETLCheckpoint, ETLRun
+from ingestion.ingest_api import rate_limiter, _page_plan, _request_args, fetch_coingecko_page
+from services import http_client
+from services.bulk_writer import BulkWriter
+from services.resilience import AdaptiveSemaphore, validation_retry
+
+COINGECKO_RANGE_URL = "https://api.coingecko.com/api/v3/coins/{coin_id}/market_chart/range"
+COINGECKO_LIST_URL = "https://api.coingecko.com/api/v3/coins/list"
+
+# Historical ticks land next to the live snapshots of the same source
+SOURCE_NAME = "coingecko_api"
+CHECKPOINT_PREFIX = "backfill:coingecko:"
+
+
+def plan_chunks(coin_ids: list, start: date, end: date, chunk_days: int = None) -> list:
+    """
+    Splits [start, end) for every coin into (coin_id, chunk_start, chunk_end)
+    ranges of at most `chunk_days` days (naive UTC datetimes).
+    """
+    chunk_days = chunk_days or BACKFILL_CHUNK_DAYS
+    if chunk_days <= 0:
+        raise ValueError(f"chunk_days must be positive, got {chunk_days}")
+    start = datetime(start.year, start.month, start.day)
+    end = datetime(end.year, end.month, end.day)
+    chunks = []
+    for coin_id in coin_ids:
+        chunk_start = start
+        while chunk_start < end:
+            chunk_end = min(end, chunk_start + timedelta(days=chunk_days))
+            chunks.append((coin_id, chunk_start, chunk_end))
+            chunk_start = chunk_end
+    return chunks
+
+
+def chunk_key(coin_id: str, start: datetime, end: datetime) -> str:
+    """ETLCheckpoint.source_name recording a finished chunk."""
+    return f"{CHECKPOINT_PREFIX}{coin_id}:{start:%Y-%m-%d}:{end:%Y-%m-%d}"
+
+
+def completed_chunks(db) -> set:
+    """Keys of every finished backfill chunk, loaded in one query."""
+    rows = db.query(ETLCheckpoint.source_name).filter(
+        ETLCheckpoint.source_name.like(f"{CHECKPOINT_PREFIX}%")
+    ).all()
+    return {source_name for (source_name,) in rows}
+
+
+def _unix(value: datetime) -> int:
+    return int(value.replace(tzinfo=timezone.utc).timestamp())
+
+
+@validation_retry()
+def _fetch_coin_list():
+    rate_limiter.wait_for_token()
+    _, headers = _request_args()
+    response = http_client.get("coingecko", COINGECKO_LIST_URL, headers=headers)
+    rate_limiter.observe(response)
+    response.raise_for_status()
+    return response.json()
+
+
+def resolve_symbols(db, coin_ids: list) -> dict:
+    """
+    Maps CoinGecko coin ids to the symbols stored in `crypto_market_data`,
+    from the latest landed raw snapshot of each coin first and the coin list
+    endpoint otherwise. Only the symbol of one row per coin is read; backfill
+    payloads (whole series, no symbol) are never selected.
+    """
+    symbols = {}
+    symbol = RawCoinGecko.data["symbol"].as_string()
+    latest = db.query(func.max(RawCoinGecko.id)).filter(
+        RawCoinGecko.coin_id.in_(coin_ids), symbol.isnot(None)
+    ).group_by(RawCoinGecko.coin_id)
+    for coin_id, coin_symbol in db.query(RawCoinGecko.coin_id, symbol).filter(RawCoinGecko.id.in_(latest)).all():
+        if coin_symbol:
+            symbols[coin_id] = coin_symbol.upper()
+
+    missing = [coin_id for coin_id in coin_ids if coin_id not in symbols]
+    if missing:
+        known = {entry["id"]: entry["symbol"].upper() for entry in _fetch_coin_list() if entry.get("symbol")}
+        for coin_id in missing:
+            symbols[coin_id] = known.get(coin_id, coin_id.upper())
+    return symbols
+
+
+def top_coin_ids(n: int) -> list:
+    """Ids of the top-`n` coins by market cap."""
+    coin_ids = []
+    for page, per_page, keep in _page_plan(n):
+        coin_ids.extend(entry["id"] for entry in fetch_coingecko_page(page, per_page)[:keep])
+    return coin_ids
+
+
+@validation_retry()
+async def fetch_range_async(client, coin_id: str, start: datetime, end: datetime) -> dict:
+    await rate_limiter.wait_for_token_async()
+    _, headers = _request_args()
+    params = {"vs_currency": "usd", "from": _unix(start), "to": _unix(end)}
+    response = await http_client.get_async(
+        "coingecko", COINGECKO_RANGE_URL.format(coin_id=coin_id), client=client, params=params, headers=headers
+    )
+    rate_limiter.observe(response)
+    response.raise_for_status()
+    return response.json()
+
+
+def series_rows(payload: dict) -> list:
+    """
+    Joins the prices / market_caps / total_volumes series of a
+    `market_chart/range` payload into one row per timestamp.
+    """
+    points = {}
+    for series, column in (("prices", "price_usd"), ("market_caps", "market_cap"), ("total_volumes", "volume_24h")):
+        for timestamp_ms, value in payload.get(series) or []:
+            points.setdefault(timestamp_ms, {})[column] = value
+    rows = []
+    for timestamp_ms, values in sorted(points.items()):
+        if values.get("price_usd") is None:
+            continue
+        rows.append({
+            "price_usd": values["price_usd"],
+            "market_cap": values.get("market_cap"),
+            "volume_24h": values.get("volume_24h"),
+            "recorded_at": datetime.fromtimestamp(timestamp_ms / 1000, timezone.utc).replace(tzinfo=None),
+        })
+    return rows
+
+
+def write_chunk(db, coin_id: str, symbol: str, start: datetime, end: datetime, payload: dict) -> int:
+    """
+    Lands one chunk (raw payload + normalized rows) and its checkpoint in a
+    single commit, so a finished chunk is never fetched again and an
+    unfinished one leaves nothing behind. A checkpoint already written by a
+    concurrent backfill of the same chunk is kept. Returns rows inserted.
+    """
+    writer = BulkWriter(db, autocommit=False)
+    writer.add(RawCoinGecko, coin_id=coin_id, data={
+        "backfill": {"from": start.isoformat(), "to": end.isoformat()}, **payload
+    })
+    rows = series_rows(payload)
+    for row in rows:
+        writer.add(CryptoMarketData, symbol=symbol, source=SOURCE_NAME, **row)
+    writer.flush()
+    try:
+        with db.begin_nested():
+            db.add(ETLCheckpoint(
+                source_name=chunk_key(coin_id, start, end),
+                last_processed_at=datetime.now(),
+                meta_data={"points": len(rows), "inserted": writer.inserted, "complete": True}
+            ))
+    except IntegrityError:
+        pass
+    db.commit()
+    return writer.inserted
+
+
+async def run_backfill_async(coin_ids: list, start: date, end: date, chunk_days: int = None,
+                             db=None, symbols: dict = None) -> dict:
+    """
+    Backfills CoinGecko history for `coin_ids` over [start, end).
+    Chunks are fetched concurrently under the CoinGecko rate limiter and
+    written one at a time as they arrive; chunks already recorded in
+    ETLCheckpoint are skipped, so an interrupted backfill resumes where it
+    stopped. A chunk that still fails after its retries is reported and
+    picked up by the next run.
+    """
+    should_close = False
+    if db is None:
+        db = SessionLocal()
+        should_close = True
+
+    run_log = ETLRun(source="coingecko_backfill", status="running", start_time=datetime.now())
+    db.add(run_log)
+    db.commit()
+
+    summary = {"chunks": 0, "already_done": 0, "completed": 0, "failed": 0, "records": 0}
+    tasks = []
+    try:
+        plan = plan_chunks(coin_ids, start, end, chunk_days)
+        done = completed_chunks(db)
+        todo = [chunk for chunk in plan if chunk_key(*chunk) not in done]
+        summary["chunks"] = len(plan)
+        summary["already_done"] = len(plan) - len(todo)
+        print(f"Backfill: {len(plan)} chunks planned, {summary['already_done']} already done.")
+
+        if todo and symbols is None:
+            symbols = await asyncio.to_thread(resolve_symbols, db, sorted({c[0] for c in todo}))
+
+        client = http_client.get_async_client("coingecko")
+        semaphore = AdaptiveSemaphore(lambda: rate_limiter.concurrency)
+
+        async def fetch_chunk(chunk):
+            async with semaphore:
+                try:
+                    return chunk, await fetch_range_async(client, *chunk), None
+                except Exception as e:
+                    return chunk, None, e
+
+        tasks = [asyncio.ensure_future(fetch_chunk(chunk)) for chunk in todo]
+        failed = []
+        for next_chunk in asyncio.as_completed(tasks):
+            chunk, payload, error = await next_chunk
+            coin_id, chunk_start, chunk_end = chunk
+            if error is None:
+                # DB writes block, so they run in a worker thread while fetches continue
+                try:
+                    summary["records"] += await asyncio.to_thread(
+                        write_chunk, db, coin_id, symbols.get(coin_id, coin_id.upper()), chunk_start, chunk_end, payload
+                    )
+                    summary["completed"] += 1
+                    continue
+                except Exception as e:
+                    db.rollback()
+                    error = e
+            # Not checkpointed, so the next run retries the chunk
+            print(f"Backfill chunk {chunk_key(*chunk)} failed: {error}")
+            failed.append(f"{chunk_key(*chunk)}: {error}")
+
+        summary["failed"] = len(failed)
+        if failed:
+            run_log.error_message = f"{len(failed)} chunk(s) failed: " + "; ".join(failed[:20])
+        run_log.status = "success"
+        run_log.records_processed = summary["records"]
+        print(f"Backfill: {summary['completed']} chunks written, {summary['failed']} failed, {summary['records']} records inserted.")
+    except Exception as e:
+        db.rollback()
+        run_log.status = "failed"
+        run_log.error_message = str(e)
+        run_log.records_processed = summary["records"]
+        print(f"Backfill Failed: {e}")
+    finally:
+        for task in tasks:
+            task.cancel()
+        await http_client.close_async_clients()
+        run_log.end_time = datetime.now()
+        try:
+            db.commit()
+        except Exception:
+            pass
+        if should_close:
+            db.close()
+    return summary
+
+
+def run_backfill(coin_ids: list = None, start: date = None, end: date = None, chunk_days: int = None,
+                 top: int = None) -> dict:
+    """
+    Blocking entry point (CLI and admin endpoint). `top` backfills the top-N
+    coins by market cap in addition to `coin_ids`.
+    """
+    coin_ids = list(coin_ids or [])
+    if top:
+        coin_ids += [coin_id for coin_id in top_coin_ids(top) if coin_id not in coin_ids]
+    return asyncio.run(run_backfill_async(coin_ids, start, end, chunk_days))
+
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Backfill CoinGecko price history into crypto_market_data.")
+    parser.add_argument("--start", required=True, type=date.fromisoformat, help="first day (YYYY-MM-DD)")
+    parser.add_argument("--end", default=date.today(), type=date.fromisoformat, help="day after the last one (default: today)")
+    parser.add_argument("--coins", default="", help="comma separated CoinGecko ids, e.g. bitcoin,ethereum")
+    parser.add_argument("--top", type=_positive_int, default=None, help="also backfill the top N coins by market cap")
+    parser.add_argument("--chunk-days", type=_positive_int, default=None, help=f"days per chunk (default {BACKFILL_CHUNK_DAYS})")
+    args = parser.parse_args(argv)
+
+    coin_ids = [coin_id.strip() for coin_id in args.coins.split(",") if coin_id.strip()]
+    if not coin_ids and not args.top:
+        parser.error("pass --coins and/or --top")
+    if args.end <= args.start:
+        parser.error("--end must be after --start")
+    print(run_backfill(coin_ids, args.start, args.end, args.chunk_days, top=args.top))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,42 @@
+import asyncio
+import math
 import requests
+import httpx
 import os
 from datetime import datetime
+from core.config import COINGECKO_UNIVERSE_SIZE, COINGECKO_MAX_CONCURRENCY, COINGECKO_CALLS_PER_SECOND, COINGECKO_BURST
 from core.database import SessionLocal
-from core.models import RawCoinGecko, CryptoMarketData, ETLCheckpoint, ETLRun
-from schemas.ingestion import CoinGeckoEntry
-from services.resilience import RateLimiter, validation_retry
+from core.models import RawCoinGecko
+from ingestion.sources import APISource, register_source
+from services.batch_validation import COINGECKO_BATCH
+from services.resilience import RateLimiter, AdaptiveSemaphore, validation_retry
+from services import http_client
+from services.http_cache import ResponseCache, request_key
 
-# Rate Limiter (e.g., 1 call every 2 seconds -> 0.5 calls/sec)
-rate_limiter = RateLimiter(calls_per_second=0.5)
+# Rate Limiter (e.g., 1 call every 2 seconds -> 0.5 calls/sec), shared by every
+# process on the node so worker.py, main.py and backfills split one budget
+rate_limiter = RateLimiter(
+    calls_per_second=COINGECKO_CALLS_PER_SECOND, burst=COINGECKO_BURST, shared_key="coingecko",
+    max_concurrency=COINGECKO_MAX_CONCURRENCY
+)
 
 COINGECKO_API_URL = "https://api.coingecko.com/api/v3/coins/markets"
+COINGECKO_MAX_PER_PAGE = 250
 
-@validation_retry()
-def fetch_coingecko_data():
-    rate_limiter.wait_for_token()
-    
+def _page_plan(universe_size: int = None) -> list:
+    """
+    Splits the top-N universe into (page, per_page, keep) requests, using the
+    largest page size the API allows. `keep` trims the last page to N.
+    """
+    universe_size = universe_size or COINGECKO_UNIVERSE_SIZE
+    per_page = min(COINGECKO_MAX_PER_PAGE, universe_size)
+    pages = math.ceil(universe_size / per_page)
+    return [
+        (page, per_page, min(per_page, universe_size - (page - 1) * per_page))
+        for page in range(1, pages + 1)
+    ]
+
+def _request_args(page: int = 1, per_page: int = 10):
     # Secure API Key Handling
     api_key = os.getenv("COINGECKO_API_KEY")
     headers = {}
@@ -24,121 +46,124 @@ def fetch_coingecko_data():
     params = {
         "vs_currency": "usd",
         "order": "market_cap_desc",
-        "per_page": 10,
-        "page": 1,
+        "per_page": per_page,
+        "page": page,
         "sparkline": "false"
     }
+    return params, headers
+
+def _page_or_unchanged(response, page: int, cache: ResponseCache = None, params: dict = None) -> list:
+    """
+    Returns the page's entries, or [] when the cache shows the page has not
+    changed since it was last ingested.
+    """
+    if cache is not None and cache.unchanged(request_key(COINGECKO_API_URL, params), response):
+        print(f"CoinGecko page {page} not modified since last run.")
+        return []
+    return response.json()
+
+@validation_retry()
+def fetch_coingecko_page(page: int, per_page: int, cache: ResponseCache = None):
+    rate_limiter.wait_for_token()
+    params, headers = _request_args(page, per_page)
+    if cache is not None:
+        headers.update(cache.conditional_headers(request_key(COINGECKO_API_URL, params)))
     try:
-        response = requests.get(COINGECKO_API_URL, params=params, headers=headers)
+        response = http_client.get("coingecko", COINGECKO_API_URL, params=params, headers=headers)
+        rate_limiter.observe(response)
         response.raise_for_status()
-        return response.json()
+        return _page_or_unchanged(response, page, cache, params)
     except requests.RequestException as e:
-        print(f"Error fetching data from CoinGecko: {e}")
+        print(f"Error fetching data from CoinGecko (page {page}): {e}")
         raise e # Re-raise to trigger retry
 
-def ingest_coingecko_data(db: SessionLocal = None, simulate_failure_after: int = -1):
-    should_close = False
-    if db is None:
-        db = SessionLocal()
-        should_close = True
-    
-    # Start Run Log
-    run_log = ETLRun(source="coingecko_api", status="running", start_time=datetime.now())
-    db.add(run_log)
-    db.commit() # Get ID
-    
-    records_processed = 0
-    
+def fetch_coingecko_data(cache: ResponseCache = None):
+    """
+    Fetches the whole configured universe page by page. Each page is retried
+    on its own, so a transient error does not refetch earlier pages.
+    """
+    data = []
+    for page, per_page, keep in _page_plan():
+        data.extend(fetch_coingecko_page(page, per_page, cache)[:keep])
+    return data
+
+@validation_retry()
+async def fetch_coingecko_page_async(client: httpx.AsyncClient, page: int, per_page: int, cache: ResponseCache = None):
+    await rate_limiter.wait_for_token_async()
+    params, headers = _request_args(page, per_page)
+    if cache is not None:
+        headers.update(cache.conditional_headers(request_key(COINGECKO_API_URL, params)))
     try:
-        # Check Checkpoint
-        source_name = "coingecko_api"
-        checkpoint = db.query(ETLCheckpoint).filter(ETLCheckpoint.source_name == source_name).first()
-        
-        data = fetch_coingecko_data()
-
-        if not data:
-            print("No data received from CoinGecko.")
-            run_log.status = "success"
-            run_log.end_time = datetime.now()
-            db.commit()
-            db.close()
-            return
-
-        print(f"Fetched {len(data)} records from CoinGecko.")
-
-        for entry in data:
-            try:
-                validated_data = CoinGeckoEntry(**entry)
-            except Exception as e:
-                print(f"Skipping invalid data entry: {e}")
-                continue
-
-            raw_record = RawCoinGecko(
-                coin_id=validated_data.id,
-                data=entry
-            )
-            db.add(raw_record)
-            
-            exists = db.query(CryptoMarketData).filter(
-                CryptoMarketData.symbol == validated_data.symbol,
-                CryptoMarketData.source == source_name,
-            ).count() > 0
-
-            record_time = validated_data.last_updated if validated_data.last_updated else datetime.now()
-
-            if checkpoint and checkpoint.last_processed_at and record_time <= checkpoint.last_processed_at:
-                 continue
-
-            normalized_record = CryptoMarketData(
-                symbol=validated_data.symbol,
-                price_usd=validated_data.current_price,
-                market_cap=validated_data.market_cap,
-                volume_24h=validated_data.total_volume,
-                recorded_at=record_time,
-                source=source_name
-            )
-            
-            try:
-                db.add(normalized_record)
-                db.commit()
-                records_processed += 1
-                
-                # Failure Injection
-                if simulate_failure_after > 0 and records_processed >= simulate_failure_after:
-                    raise Exception("Simulated Failure Injection")
-                    
-            except Exception as e:
-                db.rollback()
-                if "Simulated Failure Injection" in str(e):
-                    raise e # Propagate crucial failures
-
-        # Update Checkpoint
-        if records_processed > 0:
-            if not checkpoint:
-                checkpoint = ETLCheckpoint(source_name=source_name, last_processed_at=datetime.now())
-                db.add(checkpoint)
-            else:
-                checkpoint.last_processed_at = datetime.now()
+        response = await http_client.get_async("coingecko", COINGECKO_API_URL, client=client, params=params, headers=headers)
+        rate_limiter.observe(response)
+        response.raise_for_status()
+        return _page_or_unchanged(response, page, cache, params)
+    except httpx.HTTPError as e:
+        print(f"Error fetching data from CoinGecko (page {page}): {e}")
+        raise e # Re-raise to trigger retry
+
+async def iter_coingecko_pages_async(client: httpx.AsyncClient, cache: ResponseCache = None):
+    """
+    Fetches all pages concurrently (bounded by the rate limiter's adaptive
+    concurrency, at most COINGECKO_MAX_CONCURRENCY) and yields each one as
+    soon as it arrives. A page that still fails after its retries is yielded
+    as the exception instead.
+    """
+    semaphore = AdaptiveSemaphore(lambda: rate_limiter.concurrency)
+
+    async def fetch_page(page, per_page, keep):
+        async with semaphore:
+            return (await fetch_coingecko_page_async(client, page, per_page, cache=cache))[:keep]
+
+    tasks = [asyncio.ensure_future(fetch_page(*plan)) for plan in _page_plan()]
+    try:
+        for next_page in asyncio.as_completed(tasks):
             try:
-                db.commit()
+                yield await next_page
             except Exception as e:
-                print(f"Error updating checkpoint: {e}")
-        
-        run_log.status = "success"
-        run_log.records_processed = records_processed
-
-    except Exception as e:
-        run_log.status = "failed"
-        run_log.error_message = str(e)
-        print(f"ETL Failed: {e}")
+                yield e
     finally:
-        run_log.end_time = datetime.now()
-        try:
-            db.commit()
-        except:
-            pass
-        if should_close:
-            db.close()
+        for task in tasks:
+            task.cancel()
+
+class CoinGeckoSource(APISource):
+    name = "coingecko_api"
+    label = "CoinGecko"
+    cache_source = "coingecko"
+    raw_model = RawCoinGecko
+    batch = COINGECKO_BATCH
+    streaming = True
+
+    def fetch(self, client, cache):
+        return iter_coingecko_pages_async(client, cache=cache)
+
+    def transform(self, validated, entry):
+        raw = {"coin_id": validated.id, "data": entry}
+        row = {
+            "symbol": validated.symbol,
+            "price_usd": validated.current_price,
+            "market_cap": validated.market_cap,
+            "volume_24h": validated.total_volume,
+            "recorded_at": validated.last_updated if validated.last_updated else datetime.now(),
+        }
+        return raw, row, entry.get("last_updated")
+
+    def ingest(self, fetch=None, cache=None):
+        return ingest_coingecko_data(fetch=fetch, cache=cache)
+
+source = register_source(CoinGeckoSource())
+
+def ingest_coingecko_data(db: SessionLocal = None, simulate_failure_after: int = -1, fetch=None, cache: ResponseCache = None):
+    """
+    `fetch` optionally replaces the blocking fetch with a callable returning
+    (or raising) an iterable of pages. The async pipeline passes one that
+    yields pages as they arrive, so each page is validated and written while
+    the rest are still in flight. Failed pages are yielded as exceptions.
+    `cache` is the ResponseCache the fetch used; it is loaded from `db` if
+    not given and saved once the run's rows are written.
+    """
+    pages = (lambda cache: fetch()) if fetch else (lambda cache: [fetch_coingecko_data(cache)])
+    source.load(db, pages, cache, simulate_failure_after)
 
 if __name__ == "__main__":
     ingest_coingecko_data()
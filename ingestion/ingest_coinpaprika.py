@@ -1,20 +1,24 @@
 import requests
+import httpx
 import os
-from datetime import datetime
+from core.config import COINPAPRIKA_CALLS_PER_SECOND, COINPAPRIKA_BURST
 from core.database import SessionLocal
-from core.models import RawCoinPaprika, CryptoMarketData, ETLCheckpoint, ETLRun
-from schemas.ingestion import CoinPaprikaEntry
+from core.models import RawCoinPaprika
+from ingestion.sources import APISource, register_source
+from services.batch_validation import COINPAPRIKA_BATCH
 from services.resilience import RateLimiter, validation_retry
+from services import http_client
+from services.http_cache import ResponseCache, request_key
 
 # CoinPaprika Free Tier
 COINPAPRIKA_API_URL = "https://api.coinpaprika.com/v1/tickers"
 
 # Rate Limiter (CoinPaprika is generous, but let's be safe: 1 call / sec)
-rate_limiter = RateLimiter(calls_per_second=1.0)
+rate_limiter = RateLimiter(
+    calls_per_second=COINPAPRIKA_CALLS_PER_SECOND, burst=COINPAPRIKA_BURST, shared_key="coinpaprika"
+)
 
-@validation_retry()
-def fetch_coinpaprika_data():
-    rate_limiter.wait_for_token()
+def _request_args():
     params = {
         "limit": 10  # Just get top 10 for assignment
     }
@@ -24,111 +28,79 @@ def fetch_coinpaprika_data():
     api_key = os.getenv("COINPAPRIKA_API_KEY")
     if api_key:
         headers["Authorization"] = api_key 
+    return params, headers
+
+def _payload_or_unchanged(response, cache: ResponseCache = None, params: dict = None) -> list:
+    if cache is not None and cache.unchanged(request_key(COINPAPRIKA_API_URL, params), response):
+        print("CoinPaprika tickers not modified since last run")
+        return []
+    return response.json()
+
+@validation_retry()
+def fetch_coinpaprika_data(cache: ResponseCache = None):
+    rate_limiter.wait_for_token()
+    params, headers = _request_args()
+    if cache is not None:
+        headers.update(cache.conditional_headers(request_key(COINPAPRIKA_API_URL, params)))
     
     try:
-        response = requests.get(COINPAPRIKA_API_URL, params=params, headers=headers)
+        response = http_client.get("coinpaprika", COINPAPRIKA_API_URL, params=params, headers=headers)
+        rate_limiter.observe(response)
         response.raise_for_status()
-        return response.json()
+        return _payload_or_unchanged(response, cache, params)
     except requests.RequestException as e:
         print(f"Error fetching from CoinPaprika: {e}")
         raise e
 
-def ingest_coinpaprika_data(db: SessionLocal = None):
-    should_close = False
-    if db is None:
-        db = SessionLocal()
-        should_close = True
-        
-    run_log = ETLRun(source="coinpaprika_api", status="running", start_time=datetime.now())
-    db.add(run_log)
-    db.commit()
-    
-    records_processed = 0
-    source_name = "coinpaprika_api"
-    
+@validation_retry()
+async def fetch_coinpaprika_data_async(client: httpx.AsyncClient, cache: ResponseCache = None):
+    await rate_limiter.wait_for_token_async()
+    params, headers = _request_args()
+    if cache is not None:
+        headers.update(cache.conditional_headers(request_key(COINPAPRIKA_API_URL, params)))
+
     try:
-        # Checkpoint
-        checkpoint = db.query(ETLCheckpoint).filter(ETLCheckpoint.source_name == source_name).first()
-        
-        data = fetch_coinpaprika_data()
-        
-        if not data:
-            print("No data from CoinPaprika")
-            run_log.status = "success"
-            run_log.end_time = datetime.now()
-            db.commit()
-            return
+        response = await http_client.get_async("coinpaprika", COINPAPRIKA_API_URL, client=client, params=params, headers=headers)
+        rate_limiter.observe(response)
+        response.raise_for_status()
+        return _payload_or_unchanged(response, cache, params)
+    except httpx.HTTPError as e:
+        print(f"Error fetching from CoinPaprika: {e}")
+        raise e
+
+class CoinPaprikaSource(APISource):
+    name = "coinpaprika_api"
+    label = "CoinPaprika"
+    cache_source = "coinpaprika"
+    raw_model = RawCoinPaprika
+    batch = COINPAPRIKA_BATCH
+
+    def fetch(self, client, cache):
+        return fetch_coinpaprika_data_async(client, cache=cache)
+
+    def transform(self, validated, entry):
+        raw = {"coin_id": validated.id, "data": entry}
+        row = {
+            "symbol": validated.symbol,
+            "price_usd": validated.price_usd,
+            "market_cap": validated.market_cap,
+            "volume_24h": validated.volume_24h,
+            "recorded_at": validated.timestamp,
+        }
+        return raw, row, validated.last_updated
+
+    def ingest(self, fetch=None, cache=None):
+        return ingest_coinpaprika_data(fetch=fetch, cache=cache)
 
-        print(f"Fetched {len(data)} records from CoinPaprika")
-        
-        for entry in data:
-            try:
-                validated = CoinPaprikaEntry(**entry)
-            except Exception as e:
-                print(f"Skipping invalid CoinPaprika entry: {e}")
-                continue
-            
-            # Raw Insert
-            raw = RawCoinPaprika(
-                coin_id=validated.id,
-                data=entry
-            )
-            db.add(raw)
-            
-            # Idempotency Check
-            record_time = validated.timestamp
-            
-            # Check against checkpoint
-            if checkpoint and checkpoint.last_processed_at and record_time <= checkpoint.last_processed_at:
-                continue
+source = register_source(CoinPaprikaSource())
 
-            # Check normalized existence
-            exists = db.query(CryptoMarketData).filter(
-                CryptoMarketData.symbol == validated.symbol,
-                CryptoMarketData.source == source_name,
-                CryptoMarketData.recorded_at == record_time
-            ).first()
-            
-            if exists:
-                continue
-                
-            normalized = CryptoMarketData(
-                symbol=validated.symbol,
-                price_usd=validated.price_usd,
-                market_cap=validated.market_cap,
-                volume_24h=validated.volume_24h,
-                recorded_at=record_time,
-                source=source_name
-            )
-            
-            try:
-                db.add(normalized)
-                db.commit()
-                records_processed += 1
-            except Exception:
-                db.rollback()
-        
-        # Update Checkpoint
-        if records_processed > 0:
-            if not checkpoint:
-                checkpoint = ETLCheckpoint(source_name=source_name, last_processed_at=datetime.now())
-                db.add(checkpoint)
-            else:
-                checkpoint.last_processed_at = datetime.now()
-            db.commit()
-            
-        run_log.status = "success"
-        run_log.records_processed = records_processed
-        
-    except Exception as e:
-        run_log.status = "failed"
-        run_log.error_message = str(e)
-        print(f"CoinPaprika ETL Failed: {e}")
-    finally:
-        run_log.end_time = datetime.now()
-        db.commit()
-        if should_close:
-            db.close()
+def ingest_coinpaprika_data(db: SessionLocal = None, fetch=None, cache: ResponseCache = None):
+    """
+    `fetch` optionally replaces the blocking fetch with a callable returning
+    (or raising) an already fetched payload, e.g. from the async pipeline.
+    `cache` is the ResponseCache the fetch used (loaded from `db` if not given).
+    """
+    source.load(db, lambda cache: [fetch() if fetch else fetch_coinpaprika_data(cache)], cache)
 
 if __name__ == "__main__":
     ingest_coinpaprika_data()
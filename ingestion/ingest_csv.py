@@ -1,113 +1,85 @@
-import pandas as pd
-from datetime import datetime
+from core.config import CSV_DROP_PATHS
 from core.database import SessionLocal
-from core.models import RawCSVUpload, CryptoMarketData, ETLCheckpoint, ETLRun
+from ingestion.sources import FileSource, register_source
+from core.models import RawCSVUpload
 from schemas.ingestion import CSVEntry
-from services.drift_detection import detect_schema_drift
+from services.frame_validation import validate_csv_frame
 
-def ingest_csv_data(filepath, db: SessionLocal = None):
-    should_close = False
-    if db is None:
-        db = SessionLocal()
-        should_close = True
-    
-    run_log = ETLRun(source=filepath, status="running", start_time=datetime.now())
-    db.add(run_log)
-    db.commit()
+# Set-based merge for the COPY path: type/validate staged text columns once,
+# then land them in the raw and normalized tables (bumping the row counters).
+COPY_MERGE_SQL = [
+    """
+    CREATE TEMP TABLE stg_csv_valid ON COMMIT DROP AS
+    SELECT * FROM (
+        SELECT upper(symbol) AS symbol,
+               pg_temp.etl_to_float(price) AS price,
+               pg_temp.etl_to_float(volume) AS volume,
+               pg_temp.etl_to_timestamp("timestamp") AS "timestamp",
+               source
+        FROM stg_csv_upload
+    ) typed
+    WHERE symbol IS NOT NULL AND price IS NOT NULL AND volume IS NOT NULL
+      AND "timestamp" IS NOT NULL AND source IS NOT NULL
+    """,
+    """
+    INSERT INTO raw_csv_uploads (filename, symbol, price, volume, "timestamp", source)
+    SELECT :filename, symbol, price, volume, "timestamp", source FROM stg_csv_valid
+    """,
+    """
+    WITH inserted AS (
+        INSERT INTO crypto_market_data (symbol, price_usd, market_cap, volume_24h, recorded_at, source)
+        SELECT symbol, price, NULL, volume, "timestamp", 'csv_upload' FROM stg_csv_valid
+        ON CONFLICT (symbol, recorded_at, source) DO NOTHING
+        RETURNING symbol, source
+    ), counted AS (
+        INSERT INTO market_data_counts (symbol, source, row_count)
+        SELECT symbol, source, count(*) FROM inserted GROUP BY symbol, source ORDER BY symbol, source
+        ON CONFLICT (symbol, source) DO UPDATE SET row_count = market_data_counts.row_count + EXCLUDED.row_count
+    )
+    SELECT count(*) FROM inserted
+    """,
+]
 
-    records_processed = 0
-    try:
-        # Checkpoint check
-        checkpoint = db.query(ETLCheckpoint).filter(ETLCheckpoint.source_name == filepath).first()
-        
-        if checkpoint:
-            print(f"File {filepath} already processed. Skipping.")
-            run_log.status = "skipped"
-            return # finally block will commit
+class CSVFilesSource(FileSource):
+    name = "csv_files"
+    group = "files"
+    default_paths = ("crypto_data.csv", *CSV_DROP_PATHS)
+    max_concurrency = 4
+    label = "CSV"
+    entry_schema = CSVEntry
+    raw_model = RawCSVUpload
+    market_source = "csv_upload"
+    staging_table = "stg_csv_upload"
+    merge_sql = COPY_MERGE_SQL
 
-        try:
-            df = pd.read_csv(filepath)
-            print(f"Read {len(df)} rows from {filepath}")
-            
-            # Check for Drift
-            expected_cols = list(CSVEntry.__fields__.keys())
-            drift_report = detect_schema_drift(expected_cols, list(df.columns))
-            
-            if drift_report["drift_detected"]:
-                print(f"WARNING: Schema Drift Detected in {filepath}")
-                if drift_report["matches"]:
-                    for match in drift_report["matches"]:
-                        msg = f"Potential rename: '{match['expected']}' -> '{match['actual']}' (conf: {match['confidence']})"
-                        print(msg)
-                        run_log.error_message = (run_log.error_message or "") + msg + "; "
-                
-                if drift_report["missing"] and not drift_report["matches"]:
-                     msg = f"Missing columns: {drift_report['missing']}"
-                     print(msg)
-                     run_log.error_message = (run_log.error_message or "") + msg + "; "
-            
-        except FileNotFoundError:
-            print(f"File not found: {filepath}")
-            run_log.status = "failed"
-            run_log.error_message = "File not found"
-            return
+    def ingest_file(self, path):
+        ingest_csv_data(path)
 
-        for _, row in df.iterrows():
-            try:
-                row_dict = row.to_dict()
-                validated_data = CSVEntry(**row_dict)
-            except Exception as e:
-                 print(f"Skipping invalid CSV row: {e}")
-                 continue
+    def validate_frame(self, frame):
+        return validate_csv_frame(frame)
 
-            raw_record = RawCSVUpload(
-                filename=filepath,
-                symbol=validated_data.symbol,
-                price=validated_data.price,
-                volume=validated_data.volume,
-                timestamp=validated_data.timestamp,
-                source=validated_data.source
-            )
-            db.add(raw_record)
+    def transform(self, row, filepath):
+        raw = dict(
+            filename=filepath,
+            symbol=row.symbol,
+            price=row.price,
+            volume=row.volume,
+            timestamp=row.timestamp,
+            source=row.source
+        )
+        market_row = dict(
+            symbol=row.symbol,
+            price_usd=row.price,
+            market_cap=None,
+            volume_24h=row.volume,
+            recorded_at=row.timestamp
+        )
+        return raw, market_row
 
-            normalized_record = CryptoMarketData(
-                symbol=validated_data.symbol,
-                price_usd=validated_data.price,
-                market_cap=None, 
-                volume_24h=validated_data.volume,
-                recorded_at=validated_data.timestamp,
-                source="csv_upload"
-            )
-            
-            try:
-                db.add(normalized_record)
-                db.commit()
-                records_processed += 1
-            except Exception:
-                db.rollback()
+csv_files = register_source(CSVFilesSource())
 
-        if records_processed > 0:
-            db.add(ETLCheckpoint(source_name=filepath, last_processed_at=datetime.now()))
-            try:
-                db.commit()
-                print(f"Successfully processed {records_processed} records from {filepath}")
-            except Exception as e:
-                 print(f"Error saving checkpoint: {e}")
-        
-        run_log.status = "success"
-        run_log.records_processed = records_processed
-
-    except Exception as e:
-        run_log.status = "failed"
-        run_log.error_message = str(e)
-    finally:
-        run_log.end_time = datetime.now()
-        try:
-            db.commit()
-        except:
-            pass
-        if should_close:
-            db.close()
+def ingest_csv_data(filepath, db: SessionLocal = None, mode: str = None):
+    csv_files.load_file(filepath, db=db, mode=mode)
 
 if __name__ == "__main__":
     ingest_csv_data("crypto_data.csv")
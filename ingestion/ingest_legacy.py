@@ -1,91 +1,85 @@
-import pandas as pd
-from datetime import datetime
 from core.database import SessionLocal
-from core.models import RawLegacyUpload, CryptoMarketData, ETLCheckpoint, ETLRun
+from ingestion.sources import FileSource, register_source
+from core.models import RawLegacyUpload
 from schemas.ingestion import LegacyCSVEntry
+from services.frame_validation import validate_legacy_frame
 
-def ingest_legacy_data(filepath, db: SessionLocal = None):
-    should_close = False
-    if db is None:
-        db = SessionLocal()
-        should_close = True
-    
-    run_log = ETLRun(source=filepath, status="running", start_time=datetime.now())
-    db.add(run_log)
-    db.commit()
+# Set-based merge for the COPY path. Unparseable dates fall back to the load
+# time, matching LegacyCSVEntry.get_timestamp(). Colons in the date format are
+# escaped so SQLAlchemy does not read them as bind parameters.
+COPY_MERGE_SQL = [
+    """
+    CREATE TEMP TABLE stg_legacy_valid ON COMMIT DROP AS
+    SELECT * FROM (
+        SELECT upper("Ticker") AS ticker,
+               pg_temp.etl_to_float("LastPrice") AS last_price,
+               pg_temp.etl_to_float("Vol") AS vol,
+               "RecordedDate" AS recorded_date,
+               COALESCE(pg_temp.etl_to_timestamp("RecordedDate", 'DD-MM-YYYY HH24\\:MI\\:SS'), LOCALTIMESTAMP) AS recorded_at
+        FROM stg_legacy_upload
+    ) typed
+    WHERE ticker IS NOT NULL AND last_price IS NOT NULL AND vol IS NOT NULL
+      AND recorded_date IS NOT NULL
+    """,
+    """
+    INSERT INTO raw_legacy_uploads (filename, ticker, last_price, vol, recorded_date)
+    SELECT :filename, ticker, last_price, vol, recorded_date FROM stg_legacy_valid
+    """,
+    """
+    WITH inserted AS (
+        INSERT INTO crypto_market_data (symbol, price_usd, market_cap, volume_24h, recorded_at, source)
+        SELECT ticker, last_price, NULL, vol, recorded_at, 'legacy_csv' FROM stg_legacy_valid
+        ON CONFLICT (symbol, recorded_at, source) DO NOTHING
+        RETURNING symbol, source
+    ), counted AS (
+        INSERT INTO market_data_counts (symbol, source, row_count)
+        SELECT symbol, source, count(*) FROM inserted GROUP BY symbol, source ORDER BY symbol, source
+        ON CONFLICT (symbol, source) DO UPDATE SET row_count = market_data_counts.row_count + EXCLUDED.row_count
+    )
+    SELECT count(*) FROM inserted
+    """,
+]
 
-    records_processed = 0
-    try:
-        # Checkpoint check
-        checkpoint = db.query(ETLCheckpoint).filter(ETLCheckpoint.source_name == filepath).first()
-        if checkpoint:
-            print(f"Legacy File {filepath} already processed. Skipping.")
-            run_log.status = "skipped"
-            return
+class LegacyFilesSource(FileSource):
+    name = "legacy_files"
+    group = "files"
+    default_paths = ("legacy_crypto_data.csv",)
+    max_concurrency = 4
+    label = "Legacy CSV"
+    entry_schema = LegacyCSVEntry
+    raw_model = RawLegacyUpload
+    market_source = "legacy_csv"
+    staging_table = "stg_legacy_upload"
+    merge_sql = COPY_MERGE_SQL
+    report_drift = False
 
-        try:
-            df = pd.read_csv(filepath)
-            print(f"Read {len(df)} rows from {filepath}")
-        except FileNotFoundError:
-            print(f"File not found: {filepath}")
-            run_log.status = "failed"
-            return
+    def ingest_file(self, path):
+        ingest_legacy_data(path)
 
-        for _, row in df.iterrows():
-            try:
-                row_dict = row.to_dict()
-                validated_data = LegacyCSVEntry(**row_dict)
-            except Exception as e:
-                 print(f"Skipping invalid Legacy CSV row: {e}")
-                 continue
+    def validate_frame(self, frame):
+        return validate_legacy_frame(frame)
 
-            raw_record = RawLegacyUpload(
-                filename=filepath,
-                ticker=validated_data.Ticker,
-                last_price=validated_data.LastPrice,
-                vol=validated_data.Vol,
-                recorded_date=validated_data.RecordedDate
-            )
-            db.add(raw_record)
+    def transform(self, row, filepath):
+        raw = dict(
+            filename=filepath,
+            ticker=row.Ticker,
+            last_price=row.LastPrice,
+            vol=row.Vol,
+            recorded_date=row.RecordedDate
+        )
+        market_row = dict(
+            symbol=row.Ticker,
+            price_usd=row.LastPrice,
+            market_cap=None,
+            volume_24h=row.Vol,
+            recorded_at=row.recorded_at
+        )
+        return raw, market_row
 
-            normalized_record = CryptoMarketData(
-                symbol=validated_data.Ticker,   
-                price_usd=validated_data.LastPrice, 
-                market_cap=None,
-                volume_24h=validated_data.Vol,  
-                recorded_at=validated_data.get_timestamp(), 
-                source="legacy_csv"
-            )
-            
-            try:
-                db.add(normalized_record)
-                db.commit()
-                records_processed += 1
-            except Exception:
-                db.rollback()
+legacy_files = register_source(LegacyFilesSource())
 
-        if records_processed > 0:
-            db.add(ETLCheckpoint(source_name=filepath, last_processed_at=datetime.now()))
-            try:
-                db.commit()
-                print(f"Successfully processed {records_processed} legacy records.")
-            except Exception:
-                pass
-        
-        run_log.status = "success"
-        run_log.records_processed = records_processed
-
-    except Exception as e:
-        run_log.status = "failed"
-        run_log.error_message = str(e)
-    finally:
-        run_log.end_time = datetime.now()
-        try:
-            db.commit()
-        except:
-            pass
-        if should_close:
-            db.close()
+def ingest_legacy_data(filepath, db: SessionLocal = None, mode: str = None):
+    legacy_files.load_file(filepath, db=db, mode=mode)
 
 if __name__ == "__main__":
     ingest_legacy_data("legacy_crypto_data.csv")
@@ -0,0 +1,132 @@
+import logging
+import os
+import socket
+import threading
+from datetime import date
+from core.config import JOB_HEARTBEAT_INTERVAL, JOB_POLL_INTERVAL, JOB_WORKER_CONCURRENCY
+from core.database import SessionLocal
+from ingestion import backfill, pipeline
+from ingestion.sources import SourceBusy
+from services import job_queue
+
+logger = logging.getLogger(__name__)
+
+
+class JobFailed(Exception):
+    """A handler failure that still has a result worth recording."""
+    def __init__(self, message: str, result: dict = None):
+        super().__init__(message)
+        self.result = result
+
+
+def _run_etl(params: dict) -> dict:
+    outcome = pipeline.run_pipeline(sources=params.get("sources"))
+    result = {source: ("ok" if error is None else str(error)) for source, error in outcome.items()}
+    # A source another runner was already running is skipped, not failed
+    failed = sorted(
+        source for source, error in outcome.items() if error is not None and not isinstance(error, SourceBusy)
+    )
+    if failed:
+        raise JobFailed(f"Sources failed: {', '.join(failed)}", result)
+    return result
+
+
+def _run_backfill(params: dict) -> dict:
+    return backfill.run_backfill(
+        params.get("coin_ids"),
+        date.fromisoformat(params["start"]),
+        date.fromisoformat(params["end"]),
+        params.get("chunk_days"),
+        top=params.get("top")
+    )
+
+
+# kind -> handler(params) returning a JSON-serializable result
+JOB_HANDLERS = {
+    "etl": _run_etl,
+    "backfill": _run_backfill,
+}
+
+
+def _heartbeat(job_id: int, worker_id: str, stop: threading.Event):
+    """Refreshes a running job's heartbeat until `stop` is set."""
+    while not stop.wait(JOB_HEARTBEAT_INTERVAL):
+        db = SessionLocal()
+        try:
+            if not job_queue.heartbeat(db, job_id, worker_id):
+                logger.warning(f"Job {job_id} is no longer held by {worker_id}")
+                return
+        except Exception as e:
+            logger.warning(f"Heartbeat for job {job_id} failed: {e}")
+        finally:
+            db.close()
+
+
+def run_job(db, job) -> bool:
+    """
+    Runs a claimed job and records its outcome, heartbeating while it runs.
+    Returns True on success.
+    """
+    handler = JOB_HANDLERS.get(job.kind)
+    if handler is None:
+        job_queue.finish(db, job, error=f"Unknown job kind: {job.kind}")
+        return False
+    logger.info(f"Starting job {job.id} ({job.kind})")
+    stop = threading.Event()
+    beat = threading.Thread(target=_heartbeat, args=(job.id, job.worker_id, stop), daemon=True)
+    beat.start()
+    try:
+        result = handler(job.params or {})
+    except Exception as e:
+        logger.error(f"Job {job.id} failed: {e}")
+        db.rollback()
+        job_queue.finish(db, job, result=getattr(e, "result", None), error=str(e))
+        return False
+    finally:
+        stop.set()
+        beat.join()
+    job_queue.finish(db, job, result=result)
+    logger.info(f"Job {job.id} succeeded")
+    return True
+
+
+def work(worker_id: str, poll_interval: float = None, once: bool = False, stop: threading.Event = None):
+    """
+    Claims and runs jobs until `stop` is set. Every poll first requeues jobs
+    whose worker stopped heartbeating. With `once`, returns as soon as the
+    queue is empty.
+    """
+    poll_interval = JOB_POLL_INTERVAL if poll_interval is None else poll_interval
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        db = SessionLocal()
+        try:
+            job_queue.requeue_stale(db)
+            job = job_queue.claim_next(db, worker_id)
+            if job is not None:
+                run_job(db, job)
+                continue
+        except Exception as e:
+            logger.error(f"Worker {worker_id} error: {e}")
+        finally:
+            db.close()
+        if once:
+            break
+        stop.wait(poll_interval)
+    pipeline.close_pipeline_loop()
+
+
+def run_worker_pool(concurrency: int = None, once: bool = False, stop: threading.Event = None):
+    """
+    Services the job queue with `concurrency` worker threads in this process.
+    """
+    concurrency = concurrency or JOB_WORKER_CONCURRENCY
+    prefix = f"{socket.gethostname()}:{os.getpid()}"
+    threads = [
+        threading.Thread(target=work, args=(f"{prefix}:{i}",), kwargs={"once": once, "stop": stop}, daemon=True)
+        for i in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
@@ -0,0 +1,121 @@
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from core.config import (
+    SCHEDULE_COINGECKO_SECONDS, SCHEDULE_COINPAPRIKA_SECONDS, SCHEDULE_FILES_SECONDS, SCHEDULE_JITTER
+)
+from core.database import SessionLocal
+from core.models import ETLCheckpoint
+from ingestion import pipeline
+from ingestion.sources import SourceBusy
+from services.leases import lease
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_PREFIX = "schedule:"
+
+
+@dataclass
+class SourceSchedule:
+    name: str
+    interval: float
+    jitter: float = SCHEDULE_JITTER
+
+    def next_delay(self) -> float:
+        """Seconds until the next attempt, spread by +/- jitter so replicas drift apart."""
+        return max(0.0, self.interval * (1 + random.uniform(-self.jitter, self.jitter)))
+
+
+def default_schedules() -> list:
+    schedules = [
+        SourceSchedule("coingecko_api", SCHEDULE_COINGECKO_SECONDS),
+        SourceSchedule("coinpaprika_api", SCHEDULE_COINPAPRIKA_SECONDS),
+        SourceSchedule("files", SCHEDULE_FILES_SECONDS),
+    ]
+    # A non-positive interval disables the source
+    return [schedule for schedule in schedules if schedule.interval > 0]
+
+
+def _last_run(db, name: str):
+    checkpoint = db.query(ETLCheckpoint).filter(ETLCheckpoint.source_name == CHECKPOINT_PREFIX + name).first()
+    return checkpoint, (checkpoint.last_processed_at if checkpoint else None)
+
+
+def run_scheduled(schedule: SourceSchedule, runner=None) -> str:
+    """
+    Runs one source if it is due and no other replica is running it.
+    The lease makes the run exclusive cluster-wide; the `schedule:<name>`
+    checkpoint records when it last finished, so a replica that gets the
+    lease right after another one finished does not run it again.
+    Returns "ran", "failed", "busy" or "not_due".
+    """
+    runner = runner or (lambda name: pipeline.run_pipeline(sources=[name]))
+    with lease(CHECKPOINT_PREFIX + schedule.name) as acquired:
+        if not acquired:
+            return "busy"
+
+        db = SessionLocal()
+        try:
+            _, last_run = _last_run(db, schedule.name)
+            min_gap = timedelta(seconds=schedule.interval * (1 - schedule.jitter))
+            if last_run is not None and datetime.now() - last_run < min_gap:
+                return "not_due"
+        finally:
+            db.close()
+
+        outcome = runner(schedule.name) or {}
+        errors = {
+            source: str(error) for source, error in outcome.items()
+            if error is not None and not isinstance(error, SourceBusy)
+        }
+
+        db = SessionLocal()
+        try:
+            checkpoint, _ = _last_run(db, schedule.name)
+            if checkpoint is None:
+                checkpoint = ETLCheckpoint(source_name=CHECKPOINT_PREFIX + schedule.name)
+                db.add(checkpoint)
+            checkpoint.last_processed_at = datetime.now()
+            checkpoint.meta_data = {"errors": errors}
+            db.commit()
+        finally:
+            db.close()
+        return "failed" if errors else "ran"
+
+
+class Scheduler:
+    """
+    Runs each source on its own interval, every source in its own thread so
+    a slow file load never delays the minute-level API polls.
+    """
+    def __init__(self, schedules: list = None):
+        self.schedules = default_schedules() if schedules is None else schedules
+        self.stop = threading.Event()
+        self._threads = []
+
+    def _loop(self, schedule: SourceSchedule):
+        # The first attempt is immediate; the checkpoint skips it if a replica ran recently
+        while not self.stop.is_set():
+            try:
+                status = run_scheduled(schedule)
+                logger.info(f"Scheduled {schedule.name}: {status}")
+            except Exception as e:
+                logger.error(f"Scheduled {schedule.name} error: {e}")
+            self.stop.wait(schedule.next_delay())
+        pipeline.close_pipeline_loop()
+
+    def start(self) -> "Scheduler":
+        for schedule in self.schedules:
+            thread = threading.Thread(target=self._loop, args=(schedule,), name=f"schedule-{schedule.name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def shutdown(self, timeout: float = None):
+        self.stop.set()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
@@ -1,9 +1,5 @@
-import time
-from core.database import engine, Base, init_db, SessionLocal
-from ingestion.ingest_api import ingest_coingecko_data
-from ingestion.ingest_csv import ingest_csv_data
-from ingestion.ingest_legacy import ingest_legacy_data
-from ingestion.ingest_coinpaprika import ingest_coinpaprika_data
+from core.database import init_db
+from ingestion.pipeline import close_pipeline_loop, run_pipeline
 
 def main():
     print("Starting ETL Pipeline...")
@@ -12,24 +8,13 @@ def main():
     print("Initializing Database...")
     init_db()
     
-    db = SessionLocal()
+    # CoinGecko, CoinPaprika and the CSV files run concurrently
+    print("Running all sources concurrently...")
     try:
-        # Run API Ingestion
-        print("Starting CoinGecko Ingestion...")
-        ingest_coingecko_data(db=db)
-        
-        print("Starting CoinPaprika Ingestion...")
-        ingest_coinpaprika_data(db=db)
+        run_pipeline()
     finally:
-        db.close()
-    
-    print("Starting CSV Ingestion...")
-    print("\n--- Running CSV Ingestion ---")
-    ingest_csv_data("crypto_data.csv")
-
-    # Run Legacy CSV Ingestion
-    print("\n--- Running Legacy CSV Ingestion ---")
-    ingest_legacy_data("legacy_crypto_data.csv")
+        # Closes the pooled HTTP clients and the runner's event loop
+        close_pipeline_loop()
     
     print("\nETL Pipeline Completed.")
 
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
-from datetime import datetime
+from datetime import date, datetime
 
 class HealthCheck(BaseModel):
     status: str
@@ -21,7 +21,9 @@ class CryptoData(BaseModel):
 class PaginationResponse(BaseModel):
     page: int
     limit: int
-    total: int
+    total: Optional[int]  # None when requested with total=none
+    total_mode: str = "exact"  # how total was obtained: exact | approx | none
+    next_cursor: Optional[str] = None  # pass as ?cursor= for the next page; None on the last page
 
 class CryptoDataResponse(BaseModel):
     request_id: str
@@ -53,3 +55,27 @@ class ComparisonReport(BaseModel):
 class ComparisonResponse(BaseModel):
     anomalies_detected: int
     reports: List[ComparisonReport]
+
+class BackfillRequest(BaseModel):
+    start: date
+    end: date
+    coin_ids: List[str] = []
+    top: Optional[int] = Field(default=None, gt=0)  # also backfill the top-N coins by market cap
+    chunk_days: Optional[int] = Field(default=None, gt=0)
+
+class ETLJobResponse(BaseModel):
+    id: int
+    kind: str
+    status: str
+    params: Optional[dict]
+    result: Optional[dict]
+    error_message: Optional[str]
+    attempts: int
+    worker_id: Optional[str]
+    created_at: Optional[datetime]
+    started_at: Optional[datetime]
+    heartbeat_at: Optional[datetime] = None
+    finished_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
@@ -1,49 +1,55 @@
-from pydantic import BaseModel, HttpUrl, validator
-from typing import Optional
+from functools import cached_property
+from pydantic import BaseModel, HttpUrl, StringConstraints, validator
+from typing import Annotated, Optional
 from datetime import datetime
 
+# Uppercased inside pydantic-core, so batch validation of API payloads does not
+# call back into Python for every entry
+UpperStr = Annotated[str, StringConstraints(to_upper=True)]
+
 class CoinGeckoEntry(BaseModel):
     id: str
-    symbol: str
+    symbol: UpperStr
     name: str
     current_price: float
     market_cap: Optional[float]
     total_volume: Optional[float]
     last_updated: Optional[datetime]
 
-    @validator('symbol')
-    def uppercase_symbol(cls, v):
-        return v.upper()
-
 class CoinPaprikaEntry(BaseModel):
     id: str
-    symbol: str
+    symbol: UpperStr
     name: str
     quotes: dict
     last_updated: Optional[str]
 
-    @validator('symbol')
-    def uppercase_symbol(cls, v):
-        return v.upper()
-    
-    @property
+    # Derived fields are computed on first access and cached on the instance
+    @cached_property
+    def usd_quote(self) -> dict:
+        return self.quotes.get("USD", {})
+
+    @cached_property
     def price_usd(self) -> float:
-        return self.quotes.get("USD", {}).get("price", 0.0)
+        return self.usd_quote.get("price", 0.0)
     
-    @property
+    @cached_property
     def volume_24h(self) -> float:
-        return self.quotes.get("USD", {}).get("volume_24h", 0.0)
+        return self.usd_quote.get("volume_24h", 0.0)
     
-    @property
+    @cached_property
     def market_cap(self) -> float:
-        return self.quotes.get("USD", {}).get("market_cap", 0.0)
+        return self.usd_quote.get("market_cap", 0.0)
     
-    @property
+    @cached_property
     def timestamp(self) -> datetime:
         if self.last_updated:
             try:
                 # Format: 2018-06-12T13:41:00Z
-                return datetime.strptime(self.last_updated, "%Y-%m-%dT%H:%M:%SZ")
+                value = self.last_updated
+                if len(value) == 20 and value[10] == "T" and value[19] == "Z":
+                    # Canonical form: C-level parse instead of strptime
+                    return datetime.fromisoformat(value[:19])
+                return datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ")
             except ValueError:
                 return datetime.now()
         return datetime.now()
@@ -0,0 +1,46 @@
+from typing import Annotated, List
+from pydantic import TypeAdapter, ValidationError, WrapValidator
+from schemas.ingestion import CoinGeckoEntry, CoinPaprikaEntry
+
+
+def _keep_error(value, handler):
+    try:
+        return handler(value)
+    except ValidationError as e:
+        return e
+
+
+def batch_adapter(model) -> TypeAdapter:
+    """
+    Compiled validator for a list of `model`. An invalid entry is returned in
+    place as its ValidationError instead of failing the whole list, so one
+    call validates a full payload and only bad entries raise internally.
+    """
+    return TypeAdapter(List[Annotated[model, WrapValidator(_keep_error)]])
+
+
+COINGECKO_BATCH = batch_adapter(CoinGeckoEntry)
+COINPAPRIKA_BATCH = batch_adapter(CoinPaprikaEntry)
+
+
+def validate_batch(adapter: TypeAdapter, items: list) -> tuple:
+    """
+    Validates a whole payload with a `batch_adapter`.
+    Returns (valid, errors): valid is [(index, model)] in payload order,
+    errors is [(index, ValidationError)] for the rejected entries.
+    Raises ValidationError if `items` is not a list at all.
+    """
+    valid, errors = [], []
+    for idx, result in enumerate(adapter.validate_python(items)):
+        if isinstance(result, ValidationError):
+            errors.append((idx, result))
+        else:
+            valid.append((idx, result))
+    return valid, errors
+
+
+def describe_errors(error: ValidationError) -> str:
+    """Compact one-line form of an entry's validation error for logs."""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc']) or 'entry'}: {e['msg']}" for e in error.errors()
+    )
@@ -0,0 +1,170 @@
+from collections import Counter
+from sqlalchemy import insert as generic_insert
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from core.config import ETL_BATCH_SIZE
+from core.models import CryptoMarketData
+from services.row_counts import add_counts
+
+# Natural keys used for ON CONFLICT handling. Tables not listed here (the raw
+# landing tables) have no natural key and are written with a plain INSERT.
+CONFLICT_KEYS = {
+    CryptoMarketData: ("symbol", "recorded_at", "source"),
+}
+
+# Keyed tables whose inserted rows are tallied into MarketDataCount, by these
+# columns, in the same transaction (not in on_conflict="update" mode, where
+# written rows include updates)
+COUNTED_TABLES = {
+    CryptoMarketData: ("symbol", "source"),
+}
+
+# Stay well below the bind-parameter limits (SQLite 32766, Postgres 65535)
+MAX_PARAMS_PER_STATEMENT = 30000
+
+
+def _dialect_insert(dialect_name: str):
+    """
+    Returns the dialect-specific `insert` construct supporting ON CONFLICT,
+    or None if the backend has no native upsert.
+    """
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    return None
+
+
+class BulkWriter:
+    """
+    Buffers rows per table and flushes them as multi-row INSERT statements.
+
+    Rows of tables with a natural key (see CONFLICT_KEYS) are written with
+    `INSERT ... ON CONFLICT DO NOTHING` (or `DO UPDATE` when on_conflict="update"),
+    so duplicates are resolved by the database instead of by a per-row
+    commit/rollback. `inserted` and `skipped` count keyed rows only.
+    Rows inserted into COUNTED_TABLES also bump their row counters.
+    """
+    def __init__(self, db, batch_size: int = None, on_conflict: str = "nothing", autocommit: bool = True):
+        if on_conflict not in ("nothing", "update"):
+            raise ValueError(f"Unsupported on_conflict mode: {on_conflict}")
+        self.db = db
+        self.batch_size = batch_size or ETL_BATCH_SIZE
+        self.on_conflict = on_conflict
+        self.autocommit = autocommit
+        self.inserted = 0
+        self.skipped = 0
+        self._plain = {}   # model -> [row, ...]
+        self._keyed = {}   # model -> {key: row}
+
+    @property
+    def pending(self) -> int:
+        return sum(len(rows) for rows in self._plain.values()) + \
+            sum(len(rows) for rows in self._keyed.values())
+
+    def add(self, model, **values) -> bool:
+        """
+        Queues a row for `model`. Returns False if the row duplicates the key
+        of a row already buffered (it then counts as skipped).
+        """
+        key_cols = CONFLICT_KEYS.get(model)
+        if key_cols is None:
+            self._plain.setdefault(model, []).append(values)
+        else:
+            buffer = self._keyed.setdefault(model, {})
+            key = tuple(values[col] for col in key_cols)
+            if key in buffer:
+                self.skipped += 1
+                if self.on_conflict == "update":
+                    buffer[key] = values
+                return False
+            buffer[key] = values
+
+        if self.pending >= self.batch_size:
+            self.flush()
+        return True
+
+    def flush(self, commit: bool = None):
+        """
+        Writes all buffered rows. Raw tables are written before keyed tables so
+        a batch lands in the same order it was read. Commits unless the writer
+        was created with autocommit=False (or commit=False is passed).
+        """
+        if commit is None:
+            commit = self.autocommit
+        if self.pending:
+            try:
+                for model, rows in self._plain.items():
+                    self._execute(model, rows, None)
+                counts = Counter()
+                for model, buffer in self._keyed.items():
+                    rows = list(buffer.values())
+                    written = self._execute(model, rows, CONFLICT_KEYS[model], counts)
+                    self.inserted += written
+                    self.skipped += len(rows) - written
+                add_counts(self.db, counts, _dialect_insert(self.db.get_bind().dialect.name))
+            except SQLAlchemyError:
+                # Leave the session usable so the caller can record the failure
+                self.db.rollback()
+                raise
+            finally:
+                self._plain = {}
+                self._keyed = {}
+        if commit:
+            self.db.commit()
+
+    def _execute(self, model, rows, key_cols, counts: Counter = None) -> int:
+        if not rows:
+            return 0
+        columns = len(rows[0]) or 1
+        step = max(1, MAX_PARAMS_PER_STATEMENT // columns)
+        insert = _dialect_insert(self.db.get_bind().dialect.name)
+        count_cols = COUNTED_TABLES.get(model) if self.on_conflict == "nothing" and counts is not None else None
+
+        if key_cols and insert is None:
+            return self._execute_fallback(model, rows, count_cols, counts)
+
+        written = 0
+        for start in range(0, len(rows), step):
+            chunk = rows[start:start + step]
+            if key_cols:
+                stmt = insert(model).values(chunk)
+                if self.on_conflict == "update":
+                    update_cols = [c for c in chunk[0] if c not in key_cols]
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=list(key_cols),
+                        set_={c: stmt.excluded[c] for c in update_cols}
+                    )
+                else:
+                    stmt = stmt.on_conflict_do_nothing(index_elements=list(key_cols))
+                if count_cols:
+                    # Only the rows actually inserted come back
+                    stmt = stmt.returning(*(model.__table__.c[col] for col in count_cols))
+            else:
+                stmt = generic_insert(model).values(chunk)
+            result = self.db.execute(stmt)
+            if count_cols:
+                returned = [tuple(row) for row in result]
+                counts.update(returned)
+                written += len(returned)
+            else:
+                written += result.rowcount if result.rowcount >= 0 else len(chunk)
+        return written
+
+    def _execute_fallback(self, model, rows, count_cols=None, counts: Counter = None) -> int:
+        """
+        Backends without ON CONFLICT support: insert row by row inside a
+        savepoint so a duplicate only rolls back itself, not the batch.
+        """
+        written = 0
+        for row in rows:
+            try:
+                with self.db.begin_nested():
+                    self.db.execute(generic_insert(model).values(row))
+                written += 1
+                if count_cols:
+                    counts[tuple(row[col] for col in count_cols)] += 1
+            except IntegrityError:
+                continue
+        return written
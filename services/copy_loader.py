@@ -0,0 +1,151 @@
+import logging
+from sqlalchemy import text
+from core.config import CSV_LOAD_MODE
+from services.csv_stream import last_record_end
+
+logger = logging.getLogger(__name__)
+
+COPY_READ_SIZE = 1024 * 1024
+
+# Cast helpers used by the set-based merge. Invalid values become NULL instead
+# of aborting the whole statement, so bad rows can be filtered out in SQL.
+_CAST_HELPERS_SQL = [
+    """
+CREATE OR REPLACE FUNCTION pg_temp.etl_to_float(v text) RETURNS double precision AS $$
+BEGIN
+    RETURN v::double precision;
+EXCEPTION WHEN others THEN
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE
+""",
+    """
+CREATE OR REPLACE FUNCTION pg_temp.etl_to_timestamp(v text, fmt text DEFAULT NULL) RETURNS timestamp AS $$
+BEGIN
+    IF fmt IS NULL THEN
+        RETURN v::timestamp;
+    END IF;
+    RETURN to_timestamp(v, fmt)::timestamp;
+EXCEPTION WHEN others THEN
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql STABLE
+""",
+]
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def use_copy_path(db, mode: str = None) -> bool:
+    """
+    Decides whether a file load should go through COPY.
+    mode: "copy" / "auto" use COPY when the backend is Postgres, "orm" never does.
+    Any other backend (e.g. SQLite in tests) always falls back to the ORM path.
+    """
+    mode = mode or CSV_LOAD_MODE
+    if mode == "orm":
+        return False
+    dialect = db.get_bind().dialect.name
+    if dialect != "postgresql":
+        if mode == "copy":
+            logger.info(f"COPY load requested but backend is {dialect}; using ORM path")
+        return False
+    return True
+
+
+def _copy_from_file(dbapi_conn, sql: str, fh):
+    cursor = dbapi_conn.cursor()
+    try:
+        if hasattr(cursor, "copy_expert"):
+            # psycopg2
+            cursor.copy_expert(sql, fh, size=COPY_READ_SIZE)
+        else:
+            # psycopg (3)
+            with cursor.copy(sql) as copy:
+                while True:
+                    data = fh.read(COPY_READ_SIZE)
+                    if not data:
+                        break
+                    copy.write(data)
+    finally:
+        cursor.close()
+
+
+class _ResumedFile:
+    """
+    File-like reader yielding the header line, then the file from its current
+    position up to byte `end`.
+    """
+    def __init__(self, fh, header: bytes, end: int):
+        self.fh = fh
+        self.header = header
+        self.end = end
+
+    def _remaining(self, size: int) -> int:
+        remaining = max(0, self.end - self.fh.tell())
+        return remaining if size is None or size < 0 else min(size, remaining)
+
+    def read(self, size: int = -1) -> bytes:
+        if self.header:
+            data, self.header = self.header, b""
+            return data
+        return self.fh.read(self._remaining(size))
+
+    def readline(self, size: int = -1) -> bytes:
+        if self.header:
+            return self.read()
+        return self.fh.readline(self._remaining(size))
+
+
+def stage_csv_file(db, filepath: str, staging_table: str, columns: list,
+                   start_offset: int = None, end_offset: int = None) -> tuple:
+    """
+    Streams `filepath` into a transaction-scoped temporary table via
+    `COPY FROM STDIN`. Every column is staged as text, in file order, so
+    validation and type coercion can happen in the set-based merge.
+    `start_offset` skips records a previous load already covered and
+    `end_offset` (a record boundary) ends the range. By default staging stops
+    at the last complete line: a final line still being written is left for
+    the next load.
+    Returns (staged rows, byte offset the file was read up to).
+    """
+    column_list = ", ".join(_quote(c) for c in columns)
+    db.execute(text(
+        f"CREATE TEMP TABLE {staging_table} ("
+        + ", ".join(f"{_quote(c)} text" for c in columns)
+        + ") ON COMMIT DROP"
+    ))
+    for statement in _CAST_HELPERS_SQL:
+        db.execute(text(statement))
+
+    dbapi_conn = db.connection().connection.dbapi_connection
+    if end_offset is None:
+        end_offset = last_record_end(filepath)
+    with open(filepath, "rb") as fh:
+        header = fh.readline()
+        if start_offset and start_offset > fh.tell():
+            fh.seek(start_offset)
+        end_offset = max(end_offset, fh.tell())
+        _copy_from_file(
+            dbapi_conn,
+            f"COPY {staging_table} ({column_list}) FROM STDIN WITH (FORMAT csv, HEADER true)",
+            _ResumedFile(fh, header, end_offset)
+        )
+
+    staged = db.execute(text(f"SELECT count(*) FROM {staging_table}")).scalar()
+    return staged, end_offset
+
+
+def merge_staged_rows(db, statements: list, params: dict = None) -> list:
+    """
+    Runs the set-based merge statements for a staged file in order and
+    returns their rowcounts (or, for a statement ending in a SELECT, its
+    single value).
+    """
+    counts = []
+    for statement in statements:
+        result = db.execute(text(statement), params or {})
+        counts.append(result.scalar() if result.returns_rows else result.rowcount)
+    return counts
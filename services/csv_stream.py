@@ -0,0 +1,142 @@
+import csv
+import io
+from dataclasses import dataclass
+import pandas as pd
+from core.config import ETL_CSV_CHUNK_SIZE
+
+
+@dataclass
+class RecordSpan:
+    start_offset: int   # byte offset of the first record in the span
+    end_offset: int     # byte offset just past the last record in the span
+    first_row: int      # 0-based data row number of the first record
+    records: int
+
+
+@dataclass
+class CSVChunk:
+    frame: pd.DataFrame
+    start_offset: int   # byte offset of the first record in the chunk
+    end_offset: int     # byte offset just past the last record in the chunk
+    first_row: int      # 0-based data row number of the first record
+
+
+def read_csv_header(filepath: str) -> tuple:
+    """
+    Returns (columns, header_bytes). Raises FileNotFoundError like pd.read_csv.
+    """
+    with open(filepath, "rb") as fh:
+        header = fh.readline()
+    columns = list(pd.read_csv(io.BytesIO(header), nrows=0).columns)
+    return columns, header
+
+
+def _field_count(line: bytes) -> int:
+    return len(next(csv.reader(io.StringIO(line.decode("utf-8", errors="replace"))), []))
+
+
+def _is_whole(record: bytes, fields: int = None) -> bool:
+    """
+    Whether a final record without a trailing newline is complete: its quotes
+    are closed and it has all of the header's `fields`. Many exports simply
+    omit the last newline; a record that is still being written usually
+    fails one of the two checks.
+    """
+    if record.count(b'"') % 2:
+        return False
+    return fields is None or _field_count(record) >= fields
+
+
+def _read_records(fh, limit: int, fields: int = None) -> list:
+    """
+    Reads up to `limit` complete CSV records as raw lines. A newline inside a
+    quoted field does not end a record (tracked by quote parity). A final
+    record without its newline is consumed if it is whole (see _is_whole);
+    one that is torn (still being written) is not: the file is left
+    positioned at its start for the next load.
+    """
+    records = []
+    pending = b""
+    in_quotes = False
+    while len(records) < limit:
+        line = fh.readline()
+        if not line.endswith(b"\n"):
+            if line and _is_whole(pending + line, fields):
+                records.append(pending + line)
+            elif line or pending:
+                fh.seek(-(len(pending) + len(line)), io.SEEK_CUR)
+            break
+        pending += line
+        if line.count(b'"') % 2:
+            in_quotes = not in_quotes
+        if not in_quotes:
+            records.append(pending)
+            pending = b""
+    return records
+
+
+def last_record_end(filepath: str, block: int = 64 * 1024) -> int:
+    """
+    Byte offset just past the file's last complete line: the end of the file
+    if its final line is whole (see _is_whole), otherwise just past the last
+    newline. Scans backwards from the end, so the cost does not depend on the
+    file size.
+    """
+    with open(filepath, "rb") as fh:
+        fields = _field_count(fh.readline())
+        size = end = fh.seek(0, io.SEEK_END)
+        while end > 0:
+            start = max(0, end - block)
+            fh.seek(start)
+            newline = fh.read(end - start).rfind(b"\n")
+            if newline != -1:
+                last = start + newline + 1
+                fh.seek(last)
+                tail = fh.read()
+                return size if tail and _is_whole(tail, fields) else last
+            end = start
+    return 0
+
+
+def iter_record_spans(filepath: str, size: int, start_offset: int = None, first_row: int = 0):
+    """
+    Splits a CSV file into byte ranges of at most `size` complete records,
+    without parsing them, for loaders that hand whole ranges to the database.
+    `start_offset` / `first_row` resume at a record boundary.
+    """
+    with open(filepath, "rb") as fh:
+        fields = _field_count(fh.readline())
+        if start_offset is not None and start_offset > fh.tell():
+            fh.seek(start_offset)
+        while True:
+            offset = fh.tell()
+            records = len(_read_records(fh, size, fields))
+            if not records:
+                break
+            yield RecordSpan(start_offset=offset, end_offset=fh.tell(), first_row=first_row, records=records)
+            first_row += records
+
+
+def iter_csv_chunks(filepath: str, chunksize: int = None, start_offset: int = None, first_row: int = 0):
+    """
+    Streams a CSV file as DataFrames of at most `chunksize` rows, so memory
+    stays bounded by the chunk size rather than the file size. Every chunk is
+    parsed with the file's header and carries the byte offsets it covers.
+    `start_offset` / `first_row` resume at a record boundary returned by a
+    previous chunk.
+    """
+    chunksize = chunksize or ETL_CSV_CHUNK_SIZE
+    with open(filepath, "rb") as fh:
+        header = fh.readline()
+        fields = _field_count(header)
+        if start_offset is not None and start_offset > fh.tell():
+            fh.seek(start_offset)
+        while True:
+            offset = fh.tell()
+            records = _read_records(fh, chunksize, fields)
+            if not records:
+                break
+            frame = pd.read_csv(io.BytesIO(header + b"".join(records)))
+            frame.index = pd.RangeIndex(first_row, first_row + len(frame))
+            yield CSVChunk(frame=frame, start_offset=offset, end_offset=fh.tell(), first_row=first_row)
+            first_row += len(frame)
@@ -0,0 +1,154 @@
+import glob
+import hashlib
+import os
+from datetime import datetime
+from core.models import ETLCheckpoint
+
+# Bytes hashed from the start of the file and from just before the resume
+# offset. Sampling keeps verification O(1) regardless of how far a load got.
+FINGERPRINT_BLOCK = 64 * 1024
+# Read size of the full-content hash of completed files
+DIGEST_BLOCK = 1024 * 1024
+
+
+def file_fingerprint(filepath: str, offset: int) -> str:
+    """
+    Fingerprint of the first `offset` bytes of a file: its leading block, the
+    block ending at `offset`, and the offset itself. If a file is replaced the
+    fingerprint of the previously ingested prefix no longer matches.
+    """
+    hasher = hashlib.sha256(str(offset).encode())
+    with open(filepath, "rb") as fh:
+        hasher.update(fh.read(min(offset, FINGERPRINT_BLOCK)))
+        tail_start = max(0, offset - FINGERPRINT_BLOCK)
+        if tail_start > 0:
+            fh.seek(tail_start)
+            hasher.update(fh.read(offset - tail_start))
+    return hasher.hexdigest()
+
+
+def file_digest(filepath: str, offset: int) -> str:
+    """SHA-256 of the first `offset` bytes of a file, streamed."""
+    hasher = hashlib.sha256()
+    remaining = offset
+    with open(filepath, "rb") as fh:
+        while remaining > 0:
+            block = fh.read(min(DIGEST_BLOCK, remaining))
+            if not block:
+                break
+            hasher.update(block)
+            remaining -= len(block)
+    return hasher.hexdigest()
+
+
+def _stat(filepath: str) -> dict:
+    stat = os.stat(filepath)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def get_file_checkpoint(db, filepath: str):
+    return db.query(ETLCheckpoint).filter(ETLCheckpoint.source_name == filepath).first()
+
+
+def file_state(checkpoint, filepath: str) -> str:
+    """
+    Classifies a file against its checkpoint:
+      "new"       - never loaded
+      "partial"   - an earlier load stopped part way through
+      "appended"  - fully loaded before, and has only grown since
+      "unchanged" - fully loaded and identical up to the end
+      "replaced"  - the previously loaded bytes no longer match
+    Raises FileNotFoundError if a checkpointed file is missing.
+    A completed file whose size or mtime changed since it was recorded is
+    verified against the full hash of its loaded bytes, so an in-place edit
+    anywhere in them (even one that keeps the size) counts as "replaced";
+    otherwise the sampled fingerprint is enough.
+    """
+    if checkpoint is None:
+        return "new"
+    meta = checkpoint.meta_data
+    if not meta:
+        # Checkpoints written before progress tracking mark finished files
+        return "unchanged"
+    offset = meta.get("offset") or 0
+    stat = _stat(filepath)
+    if offset > stat["size"] or file_fingerprint(filepath, offset) != meta.get("fingerprint"):
+        return "replaced"
+    if not meta.get("complete"):
+        return "partial"
+    touched = stat["size"] != meta.get("size") or stat["mtime_ns"] != meta.get("mtime_ns")
+    if touched and meta.get("sha256") and file_digest(filepath, offset) != meta["sha256"]:
+        return "replaced"
+    return "appended" if stat["size"] > offset else "unchanged"
+
+
+def resume_point(checkpoint, state: str) -> tuple:
+    """
+    Returns (byte_offset, rows) to continue from for a "partial" or
+    "appended" file, or (None, 0) to read it from the beginning.
+    """
+    if state not in ("partial", "appended"):
+        return None, 0
+    meta = checkpoint.meta_data
+    return meta.get("offset"), meta.get("rows", 0)
+
+
+def record_file_progress(db, checkpoint, filepath: str, offset: int, rows: int, complete: bool = False):
+    """
+    Stores the durable progress marker for a file in its ETLCheckpoint. The
+    caller commits it in the same transaction as the rows it covers. A
+    completed file also records its size, mtime and the full hash of the
+    loaded bytes (one streaming pass per completed load).
+    Returns the (possibly new) checkpoint.
+    """
+    if checkpoint is None:
+        checkpoint = ETLCheckpoint(source_name=filepath)
+        db.add(checkpoint)
+    checkpoint.last_processed_at = datetime.now()
+    meta = {
+        "offset": offset,
+        "rows": rows,
+        "fingerprint": file_fingerprint(filepath, offset),
+        "complete": complete,
+    }
+    if complete:
+        meta.update(_stat(filepath), sha256=file_digest(filepath, offset))
+    checkpoint.meta_data = meta
+    return checkpoint
+
+
+def discover_files(patterns: list, extension: str = ".csv") -> list:
+    """
+    Expands directories (every `extension` file directly inside) and glob
+    patterns into a sorted list of files. Plain paths are kept as given, even
+    if missing, so the load reports them.
+    """
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            files.extend(sorted(glob.glob(os.path.join(pattern, "*" + extension))))
+        elif glob.has_magic(pattern):
+            files.extend(sorted(path for path in glob.glob(pattern) if os.path.isfile(path)))
+        else:
+            files.append(pattern)
+    return list(dict.fromkeys(files))
+
+
+def pending_files(db, filepaths: list) -> list:
+    """
+    Files that still need loading: everything except those whose checkpoint
+    shows them fully loaded and unchanged. Checkpoints are read in one query.
+    """
+    checkpoints = {
+        checkpoint.source_name: checkpoint
+        for checkpoint in db.query(ETLCheckpoint).filter(ETLCheckpoint.source_name.in_(filepaths)).all()
+    } if filepaths else {}
+    pending = []
+    for filepath in filepaths:
+        try:
+            if file_state(checkpoints.get(filepath), filepath) == "unchanged":
+                continue
+        except FileNotFoundError:
+            continue
+        pending.append(filepath)
+    return pending
@@ -0,0 +1,125 @@
+import pandas as pd
+from pandas.api import types as ptypes
+from schemas.ingestion import CSVEntry, LegacyCSVEntry
+
+# Strings the column-wise path parses itself. Anything else (timezone offsets,
+# unix timestamps, odd separators, missing values) is handed to the Pydantic
+# model so the accepted values and error reasons stay exactly the same.
+NAIVE_ISO_DATETIME = r"^\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d{1,6})?)?)?$"
+PLAIN_NUMBER = r"^[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?$"
+LEGACY_DATE_FORMAT = "%d-%m-%Y %H:%M:%S"
+
+
+def _string_mask(col: pd.Series) -> pd.Series:
+    """Rows holding a real `str` (Pydantic does not coerce numbers or NaN to str)."""
+    if isinstance(col.dtype, pd.StringDtype):
+        return col.notna()
+    if ptypes.is_object_dtype(col):
+        return col.map(lambda v: isinstance(v, str)).astype(bool)
+    return pd.Series(False, index=col.index)
+
+
+def _float_column(col: pd.Series):
+    """Returns (values, mask) for a float field; mask marks rows parsed here."""
+    if ptypes.is_bool_dtype(col):
+        return col, pd.Series(False, index=col.index)
+    if ptypes.is_numeric_dtype(col):
+        return col.astype(float), pd.Series(True, index=col.index)
+    if not (isinstance(col.dtype, pd.StringDtype) or ptypes.is_object_dtype(col)):
+        return col, pd.Series(False, index=col.index)
+    text = col.where(_string_mask(col))
+    mask = text.str.match(PLAIN_NUMBER).fillna(False).astype(bool)
+    return pd.to_numeric(text.where(mask), errors="coerce"), mask
+
+
+def _datetime_column(col: pd.Series):
+    if not (isinstance(col.dtype, pd.StringDtype) or ptypes.is_object_dtype(col)):
+        return col, pd.Series(False, index=col.index)
+    text = col.where(_string_mask(col))
+    mask = text.str.match(NAIVE_ISO_DATETIME).fillna(False).astype(bool)
+    parsed = pd.to_datetime(text.where(mask), format="ISO8601", errors="coerce")
+    return parsed, mask & parsed.notna()
+
+
+def _validate_rows(model, df: pd.DataFrame, index) -> tuple:
+    """Per-row Pydantic validation for the rows the column-wise path left over."""
+    validated, errors = {}, []
+    for idx in index:
+        try:
+            validated[idx] = model(**df.loc[idx].to_dict())
+        except Exception as e:
+            errors.append((idx, e))
+    return validated, errors
+
+
+def _to_python_datetimes(values: pd.Series) -> pd.Series:
+    return pd.Series(list(values.dt.to_pydatetime()), index=values.index, dtype=object)
+
+
+def validate_csv_frame(df: pd.DataFrame) -> tuple:
+    """
+    Column-wise equivalent of `CSVEntry(**row)` for every row of `df`.
+    Returns (valid, errors): a frame with symbol/price/volume/timestamp/source
+    in file order, and a list of (row index, ValidationError) for rejected rows.
+    """
+    fields = list(CSVEntry.model_fields.keys())
+    if not all(f in df.columns for f in fields):
+        _, errors = _validate_rows(CSVEntry, df, df.index)
+        return pd.DataFrame(columns=fields), errors
+
+    price, price_ok = _float_column(df["price"])
+    volume, volume_ok = _float_column(df["volume"])
+    timestamp, timestamp_ok = _datetime_column(df["timestamp"])
+    clean = _string_mask(df["symbol"]) & _string_mask(df["source"]) & price_ok & volume_ok & timestamp_ok
+
+    valid = pd.DataFrame({
+        "symbol": df["symbol"][clean].str.upper(),
+        "price": price[clean],
+        "volume": volume[clean],
+        "timestamp": _to_python_datetimes(timestamp[clean]),
+        "source": df["source"][clean],
+    })
+
+    validated, errors = _validate_rows(CSVEntry, df, df.index[~clean])
+    if validated:
+        fallback = pd.DataFrame.from_dict(
+            {idx: entry.model_dump() for idx, entry in validated.items()}, orient="index"
+        )
+        valid = pd.concat([valid, fallback[fields]]).sort_index()
+    return valid, errors
+
+
+def validate_legacy_frame(df: pd.DataFrame) -> tuple:
+    """
+    Column-wise equivalent of `LegacyCSVEntry(**row)` plus `get_timestamp()`.
+    Returns (valid, errors); valid has Ticker/LastPrice/Vol/RecordedDate and a
+    parsed `recorded_at` column (load time when the date does not parse).
+    """
+    fields = list(LegacyCSVEntry.model_fields.keys())
+    columns = fields + ["recorded_at"]
+    if not all(f in df.columns for f in fields):
+        _, errors = _validate_rows(LegacyCSVEntry, df, df.index)
+        return pd.DataFrame(columns=columns), errors
+
+    last_price, price_ok = _float_column(df["LastPrice"])
+    vol, vol_ok = _float_column(df["Vol"])
+    clean = _string_mask(df["Ticker"]) & _string_mask(df["RecordedDate"]) & price_ok & vol_ok
+
+    valid = pd.DataFrame({
+        "Ticker": df["Ticker"][clean].str.upper(),
+        "LastPrice": last_price[clean],
+        "Vol": vol[clean],
+        "RecordedDate": df["RecordedDate"][clean],
+    })
+
+    validated, errors = _validate_rows(LegacyCSVEntry, df, df.index[~clean])
+    if validated:
+        fallback = pd.DataFrame.from_dict(
+            {idx: entry.model_dump() for idx, entry in validated.items()}, orient="index"
+        )
+        valid = pd.concat([valid, fallback[fields]]).sort_index()
+
+    # One vectorized parse for the whole column instead of strptime per row
+    parsed = pd.to_datetime(valid["RecordedDate"], format=LEGACY_DATE_FORMAT, errors="coerce")
+    valid["recorded_at"] = _to_python_datetimes(parsed.fillna(pd.Timestamp.now()))
+    return valid[columns], errors
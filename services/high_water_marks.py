@@ -0,0 +1,54 @@
+from datetime import datetime
+from core.models import ETLCheckpoint
+from services.key_index import normalize_time
+
+META_KEY = "high_water_marks"
+
+
+class HighWaterMarks:
+    """
+    Incremental state of an API source: for every symbol, the latest
+    `recorded_at` ingested so far (naive UTC), kept in the source's
+    ETLCheckpoint.meta_data and loaded with it in one query.
+
+    A record is new if it is later than its own symbol's mark, so a slow
+    coin never holds back (or lets through) the others, and our own clock
+    plays no part. Checkpoints written before marks existed only hold a
+    run timestamp; it is used as a floor for every symbol until the first
+    marks are saved.
+    """
+    def __init__(self, db, source: str):
+        self.db = db
+        self.source = source
+        self.checkpoint = db.query(ETLCheckpoint).filter(ETLCheckpoint.source_name == source).first()
+        meta = (self.checkpoint.meta_data if self.checkpoint else None) or {}
+        self.marks = {
+            symbol: datetime.fromisoformat(value) for symbol, value in meta.get(META_KEY, {}).items()
+        }
+        self.floor = None
+        if self.checkpoint is not None and META_KEY not in meta:
+            self.floor = normalize_time(self.checkpoint.last_processed_at)
+
+    def is_new(self, symbol: str, recorded_at: datetime) -> bool:
+        mark = self.marks.get(symbol, self.floor)
+        return mark is None or normalize_time(recorded_at) > mark
+
+    def advance(self, symbol: str, recorded_at: datetime):
+        recorded_at = normalize_time(recorded_at)
+        if symbol not in self.marks or recorded_at > self.marks[symbol]:
+            self.marks[symbol] = recorded_at
+
+    def save(self):
+        """
+        Stores the marks in the checkpoint (created on first use). Call after
+        the rows they cover are flushed; the caller commits.
+        """
+        if self.checkpoint is None:
+            self.checkpoint = ETLCheckpoint(source_name=self.source)
+            self.db.add(self.checkpoint)
+        meta = dict(self.checkpoint.meta_data or {})
+        meta[META_KEY] = {symbol: mark.isoformat() for symbol, mark in self.marks.items()}
+        # Reassign so the JSON column is flagged as modified
+        self.checkpoint.meta_data = meta
+        self.checkpoint.last_processed_at = datetime.now()
+        self.floor = None
@@ -0,0 +1,130 @@
+import hashlib
+import logging
+import threading
+from urllib.parse import urlencode
+from sqlalchemy.exc import SQLAlchemyError
+from core.config import HTTP_CACHE_ENABLED
+from core.models import HTTPCacheEntry
+
+logger = logging.getLogger(__name__)
+
+
+def request_key(url: str, params: dict = None) -> str:
+    """Cache key of a GET request (headers such as API keys are not part of it)."""
+    if not params:
+        return url
+    return url + "?" + urlencode(sorted(params.items()))
+
+
+class ResponseCache:
+    """
+    What was ingested from one API source last time: the validators (ETag,
+    Last-Modified, body hash) of every request, and the `last_updated` of
+    every entry. Fetchers use it to send conditional requests and drop
+    unchanged payloads; ingestors use it to skip unchanged entries.
+
+    Updates stay in memory until `save()`, which the ingestor calls after the
+    run's rows are written, so a failed run is fetched in full next time.
+    """
+    def __init__(self, source: str, rows: list = None, enabled: bool = True):
+        self.source = source
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._versions = {}
+        self._pending_requests = {}
+        self._pending_versions = {}
+        for row in rows or []:
+            if row.cache_key == self._entries_key:
+                self._versions = dict(row.entry_versions or {})
+            else:
+                self._requests[row.cache_key] = {
+                    "etag": row.etag, "last_modified": row.last_modified, "content_hash": row.content_hash
+                }
+
+    @property
+    def _entries_key(self) -> str:
+        return f"{self.source}:entries"
+
+    @classmethod
+    def load(cls, db, source: str) -> "ResponseCache":
+        """
+        Loads the stored state for `source`. The cache is an optimization, so
+        if it cannot be read the run simply starts with an empty one.
+        """
+        if not HTTP_CACHE_ENABLED:
+            return cls(source, enabled=False)
+        try:
+            rows = db.query(HTTPCacheEntry).filter(HTTPCacheEntry.source == source).all()
+        except SQLAlchemyError as e:
+            logger.warning(f"HTTP cache for {source} unavailable, fetching in full: {e}")
+            db.rollback()
+            rows = []
+        return cls(source, rows)
+
+    def conditional_headers(self, key: str) -> dict:
+        stored = self._requests.get(key) if self.enabled else None
+        headers = {}
+        if stored and stored["etag"]:
+            headers["If-None-Match"] = stored["etag"]
+        if stored and stored["last_modified"]:
+            headers["If-Modified-Since"] = stored["last_modified"]
+        return headers
+
+    def unchanged(self, key: str, response) -> bool:
+        """
+        True if `response` carries nothing new: a 304, or a body identical to
+        the last ingested one. Otherwise remembers its validators.
+        """
+        if not self.enabled:
+            return False
+        if response.status_code == 304:
+            return True
+        digest = hashlib.sha256(response.content).hexdigest()
+        with self._lock:
+            self._pending_requests[key] = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "content_hash": digest,
+            }
+        stored = self._requests.get(key)
+        return stored is not None and stored["content_hash"] == digest
+
+    def entry_unchanged(self, entry_id, version) -> bool:
+        """True if the entry was ingested before with the same `last_updated`."""
+        if not self.enabled or entry_id is None or version is None:
+            return False
+        return self._versions.get(entry_id) == version
+
+    def remember_entry(self, entry_id, version):
+        if self.enabled and entry_id is not None and version is not None:
+            with self._lock:
+                self._pending_versions[entry_id] = version
+
+    def save(self, db):
+        """Writes the state gathered during this run. The caller commits."""
+        if not self.enabled:
+            return
+        with self._lock:
+            pending_requests, self._pending_requests = self._pending_requests, {}
+            pending_versions, self._pending_versions = self._pending_versions, {}
+
+        for key, validators in pending_requests.items():
+            row = self._row(db, key)
+            row.etag = validators["etag"]
+            row.last_modified = validators["last_modified"]
+            row.content_hash = validators["content_hash"]
+            self._requests[key] = validators
+
+        if pending_versions:
+            self._versions.update(pending_versions)
+            row = self._row(db, self._entries_key)
+            # Reassign so the JSON column is flagged as modified
+            row.entry_versions = dict(self._versions)
+
+    def _row(self, db, key: str) -> HTTPCacheEntry:
+        row = db.query(HTTPCacheEntry).filter(HTTPCacheEntry.cache_key == key).first()
+        if row is None:
+            row = HTTPCacheEntry(source=self.source, cache_key=key)
+            db.add(row)
+        return row
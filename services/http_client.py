@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import threading
+import time
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from prometheus_client import Gauge, Histogram
+from core.config import (
+    HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_MAX_CONNECTIONS, HTTP_KEEPALIVE_EXPIRY
+)
+
+logger = logging.getLogger(__name__)
+
+# Default prometheus registry: served by the /metrics endpoint of the process making
+# the calls (worker.py on WORKER_METRICS_PORT, or the API)
+HTTP_REQUEST_SECONDS = Histogram(
+    "etl_http_request_duration_seconds",
+    "Latency of upstream API requests made by the ETL",
+    ["source", "status"]
+)
+HTTP_IN_FLIGHT = Gauge(
+    "etl_http_requests_in_flight",
+    "Upstream API requests currently in flight",
+    ["source"]
+)
+HTTP_POOL_CONNECTIONS = Gauge(
+    "etl_http_pool_connections",
+    "Connections held by a source's pooled HTTP session",
+    ["source", "state"]
+)
+
+_sessions = {}
+_async_clients = {}
+_lock = threading.Lock()
+
+
+def _timeout():
+    return (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+
+def get_session(source: str) -> requests.Session:
+    """
+    Returns the process-wide keep-alive session for `source`, creating it on
+    first use. The same pooled connections serve every page, retry and run.
+    Compression (gzip/deflate, plus br when `brotli` is installed) is
+    negotiated by requests' default Accept-Encoding.
+    """
+    with _lock:
+        session = _sessions.get(source)
+        if session is None:
+            session = requests.Session()
+            # Retries are handled by validation_retry, not by urllib3
+            adapter = HTTPAdapter(
+                pool_connections=1, pool_maxsize=HTTP_MAX_CONNECTIONS, pool_block=True, max_retries=0
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[source] = session
+        return session
+
+
+def _record_pool_stats(source: str, session: requests.Session):
+    opened = idle = 0
+    for adapter in session.adapters.values():
+        for key in list(adapter.poolmanager.pools.keys()):
+            pool = adapter.poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            opened += pool.num_connections
+            idle += sum(1 for conn in list(pool.pool.queue) if conn is not None)
+    HTTP_POOL_CONNECTIONS.labels(source, "opened").set(opened)
+    HTTP_POOL_CONNECTIONS.labels(source, "idle").set(idle)
+
+
+def _record_async_pool_stats(source: str, client: httpx.AsyncClient):
+    # httpcore's pool behind the default transport; other transports report nothing
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    if pool is None:
+        return
+    connections = list(pool.connections)
+    HTTP_POOL_CONNECTIONS.labels(source, "opened").set(len(connections))
+    HTTP_POOL_CONNECTIONS.labels(source, "idle").set(sum(1 for conn in connections if conn.is_idle()))
+
+
+def get(source: str, url: str, **kwargs) -> requests.Response:
+    """
+    GET through the source's pooled session with connect/read timeouts
+    (HTTP_CONNECT_TIMEOUT / HTTP_READ_TIMEOUT unless `timeout` is given).
+    """
+    session = get_session(source)
+    kwargs.setdefault("timeout", _timeout())
+    status = "error"
+    start = time.perf_counter()
+    HTTP_IN_FLIGHT.labels(source).inc()
+    try:
+        response = session.get(url, **kwargs)
+        status = str(getattr(response, "status_code", "unknown"))
+        return response
+    finally:
+        HTTP_IN_FLIGHT.labels(source).dec()
+        HTTP_REQUEST_SECONDS.labels(source, status).observe(time.perf_counter() - start)
+        _record_pool_stats(source, session)
+
+
+def get_async_client(source: str) -> httpx.AsyncClient:
+    """
+    Returns the pooled `httpx.AsyncClient` for `source` in the running event
+    loop. httpx connections are bound to a loop, so the client is shared by
+    every request made on that loop: the pipeline keeps one loop per runner
+    thread, so its clients (and keep-alive connections) outlive a single run.
+    Close them with `close_async_clients()` before the loop ends.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get((source, loop))
+    if client is None or client.is_closed:
+        connect, read = _timeout()
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read, connect=connect),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+            )
+        )
+        _async_clients[(source, loop)] = client
+    return client
+
+
+async def get_async(source: str, url: str, client: httpx.AsyncClient = None, **kwargs) -> httpx.Response:
+    """
+    Async counterpart of `get`, on `client` or the source's pooled client.
+    """
+    client = client or get_async_client(source)
+    status = "error"
+    start = time.perf_counter()
+    HTTP_IN_FLIGHT.labels(source).inc()
+    try:
+        response = await client.get(url, **kwargs)
+        status = str(response.status_code)
+        return response
+    finally:
+        HTTP_IN_FLIGHT.labels(source).dec()
+        HTTP_REQUEST_SECONDS.labels(source, status).observe(time.perf_counter() - start)
+        _record_async_pool_stats(source, client)
+
+
+async def close_async_clients():
+    """Closes the async clients opened in the running event loop."""
+    loop = asyncio.get_running_loop()
+    for key in [key for key in _async_clients if key[1] is loop]:
+        await _async_clients.pop(key).aclose()
+
+
+def close_sessions():
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,138 @@
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from core.config import JOB_TIMEOUT
+from core.models import ETLJob
+
+logger = logging.getLogger(__name__)
+
+
+def dedup_key(kind: str, params: dict = None) -> str:
+    return f"{kind}:" + json.dumps(params or {}, sort_keys=True, default=str)
+
+
+def _last_seen():
+    return func.coalesce(ETLJob.heartbeat_at, ETLJob.started_at)
+
+
+def _stale_cutoff(timeout: int = None) -> datetime:
+    return datetime.now() - timedelta(seconds=timeout or JOB_TIMEOUT)
+
+
+def _pending(db, key: str) -> Optional[ETLJob]:
+    return db.query(ETLJob).filter(ETLJob.dedup_key == key, ETLJob.status == "pending").first()
+
+
+def enqueue(db, kind: str, params: dict = None) -> tuple:
+    """
+    Queues a job and returns (job, coalesced). If an identical job (same kind
+    and params) is still pending, that job is returned instead of a new one;
+    the partial unique index on pending dedup keys settles concurrent triggers.
+    """
+    key = dedup_key(kind, params)
+    existing = _pending(db, key)
+    if existing is not None:
+        return existing, True
+
+    job = ETLJob(kind=kind, params=params or {}, dedup_key=key, status="pending", attempts=0)
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        existing = _pending(db, key)
+        if existing is None:
+            raise
+        return existing, True
+    return job, False
+
+
+def claim_next(db, worker_id: str) -> Optional[ETLJob]:
+    """
+    Marks the oldest pending job as running for `worker_id` and returns it,
+    or None if there is nothing to do. A job is not started while an
+    identical one is still running, so two triggers never overlap; a running
+    job whose heartbeat has gone stale no longer holds others back. On
+    Postgres, candidates locked by other workers are skipped (SKIP LOCKED);
+    the conditional UPDATE makes the claim safe on any backend.
+    """
+    running = db.query(ETLJob.dedup_key).filter(ETLJob.status == "running", _last_seen() >= _stale_cutoff())
+    query = db.query(ETLJob).filter(
+        ETLJob.status == "pending", ETLJob.dedup_key.notin_(running)
+    ).order_by(ETLJob.id)
+    if db.get_bind().dialect.name == "postgresql":
+        query = query.with_for_update(skip_locked=True, of=ETLJob)
+
+    candidate = query.first()
+    if candidate is None:
+        db.commit()
+        return None
+
+    claimed = db.query(ETLJob).filter(ETLJob.id == candidate.id, ETLJob.status == "pending").update({
+        ETLJob.status: "running",
+        ETLJob.worker_id: worker_id,
+        ETLJob.started_at: datetime.now(),
+        ETLJob.heartbeat_at: datetime.now(),
+        ETLJob.attempts: ETLJob.attempts + 1,
+    }, synchronize_session=False)
+    db.commit()
+    if claimed != 1:
+        return None
+    db.refresh(candidate)
+    return candidate
+
+
+def heartbeat(db, job_id: int, worker_id: str) -> bool:
+    """
+    Marks a running job as alive. Returns False if `worker_id` no longer
+    holds it (it was presumed lost and requeued).
+    """
+    updated = db.query(ETLJob).filter(
+        ETLJob.id == job_id, ETLJob.status == "running", ETLJob.worker_id == worker_id
+    ).update({ETLJob.heartbeat_at: datetime.now()}, synchronize_session=False)
+    db.commit()
+    return updated == 1
+
+
+def finish(db, job: ETLJob, result: dict = None, error: str = None) -> bool:
+    """
+    Records the outcome of a job its worker still holds. Returns False if
+    the job was requeued meanwhile, leaving the requeue's record in place.
+    """
+    updated = db.query(ETLJob).filter(
+        ETLJob.id == job.id, ETLJob.status == "running", ETLJob.worker_id == job.worker_id
+    ).update({
+        ETLJob.status: "failed" if error else "succeeded",
+        ETLJob.result: result,
+        ETLJob.error_message: error,
+        ETLJob.finished_at: datetime.now(),
+    }, synchronize_session=False)
+    db.commit()
+    return updated == 1
+
+
+def requeue_stale(db, timeout: int = None) -> int:
+    """
+    Fails running jobs without a heartbeat for `timeout` seconds (their
+    worker is assumed dead) and queues a fresh copy of each. Safe to call
+    from every worker on every poll: only one of them wins each stale job.
+    """
+    cutoff = _stale_cutoff(timeout)
+    stale = db.query(ETLJob).filter(ETLJob.status == "running", _last_seen() < cutoff).all()
+    requeued = 0
+    for job in stale:
+        lost = db.query(ETLJob).filter(
+            ETLJob.id == job.id, ETLJob.status == "running", _last_seen() < cutoff
+        ).update({ETLJob.status: "failed", ETLJob.finished_at: datetime.now()}, synchronize_session=False)
+        db.commit()
+        if lost != 1:
+            continue
+        retry, _ = enqueue(db, job.kind, job.params)
+        job.error_message = f"No heartbeat from worker {job.worker_id}; requeued as job {retry.id}"
+        db.commit()
+        logger.warning(f"Requeued stale job {job.id} as {retry.id}")
+        requeued += 1
+    return requeued
@@ -0,0 +1,55 @@
+from datetime import datetime, timezone
+from sqlalchemy import tuple_
+from core.models import CryptoMarketData
+
+# (symbol, recorded_at) pairs per IN (...) list, well below the backends' bind-parameter limits
+MAX_KEYS_PER_QUERY = 5000
+
+
+def normalize_time(value: datetime) -> datetime:
+    """
+    Naive UTC form of a timestamp, so keys read back from the database (naive
+    on SQLite, aware on Postgres) compare equal to freshly parsed ones.
+    """
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class ExistingKeys:
+    """
+    In-memory index of which (symbol, recorded_at) keys a source already has
+    in `crypto_market_data`. Only the keys asked about are looked up (one
+    query per batch instead of one lookup per fetched entry), so the cost
+    follows the page size, not the source's stored history.
+    """
+    def __init__(self, db, source: str):
+        self.db = db
+        self.source = source
+        self._keys = set()
+        self._loaded = set()
+
+    def load(self, keys) -> "ExistingKeys":
+        """Looks up which of the (symbol, recorded_at) `keys` not checked yet are stored."""
+        missing = {}
+        for symbol, recorded_at in keys:
+            key = (symbol, normalize_time(recorded_at))
+            if key not in self._loaded:
+                missing[key] = (symbol, recorded_at)
+        pending = list(missing.values())
+        for start in range(0, len(pending), MAX_KEYS_PER_QUERY):
+            chunk = pending[start:start + MAX_KEYS_PER_QUERY]
+            rows = self.db.query(CryptoMarketData.symbol, CryptoMarketData.recorded_at).filter(
+                CryptoMarketData.source == self.source,
+                tuple_(CryptoMarketData.symbol, CryptoMarketData.recorded_at).in_(chunk)
+            ).all()
+            self._keys.update((symbol, normalize_time(recorded_at)) for symbol, recorded_at in rows)
+        self._loaded.update(missing)
+        return self
+
+    def __contains__(self, key) -> bool:
+        symbol, recorded_at = key
+        return (symbol, normalize_time(recorded_at)) in self._keys
+
+    def add(self, symbol: str, recorded_at: datetime):
+        self._keys.add((symbol, normalize_time(recorded_at)))
@@ -0,0 +1,50 @@
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+_local_locks = {}
+_local_guard = threading.Lock()
+
+
+def lease_key(name: str) -> int:
+    """Stable signed 64-bit advisory lock key for a lease name."""
+    return int.from_bytes(hashlib.sha256(name.encode()).digest()[:8], "big", signed=True)
+
+
+@contextmanager
+def lease(name: str, engine=None):
+    """
+    Non-blocking, cluster-wide lease: yields True if this process now holds
+    `name`, False if someone else does.
+
+    On Postgres it is a session-level advisory lock held on a dedicated
+    autocommit connection for the duration of the block; if the holder
+    dies, its connection closes and the lease frees itself. Other backends
+    (SQLite in dev/tests) only have one node, so a process-local lock is used.
+    """
+    if engine is None:
+        from core.database import engine
+
+    if engine.dialect.name != "postgresql":
+        with _local_guard:
+            lock = _local_locks.setdefault(name, threading.Lock())
+        acquired = lock.acquire(blocking=False)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                lock.release()
+        return
+
+    key = lease_key(name)
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        acquired = bool(conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": key}).scalar())
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
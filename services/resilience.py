@@ -1,47 +1,287 @@
 import time
+import asyncio
+import json
+import os
+import threading
+import httpx
 import requests
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type, before_sleep_log
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception, before_sleep_log
 import logging
+from core.config import RATE_LIMIT_STATE_DIR
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# AIMD tuning: multiplicative decrease on 429, additive increase per success
+DECREASE_FACTOR = 0.5
+INCREASE_FRACTION = 0.05
+MIN_RATE_FRACTION = 1 / 16
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; shared buckets fall back to per-process
+    fcntl = None
+
+
+class _FileBucketState:
+    """
+    Token bucket state kept in a small JSON file and updated under an
+    exclusive `flock`, so every process on the node draws from one budget.
+    Uses wall-clock time because monotonic clocks are per-process.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def _update(self, rate: float, capacity: float, change) -> float:
+        """Refills the stored bucket, applies `change(tokens)` and stores the result."""
+        with open(self.path, "a+") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                fh.seek(0)
+                try:
+                    state = json.loads(fh.read() or "{}")
+                except ValueError:
+                    state = {}
+                now = time.time()
+                available = state.get("tokens", capacity)
+                updated = state.get("updated", now)
+                available = change(min(capacity, available + max(0.0, now - updated) * rate))
+                fh.seek(0)
+                fh.truncate()
+                fh.write(json.dumps({"tokens": available, "updated": now}))
+                fh.flush()
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+        return available
+
+    def reserve(self, rate: float, capacity: float, tokens: float) -> float:
+        available = self._update(rate, capacity, lambda t: t - tokens)
+        return 0.0 if available >= 0 else -available / rate
+
+    def penalize(self, rate: float, capacity: float, seconds: float):
+        self._update(rate, capacity, lambda t: min(t, 1.0 - seconds * rate))
+
+
+def _parse_retry_after(value) -> Optional[float]:
+    """`Retry-After` is either delay-seconds or an HTTP date."""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def _parse_reset(value) -> Optional[float]:
+    """`x-ratelimit-reset` is sent as epoch seconds or as seconds from now."""
+    try:
+        reset = float(value)
+    except (TypeError, ValueError):
+        return None
+    if reset > 1e9:
+        reset -= time.time()
+    return max(0.0, reset)
+
+
+def retry_after_seconds(headers) -> Optional[float]:
+    """
+    How long the server asked us to back off, from `Retry-After` or an
+    exhausted `x-ratelimit-remaining` + `x-ratelimit-reset`. None if no hint.
+    """
+    if headers is None:
+        return None
+    delay = _parse_retry_after(headers.get("Retry-After"))
+    if delay is not None:
+        return delay
+    if headers.get("x-ratelimit-remaining") in ("0", 0):
+        return _parse_reset(headers.get("x-ratelimit-reset"))
+    return None
+
+
 class RateLimiter:
     """
-    Simple token bucket style rate limiter.
-    Ensures that we don't exceed `calls_per_second`.
+    Token bucket rate limiter.
+    The bucket holds up to `burst` tokens and refills at `calls_per_second`;
+    every call takes one token. Safe to share between threads and coroutines.
+
+    With `shared_key`, the bucket lives in a file under `state_dir`
+    (RATE_LIMIT_STATE_DIR) so all processes using the same key share it,
+    e.g. the API's background ETL and the `start.sh` ETL process.
+
+    The rate and the allowed concurrency adapt to the responses passed to
+    `observe()` (AIMD): a 429 halves both and pauses the bucket for the
+    server's `Retry-After`; every success adds a little back, up to the
+    configured maximums.
     """
-    def __init__(self, calls_per_second: float):
-        self.interval = 1.0 / calls_per_second
-        self.last_call_time = 0.0
+    def __init__(self, calls_per_second: float, burst: int = 1, shared_key: str = None,
+                 state_dir: str = None, max_concurrency: int = 1):
+        if calls_per_second <= 0:
+            raise ValueError("calls_per_second must be positive")
+        self.max_rate = calls_per_second
+        self.min_rate = calls_per_second * MIN_RATE_FRACTION
+        self.rate = calls_per_second
+        self.capacity = float(max(1, burst))
+        self.max_concurrency = max(1, max_concurrency)
+        self._concurrency = float(self.max_concurrency)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._shared = None
+
+        state_dir = RATE_LIMIT_STATE_DIR if state_dir is None else state_dir
+        if shared_key and state_dir:
+            if fcntl is None:
+                logger.warning(f"File locks unavailable; rate limit '{shared_key}' is per-process")
+            else:
+                self._shared = _FileBucketState(os.path.join(state_dir, f"{shared_key}.bucket"))
+
+    @property
+    def interval(self) -> float:
+        return 1.0 / self.rate
+
+    @property
+    def concurrency(self) -> int:
+        """Requests currently allowed in flight at once."""
+        return max(1, int(self._concurrency))
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _reserve(self, tokens: float = 1.0) -> float:
+        """
+        Takes `tokens` from the bucket and returns how long to wait until they
+        are actually available. The bucket may go negative: later callers queue
+        behind earlier reservations instead of sharing a token.
+        """
+        with self._lock:
+            if self._shared is not None:
+                return self._shared.reserve(self.rate, self.capacity, tokens)
+            self._refill()
+            self._tokens -= tokens
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def pause(self, seconds: float):
+        """Makes the next token available no sooner than `seconds` from now."""
+        with self._lock:
+            if self._shared is not None:
+                self._shared.penalize(self.rate, self.capacity, seconds)
+                return
+            self._refill()
+            self._tokens = min(self._tokens, 1.0 - seconds * self.rate)
+
+    def observe(self, response):
+        """
+        Feeds a response (requests or httpx) back into the limiter: backs off
+        on 429 and on an exhausted `x-ratelimit-remaining`, recovers on success.
+        """
+        status = getattr(response, "status_code", None)
+        if not isinstance(status, int):
+            return
+        delay = retry_after_seconds(response.headers)
+        if status == 429:
+            with self._lock:
+                self.rate = max(self.min_rate, self.rate * DECREASE_FACTOR)
+                self._concurrency = max(1.0, self._concurrency * DECREASE_FACTOR)
+            logger.warning(
+                f"Throttled (429): rate now {self.rate:.3f}/s, concurrency {self.concurrency}"
+                + (f", retrying after {delay:.1f}s" if delay is not None else "")
+            )
+        elif status < 400:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * INCREASE_FRACTION)
+                # +1 concurrent request per window of `concurrency` successes
+                self._concurrency = min(float(self.max_concurrency), self._concurrency + 1.0 / self.concurrency)
+        if delay:
+            self.pause(delay)
 
     def wait_for_token(self):
         """
-        Blocks until enough time has passed since the last call.
+        Blocks until a token is available.
         """
-        current_time = time.time()
-        elapsed = current_time - self.last_call_time
-        
-        if elapsed < self.interval:
-            sleep_time = self.interval - elapsed
+        sleep_time = self._reserve()
+        if sleep_time > 0:
             logger.info(f"Rate limit hit. Sleeping for {sleep_time:.2f}s")
             time.sleep(sleep_time)
-        
-        self.last_call_time = time.time()
 
-# Standard retry configuration for external APIs
-# Retries on Network Errors (ConnectionError, Timeout) and 5xx Server Errors.
-# Does NOT retry on 4xx Client Errors (except maybe 429 if we wanted to be fancy, but 429 is usually handled by backoff + rate limiting).
+    async def wait_for_token_async(self):
+        """
+        Same as wait_for_token, but yields to the event loop while waiting.
+        """
+        sleep_time = self._reserve()
+        if sleep_time > 0:
+            logger.info(f"Rate limit hit. Sleeping for {sleep_time:.2f}s")
+            await asyncio.sleep(sleep_time)
+
+class AdaptiveSemaphore:
+    """
+    asyncio semaphore whose limit is re-read from `limit()` whenever a slot is
+    requested, e.g. `lambda: limiter.concurrency`. Create it inside the
+    running event loop.
+    """
+    def __init__(self, limit):
+        self._limit = limit
+        self._active = 0
+        self._cond = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._active < max(1, self._limit()))
+            self._active += 1
+
+    async def __aexit__(self, *exc_info):
+        async with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+# Standard retry configuration for external APIs (sync `requests` and async `httpx` fetchers)
+# Retries on network errors (ConnectionError, Timeout), 5xx and 429. Other 4xx
+# responses are permanent and fail immediately. A server-supplied
+# `Retry-After` replaces the exponential backoff for that attempt.
+RETRYABLE_NETWORK_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    httpx.TransportError,
+)
+
+_backoff = wait_exponential(multiplier=1, min=2, max=10)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, (requests.exceptions.HTTPError, httpx.HTTPStatusError)):
+        status = getattr(exc.response, "status_code", None)
+        return status is None or status == 429 or status >= 500
+    return isinstance(exc, RETRYABLE_NETWORK_ERRORS)
+
+
+def _wait_for_retry(retry_state) -> float:
+    exc = retry_state.outcome.exception()
+    response = getattr(exc, "response", None)
+    delay = retry_after_seconds(getattr(response, "headers", None))
+    if delay is not None:
+        return delay
+    return _backoff(retry_state)
+
+
 def validation_retry():
     return retry(
         stop=stop_after_attempt(5),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-        retry=retry_if_exception_type((
-            requests.exceptions.ConnectionError, 
-            requests.exceptions.Timeout,
-            requests.exceptions.ChunkedEncodingError,
-            requests.exceptions.HTTPError 
-        )),
+        wait=_wait_for_retry,
+        retry=retry_if_exception(is_retryable),
+        reraise=True,
         before_sleep=before_sleep_log(logger, logging.WARNING)
     )
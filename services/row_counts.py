@@ -0,0 +1,68 @@
+from collections import Counter
+from typing import Optional
+from sqlalchemy import func, select
+from core.models import CryptoMarketData, MarketDataCount
+
+
+def add_counts(db, counts: Counter, insert=None):
+    """
+    Adds {(symbol, source): rows} to the counters, in the caller's
+    transaction. `insert` is the dialect's ON CONFLICT capable insert; without
+    one each counter is read and updated in turn.
+    """
+    if not counts:
+        return
+    # A fixed key order keeps concurrent writers from deadlocking on counter rows
+    counts = sorted(counts.items())
+    if insert is not None:
+        stmt = insert(MarketDataCount).values([
+            {"symbol": symbol, "source": source, "row_count": n} for (symbol, source), n in counts
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["symbol", "source"],
+            set_={"row_count": MarketDataCount.row_count + stmt.excluded.row_count}
+        )
+        db.execute(stmt)
+        return
+    for (symbol, source), n in counts:
+        counter = db.query(MarketDataCount).filter_by(symbol=symbol, source=source).with_for_update().first()
+        if counter is None:
+            db.add(MarketDataCount(symbol=symbol, source=source, row_count=n))
+        else:
+            counter.row_count += n
+    db.flush()
+
+
+def rebuild_counts(db):
+    """Recomputes every counter from `crypto_market_data` (one full scan); the caller commits."""
+    db.query(MarketDataCount).delete(synchronize_session=False)
+    rows = db.query(
+        CryptoMarketData.symbol, CryptoMarketData.source, func.count()
+    ).group_by(CryptoMarketData.symbol, CryptoMarketData.source).all()
+    db.add_all([MarketDataCount(symbol=symbol, source=source, row_count=n) for symbol, source, n in rows])
+
+
+def ensure_counts(db) -> bool:
+    """
+    Builds the counters once for data loaded before they existed. Returns
+    True if they were rebuilt.
+    """
+    if db.query(MarketDataCount.id).first() is not None or db.query(CryptoMarketData.id).first() is None:
+        return False
+    rebuild_counts(db)
+    db.commit()
+    return True
+
+
+def total_statement(symbol: str = None, source: str = None):
+    """SELECT of the rows matching the /data filters according to the counters."""
+    stmt = select(func.coalesce(func.sum(MarketDataCount.row_count), 0))
+    if symbol:
+        stmt = stmt.where(MarketDataCount.symbol == symbol)
+    if source:
+        stmt = stmt.where(MarketDataCount.source == source)
+    return stmt
+
+
+def counted_total(db, symbol: str = None, source: str = None) -> Optional[int]:
+    return int(db.execute(total_statement(symbol, source)).scalar())
@@ -0,0 +1,44 @@
+from contextlib import contextmanager
+from datetime import datetime
+from core.models import ETLRun
+
+
+class RunFailed(Exception):
+    """Raised when an ingestion marked its own ETLRun as failed without raising."""
+
+
+@contextmanager
+def tracked_run(db, source: str, label: str = None):
+    """
+    Records an ETLRun around one ingestion. The run is committed as "running"
+    up front, then marked "success" when the block finishes unless the block
+    set another status itself (e.g. "skipped"). If the block raises, its
+    uncommitted work is rolled back, the run is marked "failed" with the
+    error and, once that is recorded, the exception propagates so the caller
+    (the pipeline runner, the scheduler, a job) sees the failure. A block that
+    marks the run "failed" itself raises RunFailed the same way. Whatever the
+    block committed before failing stays.
+    """
+    run_log = ETLRun(source=source, status="running", start_time=datetime.now())
+    db.add(run_log)
+    db.commit()
+    try:
+        yield run_log
+        if run_log.status == "running":
+            run_log.status = "success"
+    except Exception as e:
+        db.rollback()
+        run_log.status = "failed"
+        run_log.error_message = str(e)
+        print(f"{label or source} ETL Failed: {e}")
+        raise
+    finally:
+        failed = run_log.status == "failed"
+        error = run_log.error_message
+        run_log.end_time = datetime.now()
+        try:
+            db.commit()
+        except Exception:
+            db.rollback()
+    if failed:
+        raise RunFailed(error or f"{label or source} failed")
@@ -1,25 +1,36 @@
+import os
+import tempfile
 import pytest
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from fastapi.testclient import TestClient
 
 from core.database import Base
 import core.models  # Register models
 from api.main import app
-from api.dependencies import get_db
+from api.dependencies import get_db, get_async_db
 
-from sqlalchemy.pool import StaticPool
-
-# Use in-memory SQLite for tests
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# File-backed SQLite so the sync ETL session and the async read path share data
+_db_fd, _db_path = tempfile.mkstemp(suffix=".db")
+os.close(_db_fd)
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{_db_path}"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, 
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool
+    connect_args={"check_same_thread": False}
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(f"sqlite+aiosqlite:///{_db_path}", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+def pytest_sessionfinish(session, exitstatus):
+    engine.dispose()
+    if os.path.exists(_db_path):
+        os.remove(_db_path)
+
 @pytest.fixture(scope="function")
 def db_session():
     """
@@ -36,14 +47,19 @@ def db_session():
 @pytest.fixture(scope="function")
 def client(db_session):
     """
-    FastAPI TestClient with overridden database dependency.
+    FastAPI TestClient with overridden database dependencies.
     """
     def override_get_db():
         try:
             yield db_session
         finally:
             pass
+
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
             
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     yield TestClient(app)
     app.dependency_overrides.clear()
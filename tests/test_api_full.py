@@ -1,5 +1,5 @@
 from core.models import ETLRun, CryptoMarketData
-from datetime import datetime
+from datetime import datetime, timedelta
 
 def test_stats_endpoint(client, db_session):
     """
@@ -48,3 +48,31 @@ def test_data_endpoint(client, db_session):
     # Test Pagination
     response = client.get("/data?limit=1&skip=1")
     assert len(response.json()["data"]) == 1
+
+def test_data_cursor_pagination(client, db_session):
+    """
+    Walking /data with next_cursor visits every row once, even when rows are
+    inserted at the head between pages.
+    """
+    base = datetime(2024, 1, 1)
+    for i in range(7):
+        db_session.add(CryptoMarketData(
+            symbol=f"C{i}", price_usd=1, recorded_at=base + timedelta(minutes=i // 2), source="src1"
+        ))
+    db_session.commit()
+
+    first = client.get("/data?limit=3").json()
+    seen = [row["symbol"] for row in first["data"]]
+    cursor = first["pagination"]["next_cursor"]
+    assert seen == ["C6", "C5", "C4"] and cursor
+
+    db_session.add(CryptoMarketData(symbol="NEW", price_usd=1, recorded_at=base + timedelta(days=1), source="src1"))
+    db_session.commit()
+
+    while cursor:
+        page = client.get(f"/data?limit=3&cursor={cursor}").json()
+        seen += [row["symbol"] for row in page["data"]]
+        cursor = page["pagination"]["next_cursor"]
+    assert seen == ["C6", "C5", "C4", "C3", "C2", "C1", "C0"]
+
+    assert client.get("/data?cursor=not-a-cursor").status_code == 400
@@ -0,0 +1,123 @@
+import pytest
+from datetime import date, datetime
+from unittest.mock import patch
+from core.models import CryptoMarketData, ETLCheckpoint, ETLRun, RawCoinGecko
+from ingestion import backfill
+from ingestion.backfill import plan_chunks, chunk_key, resolve_symbols, run_backfill_async
+import asyncio
+
+def _payload(start):
+    ms = int(start.timestamp() * 1000)
+    return {
+        "prices": [[ms, 100.0], [ms + 3600000, 101.0]],
+        "market_caps": [[ms, 1e9], [ms + 3600000, 1.1e9]],
+        "total_volumes": [[ms, 5e6]],
+    }
+
+def test_plan_chunks_splits_range():
+    chunks = plan_chunks(["bitcoin"], date(2024, 1, 1), date(2024, 1, 25), chunk_days=10)
+    assert chunks == [
+        ("bitcoin", datetime(2024, 1, 1), datetime(2024, 1, 11)),
+        ("bitcoin", datetime(2024, 1, 11), datetime(2024, 1, 21)),
+        ("bitcoin", datetime(2024, 1, 21), datetime(2024, 1, 25)),
+    ]
+
+def test_backfill_resumes_failed_chunks(db_session):
+    fetched = []
+    fail = {("ethereum", datetime(2024, 1, 11))}
+
+    async def fake_fetch(client, coin_id, start, end):
+        fetched.append((coin_id, start))
+        if (coin_id, start) in fail:
+            raise RuntimeError("rate limited")
+        return _payload(start)
+
+    args = dict(coin_ids=["bitcoin", "ethereum"], start=date(2024, 1, 1), end=date(2024, 1, 21),
+                chunk_days=10, db=db_session, symbols={"bitcoin": "BTC", "ethereum": "ETH"})
+    with patch.object(backfill, "fetch_range_async", fake_fetch):
+        summary = asyncio.run(run_backfill_async(**args))
+        assert summary["completed"] == 3 and summary["failed"] == 1
+        assert db_session.query(CryptoMarketData).count() == 6
+        row = db_session.query(CryptoMarketData).filter(CryptoMarketData.symbol == "BTC").first()
+        assert row.recorded_at.replace(tzinfo=None) == datetime(2024, 1, 1)
+
+        fail.clear()
+        fetched.clear()
+        summary = asyncio.run(run_backfill_async(**args))
+
+    # Only the failed chunk is fetched again
+    assert fetched == [("ethereum", datetime(2024, 1, 11))]
+    assert summary["already_done"] == 3 and summary["completed"] == 1
+    assert db_session.query(CryptoMarketData).count() == 8
+    assert db_session.query(ETLCheckpoint).filter(
+        ETLCheckpoint.source_name == chunk_key("ethereum", datetime(2024, 1, 11), datetime(2024, 1, 21))
+    ).count() == 1
+    runs = db_session.query(ETLRun).filter(ETLRun.source == "coingecko_backfill").all()
+    assert [run.status for run in runs] == ["success", "success"]
+    assert "rate limited" in runs[0].error_message
+
+def test_resolve_symbols_reads_latest_snapshot_per_coin(db_session):
+    db_session.add_all([
+        RawCoinGecko(coin_id="bitcoin", data={"id": "bitcoin", "symbol": "xbt"}),
+        RawCoinGecko(coin_id="bitcoin", data={"id": "bitcoin", "symbol": "btc"}),
+        RawCoinGecko(coin_id="bitcoin", data={"backfill": {"from": "2024-01-01"}, **_payload(datetime(2024, 1, 1))}),
+        RawCoinGecko(coin_id="ethereum", data={"backfill": {"from": "2024-01-01"}, **_payload(datetime(2024, 1, 1))}),
+    ])
+    db_session.commit()
+
+    with patch.object(backfill, "_fetch_coin_list", return_value=[{"id": "ethereum", "symbol": "eth"}]):
+        assert resolve_symbols(db_session, ["bitcoin", "ethereum"]) == {"bitcoin": "BTC", "ethereum": "ETH"}
+
+def test_backfill_endpoint_validates_request(client):
+    headers = {"X-Admin-Secret": "default_insecure_secret"}
+    response = client.post("/admin/backfill", headers=headers,
+                           json={"start": "2024-02-01", "end": "2024-01-01", "coin_ids": ["bitcoin"]})
+    assert response.status_code == 422
+
+    response = client.post("/admin/backfill", headers=headers,
+                           json={"start": "2024-01-01", "end": "2024-02-01", "coin_ids": ["bitcoin"]})
+    assert response.status_code == 200
+    job = client.get(f"/admin/jobs/{response.json()['job_id']}", headers=headers).json()
+    assert job["kind"] == "backfill" and job["params"]["start"] == "2024-01-01"
+
+def test_backfill_rejects_non_positive_sizes(client):
+    headers = {"X-Admin-Secret": "default_insecure_secret"}
+    for field in ("top", "chunk_days"):
+        response = client.post("/admin/backfill", headers=headers,
+                               json={"start": "2024-01-01", "end": "2024-02-01", "coin_ids": ["bitcoin"], field: 0})
+        assert response.status_code == 422
+
+    for argv in (["--chunk-days", "0"], ["--top", "-1"], ["--end", "2024-01-01"]):
+        with pytest.raises(SystemExit):
+            backfill.main(["--start", "2024-01-01", "--coins", "bitcoin", *argv])
+
+def test_chunk_write_tolerates_concurrent_checkpoint(db_session):
+    start, end = datetime(2024, 1, 1), datetime(2024, 1, 11)
+    db_session.add(ETLCheckpoint(source_name=chunk_key("bitcoin", start, end), meta_data={"complete": True}))
+    db_session.commit()
+
+    assert backfill.write_chunk(db_session, "bitcoin", "BTC", start, end, _payload(start)) == 2
+    assert db_session.query(CryptoMarketData).count() == 2
+    assert db_session.query(ETLCheckpoint).count() == 1
+
+def test_failed_chunk_write_is_retried_next_run(db_session):
+    args = dict(coin_ids=["bitcoin"], start=date(2024, 1, 1), end=date(2024, 1, 21),
+                chunk_days=10, db=db_session, symbols={"bitcoin": "BTC"})
+    real_write = backfill.write_chunk
+
+    def flaky_write(db, coin_id, symbol, start, end, payload):
+        if start == datetime(2024, 1, 11):
+            raise RuntimeError("connection reset")
+        return real_write(db, coin_id, symbol, start, end, payload)
+
+    async def fake_fetch(client, coin_id, start, end):
+        return _payload(start)
+
+    with patch.object(backfill, "fetch_range_async", fake_fetch):
+        with patch.object(backfill, "write_chunk", flaky_write):
+            summary = asyncio.run(run_backfill_async(**args))
+        assert summary["completed"] == 1 and summary["failed"] == 1
+        summary = asyncio.run(run_backfill_async(**args))
+
+    assert summary["already_done"] == 1 and summary["completed"] == 1
+    assert db_session.query(CryptoMarketData).count() == 4
@@ -0,0 +1,30 @@
+from datetime import datetime
+from schemas.ingestion import CoinPaprikaEntry
+from services.batch_validation import COINGECKO_BATCH, validate_batch, describe_errors
+
+def _coin(i, **overrides):
+    entry = {"id": f"coin-{i}", "symbol": f"c{i}", "name": f"Coin {i}", "current_price": 1.0,
+             "market_cap": None, "total_volume": 2.0, "last_updated": "2024-01-01T00:00:00Z"}
+    entry.update(overrides)
+    return entry
+
+def test_invalid_entries_are_reported_by_index():
+    items = [_coin(0), _coin(1, current_price="n/a"), "not an entry", _coin(3)]
+    valid, errors = validate_batch(COINGECKO_BATCH, items)
+
+    assert [idx for idx, _ in valid] == [0, 3]
+    assert valid[1][1].symbol == "C3"
+    assert [idx for idx, _ in errors] == [1, 2]
+    assert "current_price" in describe_errors(errors[0][1])
+
+def test_paprika_derived_fields_are_cached():
+    entry = CoinPaprikaEntry(id="btc-bitcoin", symbol="btc", name="Bitcoin",
+                             quotes={"USD": {"price": 10.0}}, last_updated="2018-06-12T13:41:00Z")
+    assert entry.symbol == "BTC"
+    assert entry.timestamp == datetime(2018, 6, 12, 13, 41)
+    assert entry.price_usd == 10.0 and entry.volume_24h == 0.0
+
+    # Computed once per instance
+    assert entry.__dict__["timestamp"] is entry.timestamp
+    entry.quotes["USD"]["price"] = 20.0
+    assert entry.price_usd == 10.0
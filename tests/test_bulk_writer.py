@@ -0,0 +1,50 @@
+from datetime import datetime
+from core.models import CryptoMarketData, RawCSVUpload, ETLRun
+from services.bulk_writer import BulkWriter
+from ingestion.ingest_csv import ingest_csv_data
+
+def _row(symbol, price=1.0, ts=datetime(2023, 1, 1)):
+    return dict(symbol=symbol, price_usd=price, market_cap=None, volume_24h=1.0, recorded_at=ts, source="test")
+
+def test_bulk_writer_counts_inserted_and_skipped(db_session):
+    db_session.add(CryptoMarketData(**_row("BTC")))
+    db_session.commit()
+
+    writer = BulkWriter(db_session, batch_size=2)
+    writer.add(CryptoMarketData, **_row("BTC"))   # conflicts with existing row
+    writer.add(CryptoMarketData, **_row("ETH"))   # triggers flush (batch_size=2)
+    assert writer.pending == 0
+    assert writer.add(CryptoMarketData, **_row("SOL")) is True
+    assert writer.add(CryptoMarketData, **_row("SOL")) is False  # duplicate within buffer
+    writer.flush()
+
+    assert writer.inserted == 2
+    assert writer.skipped == 2
+    assert db_session.query(CryptoMarketData).count() == 3
+
+def test_bulk_writer_update_mode(db_session):
+    db_session.add(CryptoMarketData(**_row("BTC", price=1.0)))
+    db_session.commit()
+
+    writer = BulkWriter(db_session, on_conflict="update")
+    writer.add(CryptoMarketData, **_row("BTC", price=2.0))
+    writer.flush()
+
+    db_session.expire_all()
+    assert db_session.query(CryptoMarketData).one().price_usd == 2.0
+
+def test_csv_duplicates_reported_as_skipped(db_session, tmp_path):
+    d = tmp_path / "dupes.csv"
+    with open(d, "w") as f:
+        f.write("symbol,price,volume,timestamp,source\n")
+        f.write("BTC,50000,100,2023-01-01,csv\n")
+        f.write("BTC,50001,100,2023-01-01,csv\n")  # same (symbol, recorded_at, source)
+        f.write("ETH,3000,100,2023-01-01,csv\n")
+
+    ingest_csv_data(str(d), db=db_session)
+
+    run = db_session.query(ETLRun).filter(ETLRun.source == str(d)).first()
+    assert run.status == "success"
+    assert run.records_processed == 2
+    assert db_session.query(CryptoMarketData).count() == 2
+    assert db_session.query(RawCSVUpload).count() == 3
@@ -0,0 +1,37 @@
+import asyncio
+from unittest.mock import patch
+from core.models import CryptoMarketData, ETLRun
+from ingestion import ingest_api
+from ingestion.ingest_api import _page_plan, iter_coingecko_pages_async, ingest_coingecko_data
+
+def _coin(i):
+    return {"id": f"coin_{i}", "symbol": f"c{i}", "name": f"Coin {i}", "current_price": 1.0,
+            "market_cap": 1.0, "total_volume": 1.0, "last_updated": "2023-10-27T10:00:00Z"}
+
+def test_page_plan_covers_universe():
+    assert _page_plan(10) == [(1, 10, 10)]
+    assert _page_plan(600) == [(1, 250, 250), (2, 250, 250), (3, 250, 100)]
+
+def test_failed_page_does_not_abort_run(db_session):
+    async def fake_page(client, page, per_page, cache=None):
+        if page == 2:
+            raise RuntimeError("page 2 exhausted retries")
+        return [_coin(page * 1000 + i) for i in range(per_page)]
+
+    async def collect():
+        return [page async for page in iter_coingecko_pages_async(client=None)]
+
+    with patch("ingestion.ingest_api.COINGECKO_UNIVERSE_SIZE", 7), \
+         patch("ingestion.ingest_api.COINGECKO_MAX_PER_PAGE", 3), \
+         patch.object(ingest_api, "fetch_coingecko_page_async", fake_page):
+        pages = asyncio.run(collect())
+
+    assert sorted(len(p) for p in pages if not isinstance(p, Exception)) == [1, 3]
+
+    ingest_coingecko_data(db=db_session, fetch=lambda: pages)
+
+    run = db_session.query(ETLRun).filter(ETLRun.source == "coingecko_api").one()
+    assert run.status == "success"
+    assert run.records_processed == 4
+    assert "page 2 exhausted retries" in run.error_message
+    assert db_session.query(CryptoMarketData).count() == 4
@@ -0,0 +1,136 @@
+from unittest.mock import MagicMock, patch
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from core.models import CryptoMarketData, ETLCheckpoint, ETLRun
+from ingestion import ingest_csv, ingest_legacy, sources
+from ingestion.ingest_csv import ingest_csv_data
+from services.copy_loader import _CAST_HELPERS_SQL, _ResumedFile, merge_staged_rows, stage_csv_file, use_copy_path
+from ingestion.ingest_legacy import ingest_legacy_data
+
+def _db_for(dialect_name):
+    db = MagicMock()
+    db.get_bind.return_value.dialect.name = dialect_name
+    return db
+
+def test_copy_path_selection():
+    assert use_copy_path(_db_for("postgresql"), mode="auto") is True
+    assert use_copy_path(_db_for("postgresql"), mode="orm") is False
+    # COPY is Postgres-only; other backends fall back to the ORM path
+    assert use_copy_path(_db_for("sqlite"), mode="copy") is False
+
+def test_copy_mode_falls_back_on_sqlite(db_session, tmp_path):
+    d = tmp_path / "legacy.csv"
+    with open(d, "w") as f:
+        f.write("Ticker,LastPrice,Vol,RecordedDate\n")
+        f.write("ltc,377.2,295199.57,05-12-2025 17:43:10\n")
+
+    ingest_legacy_data(str(d), db=db_session, mode="copy")
+
+    run = db_session.query(ETLRun).filter(ETLRun.source == str(d)).first()
+    assert run.status == "success"
+    assert run.records_processed == 1
+    assert db_session.query(CryptoMarketData).one().symbol == "LTC"
+
+def test_resumed_file_streams_header_then_stops_at_end(tmp_path):
+    d = tmp_path / "log.csv"
+    d.write_bytes(b"a,b\n1,2\n3,4\n5,")
+    with open(d, "rb") as fh:
+        header = fh.readline()
+        fh.seek(len(b"a,b\n1,2\n"))             # resume mid-file
+        reader = _ResumedFile(fh, header, end=len(b"a,b\n1,2\n3,4\n"))
+        data = reader.read(2) + reader.read(1) + reader.read(100) + reader.read(100)
+    assert data == b"a,b\n3,4\n"
+
+def test_copy_load_commits_batches_and_resumes(db_session, tmp_path):
+    d = tmp_path / "big.csv"
+    with open(d, "w") as f:
+        f.write("symbol,price,volume,timestamp,source\n")
+        for i in range(25):
+            f.write(f"C{i},1,1,2023-01-01,csv\n")
+    filepath = str(d)
+    staged = []
+
+    def stage(db, path, table, columns, start_offset=None, end_offset=None):
+        with open(path, "rb") as fh:
+            fh.seek(start_offset)
+            records = fh.read(end_offset - start_offset).count(b"\n")
+        staged.append((start_offset, end_offset))
+        if len(staged) == 2 and crash:
+            raise RuntimeError("connection lost")
+        return records, end_offset
+
+    merge = lambda db, statements, params: [1, 10, 10]
+    with patch.object(sources, "use_copy_path", return_value=True), \
+         patch.object(sources, "stage_csv_file", stage), \
+         patch.object(sources, "merge_staged_rows", merge), \
+         patch.object(sources, "ETL_COPY_BATCH_ROWS", 10):
+        crash = True
+        with pytest.raises(RuntimeError):
+            ingest_csv_data(filepath, db=db_session)
+        meta = db_session.query(ETLCheckpoint).filter(ETLCheckpoint.source_name == filepath).one().meta_data
+        assert meta["rows"] == 10 and meta["complete"] is False
+        assert meta["offset"] == staged[0][1]
+
+        crash = False
+        staged.clear()
+        ingest_csv_data(filepath, db=db_session)
+
+    # The committed first batch is not staged again
+    assert staged[0][0] == meta["offset"] and len(staged) == 2
+    meta = db_session.query(ETLCheckpoint).filter(ETLCheckpoint.source_name == filepath).one().meta_data
+    assert meta["rows"] == 25 and meta["complete"] is True and meta["offset"] == d.stat().st_size
+
+def _compiled(sql):
+    return text(sql).compile(dialect=postgresql.dialect())
+
+@pytest.mark.parametrize("statements", [ingest_csv.COPY_MERGE_SQL, ingest_legacy.COPY_MERGE_SQL])
+def test_merge_sql_compiles_for_postgres(statements):
+    compiled = [_compiled(sql) for sql in statements]
+    # Only :filename is a bind parameter; casts and the date format stay literal
+    assert all(set(c.params) <= {"filename"} for c in compiled)
+    assert "%(filename)s" in str(compiled[1])
+    counters = str(compiled[-1])
+    assert "RETURNING symbol, source" in counters
+    assert "ON CONFLICT (symbol, source) DO UPDATE" in counters
+    assert counters.rstrip().endswith("SELECT count(*) FROM inserted")
+
+def test_legacy_date_format_colons_are_not_bind_parameters():
+    typed = str(_compiled(ingest_legacy.COPY_MERGE_SQL[0]))
+    assert "'DD-MM-YYYY HH24:MI:SS'" in typed
+
+def test_cast_helpers_compile_for_postgres():
+    for sql in _CAST_HELPERS_SQL:
+        compiled = _compiled(sql)
+        assert not compiled.params
+        assert "$$" in str(compiled) and "pg_temp.etl_to_" in str(compiled)
+    assert "v::double precision" in str(_compiled(_CAST_HELPERS_SQL[0]))
+
+def test_stage_csv_file_copies_the_resumed_range(tmp_path):
+    d = tmp_path / "log.csv"
+    d.write_bytes(b'symbol,"odd ""col"""\nA,1\nB,2\n"C')
+    db = MagicMock()
+    copied = {}
+
+    def copy_expert(sql, fh, size):
+        copied["sql"] = sql
+        copied["data"] = b"".join(iter(lambda: fh.read(size), b""))
+
+    db.connection.return_value.connection.dbapi_connection.cursor.return_value.copy_expert = copy_expert
+    db.execute.return_value.scalar.return_value = 1
+
+    staged, end = stage_csv_file(db, str(d), "stg_csv_upload", ["symbol", 'odd "col"'],
+                                 start_offset=len(b'symbol,"odd ""col"""\nA,1\n'))
+
+    assert staged == 1 and end == len(b'symbol,"odd ""col"""\nA,1\nB,2\n')
+    assert copied["data"] == b'symbol,"odd ""col"""\nB,2\n'
+    assert copied["sql"] == 'COPY stg_csv_upload ("symbol", "odd ""col""") FROM STDIN WITH (FORMAT csv, HEADER true)'
+    ddl = str(db.execute.call_args_list[0].args[0].compile(dialect=postgresql.dialect()))
+    assert ddl == 'CREATE TEMP TABLE stg_csv_upload ("symbol" text, "odd ""col""" text) ON COMMIT DROP'
+
+def test_merge_staged_rows_returns_the_counter_cte_total():
+    db = MagicMock()
+    plain, counted = MagicMock(returns_rows=False, rowcount=3), MagicMock(returns_rows=True)
+    counted.scalar.return_value = 2
+    db.execute.side_effect = [plain, counted]
+    assert merge_staged_rows(db, ["INSERT ...", "WITH inserted AS (...) SELECT count(*) FROM inserted"]) == [3, 2]
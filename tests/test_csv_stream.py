@@ -0,0 +1,51 @@
+from unittest.mock import patch
+from core.models import CryptoMarketData, ETLRun
+from services.csv_stream import iter_csv_chunks, last_record_end, read_csv_header
+from ingestion.ingest_csv import ingest_csv_data
+
+def _write_csv(path, rows):
+    with open(path, "w") as f:
+        f.write("symbol,price,volume,timestamp,source\n")
+        for i in range(rows):
+            f.write(f"C{i},{i + 1},100,2023-01-01,csv\n")
+
+def test_chunks_are_bounded_and_contiguous(tmp_path):
+    d = tmp_path / "big.csv"
+    _write_csv(d, 10)
+    with open(d, "a") as f:
+        f.write('"MULTI\nLINE",1,1,2023-01-01,csv\n')  # quoted newline stays one record
+
+    chunks = list(iter_csv_chunks(str(d), chunksize=4))
+
+    assert [len(c.frame) for c in chunks] == [4, 4, 3]
+    assert list(chunks[1].frame.index) == [4, 5, 6, 7]
+    assert chunks[-1].frame.iloc[-1]["symbol"] == "MULTI\nLINE"
+    for prev, nxt in zip(chunks, chunks[1:]):
+        assert prev.end_offset == nxt.start_offset
+    assert chunks[-1].end_offset == d.stat().st_size
+    assert read_csv_header(str(d))[0] == ["symbol", "price", "volume", "timestamp", "source"]
+
+def test_chunked_ingestion_loads_every_row(db_session, tmp_path):
+    d = tmp_path / "big.csv"
+    _write_csv(d, 25)
+
+    with patch("services.csv_stream.ETL_CSV_CHUNK_SIZE", 10):
+        ingest_csv_data(str(d), db=db_session)
+
+    run = db_session.query(ETLRun).filter(ETLRun.source == str(d)).first()
+    assert run.status == "success"
+    assert run.records_processed == 25
+    assert db_session.query(CryptoMarketData).count() == 25
+
+def test_trailing_partial_record_is_not_consumed(tmp_path):
+    d = tmp_path / "growing.csv"
+    _write_csv(d, 3)
+    complete = d.stat().st_size
+    with open(d, "a") as f:
+        f.write('"HALF\nQUOTED",1')             # torn, even across a quoted newline
+
+    chunks = list(iter_csv_chunks(str(d), chunksize=2))
+
+    assert sum(len(c.frame) for c in chunks) == 3
+    assert chunks[-1].end_offset == complete
+    assert last_record_end(str(d)) == complete + len('"HALF\n')
@@ -1,5 +1,6 @@
 from ingestion.ingest_csv import ingest_csv_data
 from core.models import ETLRun
+from services.run_log import RunFailed
 import pandas as pd
 import pytest
 
@@ -7,7 +8,8 @@ def test_file_not_found(db_session):
     """
     Test behavior when CSV file does not exist.
     """
-    ingest_csv_data("non_existent_file.csv", db=db_session)
+    with pytest.raises(RunFailed):
+        ingest_csv_data("non_existent_file.csv", db=db_session)
     
     run = db_session.query(ETLRun).filter(ETLRun.source == "non_existent_file.csv").first()
     assert run is not None
@@ -0,0 +1,65 @@
+import asyncio
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from core.database import Base
+from core.models import CryptoMarketData, ETLRun
+from ingestion import sources
+from ingestion.ingest_csv import CSVFilesSource, ingest_csv_data
+from ingestion.sources import RunContext
+from services.file_checkpoint import discover_files, pending_files
+
+def _write_csv(path, symbol, rows=3):
+    with open(path, "w") as f:
+        f.write("symbol,price,volume,timestamp,source\n")
+        for i in range(rows):
+            f.write(f"{symbol},{i + 1},100,2023-01-0{i + 1},vendor\n")
+
+def test_discovers_new_files_in_drop_folders(db_session, tmp_path):
+    drop = tmp_path / "drop"
+    drop.mkdir()
+    for name in ("b.csv", "a.csv", "c.csv"):
+        _write_csv(drop / name, name[0].upper())
+    (drop / "notes.txt").write_text("not a csv")
+
+    found = discover_files([str(drop), str(tmp_path / "missing.csv")])
+    assert found == [str(drop / "a.csv"), str(drop / "b.csv"), str(drop / "c.csv"), str(tmp_path / "missing.csv")]
+    assert discover_files([str(drop / "[ab].csv")]) == [str(drop / "a.csv"), str(drop / "b.csv")]
+
+    ingest_csv_data(str(drop / "a.csv"), db=db_session)
+    _write_csv(drop / "b.csv", "B", rows=1)
+    assert pending_files(db_session, found[:3]) == [str(drop / "b.csv"), str(drop / "c.csv")]
+
+def test_drop_folder_fans_out_across_processes(tmp_path, monkeypatch):
+    # Pool processes open their own connections, so use a database file they can share
+    url = f"sqlite:///{tmp_path / 'etl.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    monkeypatch.setenv("DATABASE_URL", url)
+    monkeypatch.setattr(sources, "SessionLocal", sessionmaker(bind=engine))
+
+    drop = tmp_path / "drop"
+    drop.mkdir()
+    for symbol in ("AAA", "BBB", "CCC"):
+        _write_csv(drop / f"{symbol}.csv", symbol)
+
+    source = CSVFilesSource()
+    source.processes = 2
+    asyncio.run(source.run(RunContext({source.name: [str(drop)]})))
+
+    db = sessionmaker(bind=engine)()
+    try:
+        runs = db.query(ETLRun).all()
+        assert sorted((run.source, run.status, run.records_processed) for run in runs) == [
+            (str(drop / f"{symbol}.csv"), "success", 3) for symbol in ("AAA", "BBB", "CCC")
+        ]
+        assert db.query(CryptoMarketData).count() == 9
+    finally:
+        db.close()
+
+    # Nothing new in the folder: no files are dispatched again
+    asyncio.run(source.run(RunContext({source.name: [str(drop)]})))
+    db = sessionmaker(bind=engine)()
+    try:
+        assert db.query(ETLRun).count() == 3
+    finally:
+        db.close()
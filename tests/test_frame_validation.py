@@ -0,0 +1,48 @@
+import io
+import pandas as pd
+from schemas.ingestion import CSVEntry, LegacyCSVEntry
+from services.frame_validation import validate_csv_frame, validate_legacy_frame
+
+CSV_TEXT = """symbol,price,volume,timestamp,source
+btc,50000,100,2023-01-01,csv
+eth,not-a-number,100,2023-01-01,csv
+sol, 12.5,1e3,2023-01-01T10:00:00Z,csv
+ada,0.3,,2023-01-01 10:00:00.123456,csv
+,1,1,2023-01-01,csv
+xrp,1,1,not-a-date,csv
+"""
+
+def test_csv_frame_matches_pydantic():
+    df = pd.read_csv(io.StringIO(CSV_TEXT))
+    valid, errors = validate_csv_frame(df)
+
+    expected_valid, expected_errors = {}, []
+    for idx, row in df.iterrows():
+        try:
+            expected_valid[idx] = CSVEntry(**row.to_dict())
+        except Exception as e:
+            expected_errors.append((idx, str(e)))
+
+    assert [(idx, str(e)) for idx, e in errors] == expected_errors
+    assert list(valid.index) == list(expected_valid.keys())
+    for idx, entry in expected_valid.items():
+        row = valid.loc[idx]
+        assert row["symbol"] == entry.symbol
+        assert row["timestamp"] == entry.timestamp
+        assert row["price"] == entry.price
+        assert (pd.isna(row["volume"]) and pd.isna(entry.volume)) or row["volume"] == entry.volume
+
+def test_legacy_frame_parses_dates_and_keeps_fallback():
+    df = pd.read_csv(io.StringIO(
+        "Ticker,LastPrice,Vol,RecordedDate\n"
+        "ltc,377.2,295199.57,05-12-2025 17:43:10\n"
+        "link,43.28,65405.06,garbage\n"
+        "xlm,oops,1,03-12-2025 11:41:10\n"
+    ))
+    valid, errors = validate_legacy_frame(df)
+
+    assert len(errors) == 1 and errors[0][0] == 2
+    assert list(valid["Ticker"]) == ["LTC", "LINK"]
+    assert valid.loc[0, "recorded_at"] == LegacyCSVEntry(**df.loc[0].to_dict()).get_timestamp()
+    # Unparseable dates fall back to the load time, like get_timestamp()
+    assert valid.loc[1, "recorded_at"] is not None
@@ -0,0 +1,25 @@
+from core.models import CryptoMarketData, ETLCheckpoint
+from ingestion.ingest_api import ingest_coingecko_data
+
+def _coin(symbol, last_updated):
+    return {"id": symbol.lower(), "symbol": symbol, "name": symbol, "current_price": 1.0,
+            "market_cap": 1.0, "total_volume": 1.0, "last_updated": last_updated}
+
+def test_marks_are_tracked_per_symbol(db_session):
+    ingest_coingecko_data(db=db_session, fetch=lambda: [[
+        _coin("BTC", "2024-01-01T12:00:00Z"), _coin("SLOW", "2024-01-01T08:00:00Z")
+    ]])
+    marks = db_session.query(ETLCheckpoint).filter(ETLCheckpoint.source_name == "coingecko_api").one()
+    assert marks.meta_data["high_water_marks"] == {
+        "BTC": "2024-01-01T12:00:00", "SLOW": "2024-01-01T08:00:00"
+    }
+
+    # SLOW's new tick is older than BTC's mark (and than now) but newer than its own
+    ingest_coingecko_data(db=db_session, fetch=lambda: [[
+        _coin("BTC", "2024-01-01T12:00:00Z"), _coin("SLOW", "2024-01-01T09:00:00Z"),
+        _coin("BTC", "2024-01-01T11:00:00Z")
+    ]])
+    rows = db_session.query(CryptoMarketData).filter(CryptoMarketData.symbol == "SLOW").count()
+    assert rows == 2
+    # BTC's older tick is behind its mark and skipped
+    assert db_session.query(CryptoMarketData).filter(CryptoMarketData.symbol == "BTC").count() == 1
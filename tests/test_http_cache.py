@@ -0,0 +1,49 @@
+import requests
+from core.models import RawCoinGecko, HTTPCacheEntry
+from ingestion.ingest_api import ingest_coingecko_data
+from services.http_cache import ResponseCache, request_key
+
+URL = "https://api.example.invalid/markets"
+
+def _response(status=200, body=b"[]", headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response._content = body
+    response.headers.update(headers or {})
+    return response
+
+def _coin(coin_id, last_updated):
+    return {"id": coin_id, "symbol": coin_id[:3], "name": coin_id, "current_price": 1.0,
+            "market_cap": 1.0, "total_volume": 1.0, "last_updated": last_updated}
+
+def test_validators_roundtrip(db_session):
+    key = request_key(URL, {"page": 1})
+    cache = ResponseCache.load(db_session, "coingecko")
+    assert cache.conditional_headers(key) == {}
+
+    first = _response(headers={"ETag": '"v1"', "Last-Modified": "Wed, 01 Jan 2025 00:00:00 GMT"})
+    assert not cache.unchanged(key, first)
+    cache.save(db_session)
+    db_session.commit()
+
+    cache = ResponseCache.load(db_session, "coingecko")
+    assert cache.conditional_headers(key) == {
+        "If-None-Match": '"v1"', "If-Modified-Since": "Wed, 01 Jan 2025 00:00:00 GMT"
+    }
+    assert cache.unchanged(key, _response(status=304))
+    # Same body without validators is detected by its hash
+    assert cache.unchanged(key, _response())
+    assert not cache.unchanged(key, _response(body=b"[1]"))
+
+def test_unchanged_entries_are_skipped(db_session):
+    pages = [[_coin("bitcoin", "2023-10-27T10:00:00"), _coin("ethereum", "2023-10-27T10:00:00")]]
+    ingest_coingecko_data(db=db_session, fetch=lambda: pages)
+    assert db_session.query(RawCoinGecko).count() == 2
+
+    pages = [[_coin("bitcoin", "2023-10-27T10:00:00"), _coin("ethereum", "2023-10-27T11:00:00")]]
+    ingest_coingecko_data(db=db_session, fetch=lambda: pages)
+
+    # Only the entry whose last_updated moved is validated and landed again
+    assert db_session.query(RawCoinGecko).count() == 3
+    versions = db_session.query(HTTPCacheEntry).filter(HTTPCacheEntry.cache_key == "coingecko:entries").one()
+    assert versions.entry_versions["ethereum"] == "2023-10-27T11:00:00"
@@ -0,0 +1,59 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch, MagicMock
+from services import http_client
+from core.config import HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT
+
+def test_session_is_pooled_per_source():
+    assert http_client.get_session("test-a") is http_client.get_session("test-a")
+    assert http_client.get_session("test-a") is not http_client.get_session("test-b")
+
+def test_get_applies_timeouts():
+    response = MagicMock(status_code=200)
+    with patch("requests.Session.get", return_value=response) as mock_get:
+        assert http_client.get("test-a", "https://example.invalid/x") is response
+
+    assert mock_get.call_args.kwargs["timeout"] == (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+def test_async_client_is_shared_within_a_run():
+    async def run():
+        first = http_client.get_async_client("test-a")
+        assert http_client.get_async_client("test-a") is first
+        assert http_client.get_async_client("test-b") is not first
+        await http_client.close_async_clients()
+        return first
+
+    client = asyncio.run(run())
+    assert client.is_closed
+
+def test_get_async_records_pool_stats():
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    async def run():
+        for _ in range(3):
+            await http_client.get_async("test-pool", url)
+        await http_client.close_async_clients()
+
+    try:
+        asyncio.run(run())
+    finally:
+        server.shutdown()
+
+    # Three sequential requests reuse one keep-alive connection
+    assert http_client.HTTP_POOL_CONNECTIONS.labels("test-pool", "opened")._value.get() == 1
+    assert http_client.HTTP_POOL_CONNECTIONS.labels("test-pool", "idle")._value.get() == 1
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from core.config import JOB_TIMEOUT
+from core.models import ETLJob
+from ingestion import jobs
+from services import job_queue
+from services.job_queue import enqueue, claim_next
+
+HEADERS = {"X-Admin-Secret": "default_insecure_secret"}
+
+def test_identical_pending_jobs_are_coalesced(db_session):
+    first, coalesced = enqueue(db_session, "etl")
+    assert not coalesced
+    second, coalesced = enqueue(db_session, "etl")
+    assert coalesced and second.id == first.id
+
+    other, coalesced = enqueue(db_session, "backfill", {"start": "2024-01-01"})
+    assert not coalesced and other.id != first.id
+
+def test_identical_jobs_never_run_concurrently(db_session):
+    first, _ = enqueue(db_session, "etl")
+    assert claim_next(db_session, "w1").id == first.id
+
+    # A trigger during the run queues one follow-up, held back until the run ends
+    second, coalesced = enqueue(db_session, "etl")
+    assert not coalesced
+    assert claim_next(db_session, "w2") is None
+
+    with patch.dict(jobs.JOB_HANDLERS, {"etl": lambda params: {"coingecko_api": "ok"}}):
+        assert jobs.run_job(db_session, first)
+    assert first.status == "succeeded" and first.result == {"coingecko_api": "ok"}
+
+    assert claim_next(db_session, "w2").id == second.id
+
+def test_failed_job_records_error(db_session):
+    job, _ = enqueue(db_session, "etl")
+    job = claim_next(db_session, "w1")
+
+    def boom(params):
+        raise RuntimeError("db down")
+
+    with patch.dict(jobs.JOB_HANDLERS, {"etl": boom}):
+        assert not jobs.run_job(db_session, job)
+    assert job.status == "failed" and job.error_message == "db down"
+
+def test_trigger_returns_job_and_status_endpoint(client, db_session):
+    response = client.post("/admin/trigger-etl", headers=HEADERS)
+    assert response.status_code == 200
+    job_id = response.json()["job_id"]
+
+    again = client.post("/admin/trigger-etl", headers=HEADERS).json()
+    assert again["job_id"] == job_id and again["coalesced"]
+
+    status = client.get(f"/admin/jobs/{job_id}", headers=HEADERS)
+    assert status.status_code == 200
+    assert status.json()["status"] == "pending"
+    assert db_session.query(ETLJob).count() == 1
+
+    assert client.get("/admin/jobs/999", headers=HEADERS).status_code == 404
+
+def test_lost_worker_does_not_block_later_triggers(db_session):
+    enqueue(db_session, "etl")
+    lost = claim_next(db_session, "w1")          # ...and w1 dies without finishing
+    follow_up, _ = enqueue(db_session, "etl")
+    assert claim_next(db_session, "w2") is None  # still heartbeating recently
+
+    lost.heartbeat_at = lost.started_at = datetime.now() - timedelta(seconds=JOB_TIMEOUT + 1)
+    db_session.commit()
+    assert job_queue.requeue_stale(db_session) == 1
+    assert job_queue.requeue_stale(db_session) == 0   # another worker's poll finds nothing
+    assert lost.status == "failed" and "requeued as job" in lost.error_message
+
+    assert claim_next(db_session, "w2").id == follow_up.id
+    assert not job_queue.heartbeat(db_session, lost.id, "w1")
+    assert not job_queue.finish(db_session, lost, result={})   # a late finish keeps the requeue record
+    assert lost.status == "failed"
+
+def test_etl_job_fails_when_a_source_fails(db_session):
+    enqueue(db_session, "etl")
+    job = claim_next(db_session, "w1")
+    outcome = {"coingecko_api": None, "coinpaprika_api": RuntimeError("upstream down")}
+
+    with patch("ingestion.pipeline.run_pipeline", return_value=outcome):
+        assert not jobs.run_job(db_session, job)
+    assert job.status == "failed" and job.error_message == "Sources failed: coinpaprika_api"
+    assert job.result == {"coingecko_api": "ok", "coinpaprika_api": "upstream down"}
@@ -0,0 +1,52 @@
+from datetime import datetime, timezone
+from sqlalchemy import event
+from core.models import CryptoMarketData
+from ingestion.ingest_coinpaprika import ingest_coinpaprika_data
+from services.key_index import ExistingKeys
+
+def _ticker(i, last_updated="2024-01-01T00:00:00Z"):
+    return {"id": f"coin-{i}", "symbol": f"c{i}", "name": f"Coin {i}",
+            "quotes": {"USD": {"price": 1.0, "volume_24h": 1.0, "market_cap": 1.0}},
+            "last_updated": last_updated}
+
+def test_existing_keys_match_across_timezones(db_session):
+    db_session.add(CryptoMarketData(symbol="BTC", price_usd=1.0, source="coingecko_api",
+                                    recorded_at=datetime(2024, 1, 1, 12, 0)))
+    db_session.commit()
+
+    existing = ExistingKeys(db_session, "coingecko_api").load([
+        ("BTC", datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)),
+        ("BTC", datetime(2024, 1, 1, 13, 0)),
+        ("ETH", datetime(2024, 1, 1, 12, 0)),
+    ])
+    assert ("BTC", datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)) in existing
+    assert ("BTC", datetime(2024, 1, 1, 13, 0)) not in existing
+    assert ("ETH", datetime(2024, 1, 1, 12, 0)) not in existing
+
+def test_existing_keys_only_reads_the_requested_keys(db_session):
+    db_session.add_all([
+        CryptoMarketData(symbol="BTC", price_usd=1.0, source="coingecko_api", recorded_at=datetime(2024, 1, day))
+        for day in range(1, 11)
+    ])
+    db_session.commit()
+
+    existing = ExistingKeys(db_session, "coingecko_api").load([("BTC", datetime(2024, 1, 10)), ("BTC", datetime(2024, 2, 1))])
+    # Stored history that was not asked about stays in the database
+    assert ("BTC", datetime(2024, 1, 10)) in existing
+    assert ("BTC", datetime(2024, 1, 1)) not in existing
+
+def test_coinpaprika_checks_existing_keys_in_one_query(db_session):
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT") and "crypto_market_data" in statement:
+            statements.append(statement)
+
+    event.listen(db_session.get_bind(), "before_cursor_execute", count)
+    try:
+        ingest_coinpaprika_data(db=db_session, fetch=lambda: [_ticker(i) for i in range(200)])
+    finally:
+        event.remove(db_session.get_bind(), "before_cursor_execute", count)
+
+    assert db_session.query(CryptoMarketData).count() == 200
+    assert len(statements) == 1
@@ -0,0 +1,80 @@
+import asyncio
+import time
+from unittest.mock import patch
+import pytest
+from ingestion.pipeline import close_pipeline_loop, run_pipeline
+from ingestion.sources import Source
+from services import http_client
+
+def _slow_fetch(payload, delay=0.3):
+    async def fetch(client, cache=None):
+        await asyncio.sleep(delay)
+        return payload
+    return fetch
+
+def _slow_pages(pages, delay=0.3):
+    async def iter_pages(client, cache=None):
+        for page in pages:
+            await asyncio.sleep(delay)
+            yield page
+    return iter_pages
+
+def _slow_ingest(calls, name, delay=0.3):
+    def ingest(*args, fetch=None, **kwargs):
+        time.sleep(delay)  # blocking DB work
+        calls[name] = list(fetch()) if fetch else args
+    return ingest
+
+def test_sources_run_concurrently():
+    calls = {}
+    with patch("ingestion.ingest_api.iter_coingecko_pages_async", _slow_pages([["cg1"], ["cg2"]], delay=0.15)), \
+         patch("ingestion.ingest_coinpaprika.fetch_coinpaprika_data_async", _slow_fetch(["cp"])), \
+         patch("ingestion.ingest_api.ingest_coingecko_data", _slow_ingest(calls, "coingecko")), \
+         patch("ingestion.ingest_coinpaprika.ingest_coinpaprika_data", _slow_ingest(calls, "coinpaprika")), \
+         patch("ingestion.ingest_csv.ingest_csv_data", _slow_ingest(calls, "csv", delay=0.6)), \
+         patch("ingestion.ingest_legacy.ingest_legacy_data", _slow_ingest(calls, "legacy", delay=0.6)):
+        start = time.time()
+        outcome = run_pipeline(csv_files=["a.csv"], legacy_files=["b.csv"])
+        elapsed = time.time() - start
+
+    assert all(error is None for error in outcome.values())
+    assert calls["coingecko"] == [["cg1"], ["cg2"]] and calls["coinpaprika"] == ["cp"]
+    # Sequential would take 0.3+0.3+0.3+0.3+0.6+0.6 = 2.4s; concurrent ~ the slowest source
+    assert elapsed < 1.2
+
+def test_fetch_failure_reaches_ingestor():
+    calls = {}
+
+    async def failing_fetch(client, cache=None):
+        raise RuntimeError("upstream down")
+
+    def ingest(fetch=None, cache=None):
+        with pytest.raises(RuntimeError):
+            fetch()
+        calls["coinpaprika"] = "failed"
+
+    with patch("ingestion.ingest_api.iter_coingecko_pages_async", _slow_pages([], delay=0)), \
+         patch("ingestion.ingest_coinpaprika.fetch_coinpaprika_data_async", failing_fetch), \
+         patch("ingestion.ingest_api.ingest_coingecko_data", _slow_ingest(calls, "coingecko", delay=0)), \
+         patch("ingestion.ingest_coinpaprika.ingest_coinpaprika_data", ingest):
+        run_pipeline(csv_files=[], legacy_files=[])
+
+    assert calls["coinpaprika"] == "failed"
+    assert calls["coingecko"] == []
+
+def test_runs_in_one_thread_reuse_the_http_client():
+    clients = []
+
+    class Poll(Source):
+        name = "poll"
+
+        async def run(self, ctx):
+            clients.append(http_client.get_async_client("test-poll"))
+
+    with patch("ingestion.pipeline.select_sources", return_value=[Poll()]):
+        run_pipeline(sources=["poll"])
+        run_pipeline(sources=["poll"])
+    assert clients[0] is clients[1] and not clients[0].is_closed
+
+    close_pipeline_loop()
+    assert clients[0].is_closed
@@ -24,12 +24,12 @@ def test_retry_on_failure():
     """
     Verify that fetch_coingecko_data retries on failure.
     """
-    # We mock requests.get to fail twice then succeed
+    # We mock the pooled session's get to fail twice then succeed
     mock_response = MagicMock()
     mock_response.json.return_value = [{"id": "bitcoin"}]
     mock_response.raise_for_status = MagicMock()
     
-    with patch("requests.get") as mock_get:
+    with patch("requests.Session.get") as mock_get:
         # Side effect: ConnectionError, ConnectionError, SuccessResponse
         mock_get.side_effect = [
             requests.exceptions.ConnectionError("Fail 1"),
@@ -43,3 +43,116 @@ def test_retry_on_failure():
             
             assert len(data) == 1
             assert mock_get.call_count == 3 # 2 fails + 1 success
+
+def test_rate_limiter_burst():
+    """
+    A full bucket lets `burst` calls through at once, then throttles.
+    """
+    limiter = RateLimiter(calls_per_second=10, burst=3)
+
+    start = time.time()
+    for _ in range(3):
+        limiter.wait_for_token()
+    assert time.time() - start < 0.05
+
+    limiter.wait_for_token()
+    assert time.time() - start >= 0.08
+
+def test_rate_limiter_threads_share_budget():
+    """
+    Concurrent threads queue behind each other instead of sharing a token.
+    """
+    import threading
+    limiter = RateLimiter(calls_per_second=20)
+
+    start = time.time()
+    threads = [threading.Thread(target=limiter.wait_for_token) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # 1 immediate + 4 more at 0.05s each
+    assert time.time() - start >= 0.18
+
+def test_rate_limiter_async():
+    import asyncio
+    limiter = RateLimiter(calls_per_second=10)
+
+    async def run():
+        await asyncio.gather(*(limiter.wait_for_token_async() for _ in range(3)))
+
+    start = time.time()
+    asyncio.run(run())
+    assert time.time() - start >= 0.18
+
+def test_rate_limiter_shared_bucket(tmp_path):
+    """
+    Limiters with the same shared key (e.g. in different processes) draw
+    from one bucket.
+    """
+    first = RateLimiter(calls_per_second=10, shared_key="test-source", state_dir=str(tmp_path))
+    second = RateLimiter(calls_per_second=10, shared_key="test-source", state_dir=str(tmp_path))
+
+    start = time.time()
+    first.wait_for_token()
+    second.wait_for_token()
+    first.wait_for_token()
+    assert time.time() - start >= 0.18
+
+def _http_error(status, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return requests.exceptions.HTTPError(f"{status} error", response=response)
+
+def test_client_errors_are_not_retried():
+    calls = []
+
+    @validation_retry()
+    def fetch():
+        calls.append(1)
+        raise _http_error(404)
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        fetch()
+    assert len(calls) == 1
+
+def test_retry_after_is_honored():
+    """
+    429 is retried, waiting exactly the server's Retry-After instead of the
+    exponential backoff.
+    """
+    calls = []
+
+    @validation_retry()
+    def fetch():
+        calls.append(time.time())
+        if len(calls) < 2:
+            raise _http_error(429, {"Retry-After": "0.3"})
+        return "ok"
+
+    assert fetch() == "ok"
+    assert len(calls) == 2
+    assert 0.28 <= calls[1] - calls[0] < 1.5
+
+def test_rate_limiter_adapts_to_throttling():
+    limiter = RateLimiter(calls_per_second=10, max_concurrency=4)
+
+    throttled = requests.Response()
+    throttled.status_code = 429
+    throttled.headers["Retry-After"] = "0.2"
+    limiter.observe(throttled)
+    assert limiter.rate == 5
+    assert limiter.concurrency == 2
+
+    # The bucket is paused for the Retry-After
+    start = time.time()
+    limiter.wait_for_token()
+    assert time.time() - start >= 0.18
+
+    ok = requests.Response()
+    ok.status_code = 200
+    for _ in range(200):
+        limiter.observe(ok)
+    assert limiter.rate == 10
+    assert limiter.concurrency == 4
@@ -0,0 +1,120 @@
+import asyncio
+from datetime import datetime
+from api.response_cache import ReadCache, SingleFlight, read_cache
+from api.routes import stats
+from core.models import CryptoMarketData, DataVersion, ETLRun
+
+def test_read_cache_is_lru_bounded_and_versioned():
+    cache = ReadCache(max_bytes=10, ttl=60)
+    cache.put("a", 1, b"aaaa", '"a"')
+    cache.put("b", 1, b"bbbb", '"b"')
+    assert cache.get("a", 1) == (b"aaaa", '"a"')   # a is now most recent
+    cache.put("c", 1, b"cccc", '"c"')              # over 10 bytes: evicts b
+    assert cache.get("b", 1) is None
+    assert cache.size == 8
+    assert cache.get("a", 2) is None               # stale version is dropped
+    assert cache.size == 4
+
+    expired = ReadCache(max_bytes=10, ttl=-1)
+    expired.put("a", 1, b"a", '"a"')
+    assert expired.get("a", 1) is None
+
+def test_etag_and_not_modified_until_data_changes(client, db_session):
+    read_cache.clear()
+    db_session.add(CryptoMarketData(symbol="BTC", price_usd=1, recorded_at=datetime(2024, 1, 1), source="src1"))
+    db_session.commit()
+
+    first = client.get("/data?limit=5&symbol=BTC")
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and etag.startswith('"')
+    assert first.json()["request_id"] != "unknown"
+
+    # Same query, parameters in another order: same entry, 304 for the known ETag
+    again = client.get("/data?symbol=BTC&limit=5", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.headers["etag"] == etag
+
+    version = db_session.get(DataVersion, 1).version
+    db_session.add(CryptoMarketData(symbol="BTC", price_usd=2, recorded_at=datetime(2024, 1, 2), source="src1"))
+    db_session.commit()
+    db_session.expire_all()
+    assert db_session.get(DataVersion, 1).version == version + 1
+
+    changed = client.get("/data?limit=5&symbol=BTC", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert len(changed.json()["data"]) == 2
+
+def test_repeated_reads_do_not_recompute(client, db_session, monkeypatch):
+    read_cache.clear()
+    calls = []
+    original = stats._etl_stats
+    monkeypatch.setattr(stats, "_etl_stats", lambda db: calls.append(1) or original(db))
+
+    for _ in range(3):
+        assert client.get("/stats").status_code == 200
+    assert len(calls) == 1
+
+    db_session.add(ETLRun(source="src", status="success", records_processed=1, start_time=datetime.now()))
+    db_session.commit()
+    assert client.get("/stats").json()["global_stats"]["total_runs"] == 1
+    assert len(calls) == 2
+
+def test_single_flight_shares_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return "rows"
+
+    async def fresh():
+        return "fresh"
+
+    async def scenario():
+        results = await asyncio.gather(*[flight.do("k", slow) for _ in range(6)])
+        # Once finished, the next call runs again
+        return results, await flight.do("k", fresh)
+
+    results, after = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert sorted(results) == [("rows", False)] + [("rows", True)] * 5
+    assert after == ("fresh", False)
+
+def test_run_log_commits_keep_market_data_cached(client, db_session, monkeypatch):
+    read_cache.clear()
+    db_session.add(CryptoMarketData(symbol="BTC", price_usd=1, recorded_at=datetime(2024, 1, 1), source="src1"))
+    db_session.commit()
+    first = client.get("/data?limit=5")
+    etag, version = first.headers["etag"], first.headers["x-data-version"]
+    client.get("/runs")
+
+    # ETL bookkeeping alone: the run log changes, market data does not
+    db_session.add(ETLRun(source="src1", status="running", start_time=datetime.now()))
+    db_session.commit()
+
+    again = client.get("/data?limit=5", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.headers["x-data-version"] == version
+    assert len(client.get("/runs").json()) == 1
+
+def test_single_flight_survives_a_cancelled_leader():
+    flight = SingleFlight()
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "rows"
+
+    async def scenario():
+        leader = asyncio.ensure_future(flight.do("k", slow))
+        await asyncio.sleep(0)
+        followers = [asyncio.ensure_future(flight.do("k", slow)) for _ in range(3)]
+        await asyncio.sleep(0)
+        leader.cancel()                 # e.g. the leader's client disconnected
+        return leader, await asyncio.gather(*followers)
+
+    leader, results = asyncio.run(scenario())
+    assert leader.cancelled()
+    # The first waiter re-ran the call, the other two shared its result
+    assert sorted(results) == [("rows", False)] + [("rows", True)] * 2
+    assert len(calls) == 2
@@ -0,0 +1,141 @@
+import os
+from unittest.mock import patch
+import pytest
+from core.models import CryptoMarketData, ETLCheckpoint, ETLRun, RawCSVUpload
+from ingestion import ingest_csv
+from ingestion.ingest_csv import ingest_csv_data
+from services.frame_validation import validate_csv_frame
+
+def _write_csv(path, rows):
+    with open(path, "w") as f:
+        f.write("symbol,price,volume,timestamp,source\n")
+        for i in range(rows):
+            f.write(f"C{i},{i + 1},100,2023-01-01,csv\n")
+
+def test_csv_resumes_after_mid_file_crash(db_session, tmp_path):
+    d = tmp_path / "crash.csv"
+    _write_csv(d, 30)
+    filepath = str(d)
+    calls = []
+
+    def crash_on_third_chunk(frame):
+        calls.append(frame.index[0])
+        if len(calls) == 3:
+            raise RuntimeError("Simulated crash")
+        return validate_csv_frame(frame)
+
+    with patch("services.csv_stream.ETL_CSV_CHUNK_SIZE", 10):
+        with patch.object(ingest_csv, "validate_csv_frame", side_effect=crash_on_third_chunk):
+            with pytest.raises(RuntimeError, match="Simulated crash"):
+                ingest_csv_data(filepath, db=db_session)
+
+        failed = db_session.query(ETLRun).filter(ETLRun.source == filepath).first()
+        assert failed.status == "failed"
+        assert db_session.query(CryptoMarketData).count() == 20
+        meta = db_session.query(ETLCheckpoint).filter(ETLCheckpoint.source_name == filepath).one().meta_data
+        assert meta["rows"] == 20 and meta["complete"] is False
+
+        calls.clear()
+        with patch.object(ingest_csv, "validate_csv_frame", side_effect=lambda f: calls.append(f.index[0]) or validate_csv_frame(f)):
+            ingest_csv_data(filepath, db=db_session)
+
+    # Only the remaining chunk was read and validated on the second run
+    assert calls == [20]
+    runs = db_session.query(ETLRun).filter(ETLRun.source == filepath).order_by(ETLRun.id).all()
+    assert runs[-1].status == "success"
+    assert runs[-1].records_processed == 10
+    assert db_session.query(CryptoMarketData).count() == 30
+    assert db_session.query(RawCSVUpload).count() == 30
+
+def test_csv_restarts_when_partially_loaded_file_changes(db_session, tmp_path):
+    d = tmp_path / "changed.csv"
+    _write_csv(d, 5)
+    filepath = str(d)
+    db_session.add(ETLCheckpoint(source_name=filepath, meta_data={
+        "offset": 60, "rows": 2, "fingerprint": "stale", "complete": False
+    }))
+    db_session.commit()
+
+    ingest_csv_data(filepath, db=db_session)
+
+    assert db_session.query(CryptoMarketData).count() == 5
+
+def test_appended_csv_ingests_only_the_tail(db_session, tmp_path):
+    d = tmp_path / "exchange_log.csv"
+    _write_csv(d, 5)
+    filepath = str(d)
+    ingest_csv_data(filepath, db=db_session)
+
+    with open(d, "a") as f:
+        f.write("NEW1,1,1,2023-01-02,csv\n")
+        f.write("NEW2,1,1,2023-01-02,csv\n")
+    ingest_csv_data(filepath, db=db_session)
+
+    run = db_session.query(ETLRun).filter(ETLRun.source == filepath).order_by(ETLRun.id.desc()).first()
+    assert run.status == "success"
+    assert run.records_processed == 2
+    # Earlier rows were not re-read, so no duplicate raw rows either
+    assert db_session.query(RawCSVUpload).count() == 7
+
+def test_replaced_csv_is_reloaded(db_session, tmp_path):
+    d = tmp_path / "snapshot.csv"
+    _write_csv(d, 3)
+    filepath = str(d)
+    ingest_csv_data(filepath, db=db_session)
+
+    with open(d, "w") as f:
+        f.write("symbol,price,volume,timestamp,source\n")
+        f.write("DOGE,0.1,100,2023-02-01,csv\n")
+    ingest_csv_data(filepath, db=db_session)
+
+    run = db_session.query(ETLRun).filter(ETLRun.source == filepath).order_by(ETLRun.id.desc()).first()
+    assert run.status == "success"
+    assert run.records_processed == 1
+    assert db_session.query(CryptoMarketData).filter(CryptoMarketData.symbol == "DOGE").count() == 1
+
+def test_half_written_last_line_waits_for_its_newline(db_session, tmp_path):
+    d = tmp_path / "exchange_log.csv"
+    _write_csv(d, 2)
+    with open(d, "a") as f:
+        f.write("ETH,123")                      # writer is mid-line
+    filepath = str(d)
+    ingest_csv_data(filepath, db=db_session)
+    assert db_session.query(CryptoMarketData).count() == 2
+
+    with open(d, "a") as f:
+        f.write("45,1,2024-01-01 00:00:00,x\n")
+    ingest_csv_data(filepath, db=db_session)
+
+    eth = db_session.query(CryptoMarketData).filter(CryptoMarketData.symbol == "ETH").one()
+    assert eth.price_usd == 12345
+    assert db_session.query(CryptoMarketData).count() == 3
+
+def test_last_row_without_trailing_newline_is_loaded(db_session, tmp_path):
+    d = tmp_path / "export.csv"
+    d.write_text("symbol,price,volume,timestamp,source\nbtc,1,1,2024-01-01,x\neth,2,1,2024-01-01,x")
+    filepath = str(d)
+    ingest_csv_data(filepath, db=db_session)
+
+    assert sorted(r.symbol for r in db_session.query(CryptoMarketData).all()) == ["BTC", "ETH"]
+    meta = db_session.query(ETLCheckpoint).filter(ETLCheckpoint.source_name == filepath).one().meta_data
+    assert meta["offset"] == d.stat().st_size and meta["complete"] is True
+
+    ingest_csv_data(filepath, db=db_session)
+    run = db_session.query(ETLRun).filter(ETLRun.source == filepath).order_by(ETLRun.id.desc()).first()
+    assert run.status == "skipped"
+
+def test_same_size_edit_in_the_middle_is_reloaded(db_session, tmp_path):
+    d = tmp_path / "snapshot.csv"
+    _write_csv(d, 8000)                        # ~200 KB: row 4000 is outside the sampled blocks
+    filepath = str(d)
+    ingest_csv_data(filepath, db=db_session)
+
+    content = d.read_text().replace("\nC4000,4001,", "\nC4000,9991,")
+    stat = d.stat()
+    d.write_text(content)
+    os.utime(d, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert d.stat().st_size == stat.st_size
+
+    ingest_csv_data(filepath, db=db_session)
+    raw = db_session.query(RawCSVUpload).filter(RawCSVUpload.symbol == "C4000", RawCSVUpload.price == 9991).count()
+    assert raw == 1
@@ -0,0 +1,49 @@
+from datetime import datetime
+from core.models import CryptoMarketData, MarketDataCount
+from services.bulk_writer import BulkWriter
+from services.row_counts import counted_total, ensure_counts
+
+def _row(symbol, minute, source="src1"):
+    return dict(symbol=symbol, price_usd=1.0, recorded_at=datetime(2024, 1, 1, 0, minute), source=source)
+
+def test_bulk_writes_maintain_counters(db_session):
+    writer = BulkWriter(db_session)
+    for minute in range(3):
+        writer.add(CryptoMarketData, **_row("BTC", minute))
+    writer.add(CryptoMarketData, **_row("ETH", 0, source="src2"))
+    writer.flush()
+
+    # Rows already stored are skipped by ON CONFLICT and not counted again
+    writer.add(CryptoMarketData, **_row("BTC", 2))
+    writer.add(CryptoMarketData, **_row("BTC", 3))
+    writer.flush()
+
+    assert writer.inserted == 5 and writer.skipped == 1
+    assert counted_total(db_session) == 5
+    assert counted_total(db_session, symbol="BTC") == 4
+    assert counted_total(db_session, source="src2") == 1
+    assert counted_total(db_session, symbol="BTC", source="src2") == 0
+
+def test_counters_are_built_for_existing_data(db_session):
+    db_session.add_all([CryptoMarketData(**_row("BTC", m)) for m in range(2)])
+    db_session.commit()
+
+    assert ensure_counts(db_session) is True
+    assert ensure_counts(db_session) is False
+    counter = db_session.query(MarketDataCount).one()
+    assert (counter.symbol, counter.source, counter.row_count) == ("BTC", "src1", 2)
+
+def test_data_total_modes(client, db_session):
+    writer = BulkWriter(db_session)
+    for minute in range(4):
+        writer.add(CryptoMarketData, **_row("BTC", minute))
+    writer.flush()
+    # Written outside the ETL: only the exact count sees it
+    db_session.add(CryptoMarketData(**_row("BTC", 59)))
+    db_session.commit()
+
+    pagination = client.get("/data?symbol=btc").json()["pagination"]
+    assert (pagination["total"], pagination["total_mode"]) == (4, "approx")
+    assert client.get("/data?total=exact").json()["pagination"]["total"] == 5
+    assert client.get("/data?total=none").json()["pagination"]["total"] is None
+    assert client.get("/data?total=bogus").status_code == 422
@@ -0,0 +1,62 @@
+import threading
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy.orm import sessionmaker
+from core.models import ETLCheckpoint
+from ingestion import scheduler
+from ingestion.scheduler import SourceSchedule, run_scheduled
+from services.leases import lease, lease_key
+
+
+@pytest.fixture
+def sessions(db_session, monkeypatch):
+    monkeypatch.setattr(scheduler, "SessionLocal", sessionmaker(bind=db_session.get_bind()))
+    return db_session
+
+
+def test_lease_is_exclusive():
+    with lease("schedule:test") as first:
+        assert first is True
+        seen = []
+        thread = threading.Thread(target=lambda: seen.append(lease("schedule:test").__enter__()))
+        thread.start()
+        thread.join()
+        assert seen == [False]
+    with lease("schedule:test") as again:
+        assert again is True
+
+
+def test_lease_key_is_stable_signed_bigint():
+    assert lease_key("schedule:files") == lease_key("schedule:files")
+    assert -2 ** 63 <= lease_key("schedule:files") < 2 ** 63
+
+
+def test_run_scheduled_records_run_and_skips_until_due(sessions):
+    calls = []
+    schedule = SourceSchedule("coingecko_api", interval=60, jitter=0.1)
+
+    assert run_scheduled(schedule, runner=lambda name: calls.append(name) or {name: None}) == "ran"
+    assert run_scheduled(schedule, runner=lambda name: calls.append(name) or {name: None}) == "not_due"
+    assert calls == ["coingecko_api"]
+
+    checkpoint = sessions.query(ETLCheckpoint).filter_by(source_name="schedule:coingecko_api").one()
+    checkpoint.last_processed_at = datetime.now() - timedelta(seconds=120)
+    sessions.commit()
+    assert run_scheduled(schedule, runner=lambda name: calls.append(name) or {name: RuntimeError("boom")}) == "failed"
+    assert calls == ["coingecko_api", "coingecko_api"]
+
+
+def test_run_scheduled_skips_when_lease_is_held(sessions):
+    schedule = SourceSchedule("files", interval=60)
+    with lease("schedule:files"):
+        result = []
+        thread = threading.Thread(target=lambda: result.append(run_scheduled(schedule, runner=lambda name: {})))
+        thread.start()
+        thread.join()
+    assert result == ["busy"]
+
+
+def test_next_delay_stays_within_jitter():
+    schedule = SourceSchedule("coinpaprika_api", interval=100, jitter=0.2)
+    delays = [schedule.next_delay() for _ in range(200)]
+    assert all(80 <= delay <= 120 for delay in delays)
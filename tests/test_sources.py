@@ -0,0 +1,107 @@
+import asyncio
+from datetime import datetime
+from unittest.mock import patch
+from core.models import CryptoMarketData, ETLRun, RawCoinGecko
+from ingestion.pipeline import SOURCES
+from ingestion.sources import LEASE_PREFIX, APISource, Source, SourceBusy, run_sources, select_sources
+from services.batch_validation import COINGECKO_BATCH
+from services.leases import lease
+
+
+class FakeExchange(APISource):
+    name = "fake_exchange"
+    label = "FakeExchange"
+    cache_source = "fake_exchange"
+    raw_model = RawCoinGecko
+    batch = COINGECKO_BATCH
+
+    def transform(self, validated, entry):
+        row = {
+            "symbol": validated.symbol,
+            "price_usd": validated.current_price,
+            "market_cap": validated.market_cap,
+            "volume_24h": validated.total_volume,
+            "recorded_at": validated.last_updated,
+        }
+        return {"coin_id": validated.id, "data": entry}, row, entry.get("last_updated")
+
+
+def _coin(symbol, last_updated="2023-10-27T10:00:00Z"):
+    return {"id": symbol, "symbol": symbol, "name": symbol, "current_price": 1.0, "market_cap": 2.0,
+            "total_volume": 3.0, "last_updated": last_updated}
+
+
+class Step(Source):
+    def __init__(self, name, log, depends_on=(), fail=False):
+        self.name, self.log, self.depends_on, self.fail = name, log, depends_on, fail
+
+    async def run(self, ctx):
+        self.log.append(f"start {self.name}")
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise RuntimeError(f"{self.name} broke")
+        self.log.append(f"end {self.name}")
+
+
+def test_builtin_sources_are_registered():
+    assert sorted(SOURCES) == ["coingecko_api", "coinpaprika_api", "files"]
+    assert sorted(s.name for s in select_sources(["files"])) == ["csv_files", "legacy_files"]
+
+
+def test_api_source_plugin_gets_shared_load_stage(db_session):
+    source = FakeExchange()
+    source.load(db_session, lambda cache: [[_coin("abc"), _coin("def"), {"id": "bad"}]])
+    source.load(db_session, lambda cache: [[_coin("abc"), _coin("abc", "2023-10-27T11:00:00Z")]])
+
+    runs = db_session.query(ETLRun).filter(ETLRun.source == "fake_exchange").order_by(ETLRun.id).all()
+    assert [(r.status, r.records_processed) for r in runs] == [("success", 2), ("success", 1)]
+    rows = db_session.query(CryptoMarketData).filter(CryptoMarketData.source == "fake_exchange").all()
+    assert sorted((r.symbol, r.recorded_at) for r in rows) == [
+        ("ABC", datetime(2023, 10, 27, 10)), ("ABC", datetime(2023, 10, 27, 11)), ("DEF", datetime(2023, 10, 27, 10))
+    ]
+
+
+def test_dag_runs_dependencies_first_and_skips_dependents_of_failures():
+    log = []
+    sources = [
+        Step("load", log, depends_on=("extract",)),
+        Step("extract", log),
+        Step("other", log, fail=True),
+        Step("after_other", log, depends_on=("other",)),
+    ]
+    outcome = asyncio.run(run_sources(sources))
+
+    assert log.index("end extract") < log.index("start load")
+    assert outcome["load"] is None and outcome["extract"] is None
+    assert isinstance(outcome["other"], RuntimeError)
+    assert "Dependency other failed" in str(outcome["after_other"])
+    assert "start after_other" not in log
+
+
+def test_failed_runs_reach_the_runner(db_session):
+    source = FakeExchange()
+
+    async def all_pages_fail(client, cache):
+        yield RuntimeError("page 1 down")
+        yield RuntimeError("page 2 down")
+
+    source.streaming = True
+    source.fetch = all_pages_fail
+    with patch("ingestion.sources.SessionLocal", lambda: db_session), \
+         patch.object(db_session, "close", lambda: None):
+        outcome = asyncio.run(run_sources([source]))
+
+    assert "2 page(s) failed" in str(outcome["fake_exchange"])
+    run = db_session.query(ETLRun).filter(ETLRun.source == "fake_exchange").one()
+    assert run.status == "failed"
+
+
+def test_source_already_running_elsewhere_is_skipped():
+    log = []
+    with lease(LEASE_PREFIX + "held") as acquired:
+        assert acquired
+        outcome = asyncio.run(run_sources([Step("held", log), Step("free", log)]))
+
+    assert isinstance(outcome["held"], SourceBusy)
+    assert outcome["free"] is None
+    assert log == ["start free", "end free"]
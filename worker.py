@@ -0,0 +1,41 @@
+import argparse
+from prometheus_client import start_http_server
+from core.config import WORKER_METRICS_PORT
+from core.database import init_db, SessionLocal
+from ingestion.jobs import run_worker_pool
+from ingestion.scheduler import Scheduler
+from services.job_queue import enqueue
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs queued ETL jobs (etl_jobs table).")
+    parser.add_argument("--concurrency", type=int, default=None, help="jobs run in parallel (default JOB_WORKER_CONCURRENCY)")
+    parser.add_argument("--once", action="store_true", help="exit once the queue is empty")
+    parser.add_argument("--enqueue-etl", action="store_true", help="queue a full ETL run before starting")
+    parser.add_argument("--schedule", action="store_true", help="also run every source on its SCHEDULE_*_SECONDS interval")
+    parser.add_argument("--metrics-port", type=int, default=WORKER_METRICS_PORT, help="port of the /metrics endpoint, 0 disables it (default WORKER_METRICS_PORT)")
+    args = parser.parse_args()
+
+    if args.metrics_port:
+        print(f"Serving metrics on :{args.metrics_port}/metrics")
+        start_http_server(args.metrics_port)
+
+    print("Initializing Database...")
+    init_db()
+
+    if args.enqueue_etl:
+        db = SessionLocal()
+        try:
+            job, coalesced = enqueue(db, "etl")
+            print(f"ETL run queued as job {job.id}" + (" (already pending)" if coalesced else ""))
+        finally:
+            db.close()
+
+    if args.schedule:
+        print("Starting source scheduler...")
+        Scheduler().start()
+
+    print("Starting ETL worker...")
+    run_worker_pool(concurrency=args.concurrency, once=args.once)
+
+if __name__ == "__main__":
+    main()